@@ -1,33 +1,15 @@
-from fastapi import FastAPI, HTTPException
-import subprocess
-import os
-import json
+from fastapi import HTTPException
 
 from fastapi import APIRouter
 
+from backend.services.signals import calendar_signal, SignalUnavailable
+from intell.app.config import settings
+
 calendar_trigger = APIRouter()
 
 @calendar_trigger.get("/trigger/calendar")
-def trigger_calendar():
-    # Path to your script and output file
-    script_path = "intell/app/core/calendar/google_calendar.py"
-    output_file = "intell/app/outputs/calendar_events.json"
-
-    # Run the script
+async def trigger_calendar(user_id: str = settings.DEFAULT_USER_ID):
     try:
-        result = subprocess.run(
-            ["python", script_path],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=500, detail=f"Script error: {e.stderr}")
-
-    # Read the output file and return its contents
-    if not os.path.exists(output_file):
-        raise HTTPException(status_code=500, detail="Output file not found.")
-
-    with open(output_file, "r") as f:
-        data = json.load(f)
-    return data
\ No newline at end of file
+        return await calendar_signal(user_id)
+    except SignalUnavailable as e:
+        raise HTTPException(status_code=e.status_code, detail=e.payload["detail"])
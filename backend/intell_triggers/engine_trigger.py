@@ -1,16 +1,82 @@
-from fastapi import APIRouter
+import json
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from intell.app.core.recommendation_engine import engine
+from intell.app.core.recommendation_engine.ranked_store import RankedStoreMissing
+from backend.services.final_recommendation import build_final_recommendation
+from intell.app.config import settings
 
 engine_router = APIRouter()
 
 @engine_router.get("/recommendations-engine/", tags=["Recommendations"])
-async def run_recommendation_engine():
+async def run_recommendation_engine(
+    user_id: str = settings.DEFAULT_USER_ID,
+    limit: int = Query(50, ge=1, le=500, description="Movies returned per slot"),
+    offset: int = Query(0, ge=0, description="Movies skipped per slot, for paging"),
+    mode: str = Query("list", pattern="^(list|plan)$",
+                      description="'list' ranks every title that fits a slot; 'plan' packs each slot with a playlist"),
+    format: str = Query("v1", pattern="^(v1|v2)$",
+                        description="'v2' sends the moods and each movie once, with slots referencing movie ids"),
+):
     """
     Runs the recommendation engine for a specific user.
     
     This endpoint triggers the recommendation process and returns
     a list of recommended items.
     """
-    # In a production system, you might run this as a background task
-    recommendations = await engine.get_slot_movie_recommendations()
+    # The mood/calendar signals are gathered in-process rather than through
+    # a loopback call to /trigger/final-recommendation.
+    user_data = await build_final_recommendation(user_id)
+    recommend = engine.get_slot_movie_recommendations_v2 if format == "v2" else engine.get_slot_movie_recommendations
+    try:
+        recommendations = await recommend(user_data, user_id=user_id, limit=limit, offset=offset, mode=mode)
+    except engine.UnknownUserError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RankedStoreMissing as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return recommendations
+
+
+@engine_router.get("/recommendations-engine/stream", tags=["Recommendations"])
+async def stream_recommendation_engine(
+    user_id: str = settings.DEFAULT_USER_ID,
+    limit: int = Query(50, ge=1, le=500, description="Movies returned per slot"),
+    offset: int = Query(0, ge=0, description="Movies skipped per slot, for paging"),
+    mode: str = Query("list", pattern="^(list|plan)$",
+                      description="'list' ranks every title that fits a slot; 'plan' packs each slot with a playlist"),
+):
+    """
+    Streams the v2 recommendations as NDJSON: a moods record, one record per slot
+    (carrying the movies not sent in an earlier record) and an end record.
+    """
+    user_data = await build_final_recommendation(user_id)
+    records = engine.iter_slot_movie_recommendations_v2(
+        user_data, user_id=user_id, limit=limit, offset=offset, mode=mode)
+    try:
+        first = await records.__anext__()
+    except engine.UnknownUserError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RankedStoreMissing as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def ndjson():
+        yield json.dumps(first) + "\n"
+        async for record in records:
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@engine_router.get("/recommendations-engine/{user_id}", tags=["Recommendations"])
+async def run_user_recommendation_engine(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=500, description="Movies returned per slot"),
+    offset: int = Query(0, ge=0, description="Movies skipped per slot, for paging"),
+    mode: str = Query("list", pattern="^(list|plan)$",
+                      description="'list' ranks every title that fits a slot; 'plan' packs each slot with a playlist"),
+    format: str = Query("v1", pattern="^(v1|v2)$",
+                        description="'v2' sends the moods and each movie once, with slots referencing movie ids"),
+):
+    """Same as /recommendations-engine/, with the user taken from the path."""
+    return await run_recommendation_engine(user_id=user_id, limit=limit, offset=offset, mode=mode, format=format)
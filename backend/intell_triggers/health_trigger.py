@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from backend.services.startup_profile import startup_profile
+from intell.app.core.model_registry import model_registry
+from intell.app.config import settings
+
+health_router = APIRouter()
+
+
+def preload_model_names():
+    """The model names listed in PRELOAD_MODELS: None for "all" (every registered model), [] when it lists none."""
+    if settings.PRELOAD_MODELS.strip() == "all":
+        return None
+    return [name.strip() for name in settings.PRELOAD_MODELS.split(",") if name.strip()]
+
+
+@health_router.get("/health/models", summary="Readiness of the models: loaded, loading or failed")
+async def models_health():
+    """
+    Load state of every registered model. Answers 200 when the PRELOAD_MODELS
+    models are loaded and 503 while any of them is not (still loading, or its
+    load failed: see last_error). The other models load on their first request.
+    """
+    models = model_registry.health()
+    names = preload_model_names()
+    required = list(models) if names is None else [name for name in names if name in models]
+    ready = all(models[name]["loaded"] for name in required)
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"ready": ready, "required": required, "models": models})
+
+
+@health_router.get("/health/startup", summary="Import time per component and load time per model at startup")
+async def startup_health():
+    return startup_profile.report()
@@ -0,0 +1,55 @@
+from fastapi import APIRouter
+
+from backend.services.inference_executor import inference_executor
+from backend.services.signals import signal_cache, smartwatch_batcher, stream_features
+from backend.services.voice_batch import voice_batches
+from intell.app.core.recommendation_engine.ranked_store import ranked_store
+from intell.app.core.calendar.event_store import get_event_store
+from intell.app.core.model_registry import model_registry
+from intell.app.core.speech_model.speech_model import mfcc_cache
+
+metrics_router = APIRouter()
+
+@metrics_router.get("/metrics/signal-cache", summary="Hit/miss counters of the per-user signal snapshot cache")
+async def signal_cache_metrics():
+    return signal_cache.stats()
+
+
+@metrics_router.get("/metrics/ranked-store", summary="LRU and shard counters of the user-sharded ranked store")
+async def ranked_store_metrics():
+    return ranked_store.stats()
+
+
+@metrics_router.get("/metrics/calendar-sync", summary="Sync and read counters of the local calendar event store")
+async def calendar_sync_metrics():
+    return get_event_store().stats()
+
+
+@metrics_router.get("/metrics/models", summary="Load, warm-up and predict latency of the registered models")
+async def model_metrics():
+    return model_registry.stats()
+
+
+@metrics_router.get("/metrics/smartwatch-batching", summary="Batch sizes of the smartwatch micro-batcher")
+async def smartwatch_batching_metrics():
+    return smartwatch_batcher.stats()
+
+
+@metrics_router.get("/metrics/smartwatch-stream", summary="Devices and sample counters of the streaming smartwatch features")
+async def smartwatch_stream_metrics():
+    return stream_features.stats()
+
+
+@metrics_router.get("/metrics/voice-features", summary="Hit rates and time saved by the voice MFCC feature cache")
+async def voice_feature_metrics():
+    return mfcc_cache.stats()
+
+
+@metrics_router.get("/metrics/voice-batch", summary="Running batch voice scoring requests and the shared extraction pool")
+async def voice_batch_metrics():
+    return voice_batches.stats()
+
+
+@metrics_router.get("/metrics/inference", summary="Queue depth, wait and run time of the shared inference executor per model")
+async def inference_metrics():
+    return inference_executor.stats()
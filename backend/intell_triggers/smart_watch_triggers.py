@@ -1,11 +1,104 @@
-from fastapi import APIRouter
-from intell.app.core.smart_watch.watch_value_generator import generate_sample_row
-from intell.app.core.smart_watch.predict_smartwatch import predict_single_sample_mood
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from backend.services.inference_executor import inference_executor
+from backend.services.signals import smartwatch_signal, predict_smartwatch_sample, SignalUnavailable, stream_features
+from intell.app.core.feature_spec import unix_timestamp
+from intell.app.core.smart_watch.predict_smartwatch import predict_batch_moods
+from intell.app.config import settings
 
 router = APIRouter()
 
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+
+async def _read_samples(request: Request):
+    """Parses a JSON array or NDJSON body of sample objects; returns (samples, is_ndjson)."""
+    body = await request.body()
+    is_ndjson = request.headers.get("content-type", "").split(";")[0].strip() in NDJSON_TYPES
+    try:
+        if is_ndjson:
+            samples = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        else:
+            samples = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {e}")
+    if not isinstance(samples, list) or not all(isinstance(sample, dict) for sample in samples):
+        raise HTTPException(status_code=400, detail="Expected a list of sample objects.")
+    if len(samples) > settings.SMARTWATCH_BATCH_MAX_SAMPLES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.SMARTWATCH_BATCH_MAX_SAMPLES} samples per request.")
+    return samples, is_ndjson
+
+
 @router.get("/trigger/smartwatch_prediction")
-def trigger_smartwatch_prediction():
-    sample_row = generate_sample_row()
-    prediction = predict_single_sample_mood(sample_row)
-    return {"sample": sample_row, "predicted_mood": prediction}
\ No newline at end of file
+async def trigger_smartwatch_prediction():
+    try:
+        return await smartwatch_signal()
+    except SignalUnavailable as e:
+        raise HTTPException(status_code=e.status_code, detail=e.payload["detail"])
+
+@router.post("/trigger/smartwatch_prediction")
+async def predict_smartwatch_sample_mood(sample: dict):
+    """Mood for one posted smartwatch sample; concurrent requests share one predict call."""
+    try:
+        return {"sample": sample, "predicted_mood": await predict_smartwatch_sample(sample)}
+    except SignalUnavailable as e:
+        raise HTTPException(status_code=e.status_code, detail=e.payload["detail"])
+
+@router.post("/trigger/smartwatch_prediction/batch")
+async def predict_smartwatch_batch(request: Request):
+    """
+    Moods for N smartwatch samples from a single vectorised predict.
+    Accepts a JSON array of samples, or NDJSON (one sample per line) with an
+    application/x-ndjson content type, and answers in the same format: a JSON
+    {"predictions": [...]} or one {"predicted_mood": ...} line per sample.
+    """
+    samples, is_ndjson = await _read_samples(request)
+    try:
+        predictions = await inference_executor.run("smartwatch", predict_batch_moods, samples)
+    except (FileNotFoundError, KeyError) as e:
+        raise HTTPException(status_code=503, detail=f"Smartwatch model unavailable: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid smartwatch sample: {e}")
+
+    if is_ndjson:
+        lines = "".join(json.dumps({"predicted_mood": mood}) + "\n" for mood in predictions)
+        return Response(content=lines, media_type="application/x-ndjson")
+    return {"count": len(predictions), "predictions": predictions}
+
+
+@router.post("/trigger/smartwatch_stream/{device_id}")
+async def ingest_smartwatch_stream(device_id: str, request: Request):
+    """
+    Appends a device's telemetry to its rolling windows. Same body formats as the
+    batch endpoint; each sample needs a 'timestamp' (ISO string or Unix seconds)
+    and the streamed fields, in time order. Samples older than the device's last
+    one are dropped.
+    """
+    samples, _ = await _read_samples(request)
+    try:
+        rows = [(unix_timestamp(sample["timestamp"]), sample) for sample in samples]
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid or missing sample timestamp: {e}")
+
+    def ingest():
+        kept = 0
+        for timestamp, sample in rows:
+            kept += stream_features.push_sample(device_id, dict(sample, timestamp=timestamp))
+        return kept
+
+    try:
+        kept = await asyncio.to_thread(ingest)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid smartwatch sample: {e}")
+    return {"device_id": device_id, "accepted": kept, "dropped": len(rows) - kept}
+
+@router.get("/trigger/smartwatch_stream/{device_id}/features")
+async def smartwatch_stream_features(device_id: str):
+    """The device's rolling mean/std/slope/min/max per field and window."""
+    try:
+        return {"device_id": device_id, "features": stream_features.features(device_id)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No telemetry received for device '{device_id}'.")
@@ -1,14 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+import json
 import os
-import glob
-import random
+import time
 
-from intell.app.core.speech_model.speech_model import predict_emotion
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 
-voice_router = APIRouter()
+from backend.services.signals import voice_signal, SignalUnavailable
+from backend.services.voice_batch import BatchBusy, voice_batches
+from backend.services.voice_stream import VoiceStream
+from intell.app.core.speech_model.batch_scoring import iter_audio_files
+from intell.app.config import settings
 
-VOICE_FILES_DIR = "backend/voice_files"
+voice_router = APIRouter()
 
 @voice_router.get("/trigger/voice", summary="Process a random .wav file in voice_files folder and get mood prediction")
 async def trigger_voice():
@@ -16,21 +19,130 @@ async def trigger_voice():
     Processes one random .wav file in the voice_files folder and returns the predicted emotion.
     """
     try:
-        wav_files = glob.glob(os.path.join(VOICE_FILES_DIR, '*.wav'))
-        if not wav_files:
-            return JSONResponse(content={"error": "No .wav files found in voice_files folder."}, status_code=404)
-        file_path = random.choice(wav_files)
-        try:
-            print(file_path)
-            predicted_emotion = predict_emotion(file_path)
-            return JSONResponse(content={
-                "filename": os.path.basename(file_path),
-                "predicted_emotion": predicted_emotion
-            })
-        except Exception as e:
-            return JSONResponse(content={
-                "filename": os.path.basename(file_path),
-                "error": str(e)
-            }, status_code=500)
+        return JSONResponse(content=await voice_signal())
+    except SignalUnavailable as e:
+        return JSONResponse(content=e.payload, status_code=e.status_code)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
+
+
+def _resolve_under_root(path: str) -> str:
+    """Absolute path of a request path relative to VOICE_BATCH_ROOT; 400 if it leaves the root."""
+    root = os.path.realpath(settings.VOICE_BATCH_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if resolved != root and not resolved.startswith(root + os.sep):
+        raise HTTPException(status_code=400, detail=f"Path outside the voice batch root: {path}")
+    return resolved
+
+
+@voice_router.post("/trigger/voice/batch", summary="Score every .wav in a directory or list of files, streamed as NDJSON")
+async def trigger_voice_batch(request: dict):
+    """
+    Body: {"directory": "<dir>"} and/or {"files": ["<file>", ...]}, relative to VOICE_BATCH_ROOT.
+    MFCCs are extracted in the shared process pool and scored in batches; one
+    {"path", "predicted_emotion", "confidence"} (or {"path", "error"}) line is
+    streamed per file as its batch completes, then a {"done": true, ...} summary.
+    429 while VOICE_BATCH_MAX_CONCURRENT batches are already running.
+    """
+    sources = []
+    if request.get("directory") is not None:
+        directory = _resolve_under_root(str(request["directory"]))
+        if not os.path.isdir(directory):
+            raise HTTPException(status_code=404, detail=f"Directory not found: {request['directory']}")
+        sources.append(directory)
+    files = request.get("files") or []
+    if not isinstance(files, list):
+        raise HTTPException(status_code=400, detail="'files' must be a list of paths.")
+    sources.extend(_resolve_under_root(str(path)) for path in files)
+    if not sources:
+        raise HTTPException(status_code=400, detail="Expected a 'directory' or a 'files' list.")
+
+    root = os.path.realpath(settings.VOICE_BATCH_ROOT)
+    try:
+        records = voice_batches.start(iter_audio_files(sources), batch_size=settings.VOICE_BATCH_PREDICT_SIZE)
+    except BatchBusy as e:
+        raise HTTPException(status_code=429, detail=f"{e}; retry later.")
+
+    def ndjson():
+        # A sync generator: Starlette iterates it in its thread pool
+        started = time.perf_counter()
+        scored = errors = 0
+        for record in records:
+            record["path"] = os.path.relpath(record["path"], root)
+            scored += 1
+            errors += "error" in record
+            yield json.dumps(record) + "\n"
+        yield json.dumps({"done": True, "files": scored, "errors": errors,
+                          "seconds": round(time.perf_counter() - started, 3)}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+STREAM_FORMAT_PATTERN = "^(pcm_s16le|f32le)$"
+
+
+class _UploadStreamingResponse(StreamingResponse):
+    """
+    Streams a response while the request body is still being read. Starlette's
+    disconnect listener would consume the request's body messages, so it is not
+    started; request.stream() raises ClientDisconnect when the client goes away.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+@voice_router.websocket("/trigger/voice/stream")
+async def stream_voice_websocket(
+    websocket: WebSocket,
+    sample_rate: int = Query(22050, gt=0),
+    sample_format: str = Query("pcm_s16le", alias="format", pattern=STREAM_FORMAT_PATTERN),
+    interval: float = Query(settings.VOICE_STREAM_INTERVAL_SECONDS, ge=0.5),
+):
+    """
+    Live emotion for mono audio sent as binary frames of raw little-endian samples.
+    A JSON prediction over all audio so far is sent every `interval` seconds of
+    audio; the text message "end" asks for the final prediction and closes the socket.
+    """
+    await websocket.accept()
+    stream = VoiceStream(sample_rate, sample_format, interval)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                prediction = await stream.feed(message["bytes"])
+                if prediction is not None:
+                    await websocket.send_json(prediction)
+            elif message.get("text") == "end":
+                await websocket.send_json(await stream.finish())
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        return
+
+
+@voice_router.post("/trigger/voice/stream", summary="Live emotion for audio sent as a chunked upload, streamed as NDJSON")
+async def stream_voice_upload(
+    request: Request,
+    sample_rate: int = Query(22050, gt=0),
+    sample_format: str = Query("pcm_s16le", alias="format", pattern=STREAM_FORMAT_PATTERN),
+    interval: float = Query(settings.VOICE_STREAM_INTERVAL_SECONDS, ge=0.5),
+):
+    """
+    Body: mono raw little-endian samples, typically sent with chunked transfer
+    encoding. One NDJSON prediction line is streamed back every `interval`
+    seconds of audio received, and a final one ({"final": true}) when the
+    upload ends.
+    """
+    stream = VoiceStream(sample_rate, sample_format, interval)
+
+    async def ndjson():
+        async for chunk in request.stream():
+            prediction = await stream.feed(chunk)
+            if prediction is not None:
+                yield json.dumps(prediction) + "\n"
+        yield json.dumps(await stream.finish()) + "\n"
+
+    return _UploadStreamingResponse(ndjson(), media_type="application/x-ndjson")
@@ -1,13 +1,54 @@
-from fastapi import FastAPI
-from backend.intell_triggers import calendar_trigger
-from backend.intell_triggers.smart_watch_triggers import router as smart_watch_router
-from backend.intell_triggers.calendar_trigger import calendar_trigger
-from backend.intell_triggers.voice_trigger import voice_router
-from backend.intell_triggers.environment import environment_router
-from backend.intell_triggers.final_trigger import final_router
-from backend.intell_triggers.engine_trigger import engine_router
+import asyncio
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+# Imported first, so that it times every import below
+from backend.services.startup_profile import startup_profile
+
+with startup_profile.component("fastapi"):
+    from fastapi import FastAPI
+# Each router imports its services and models' code; no model is loaded at import
+with startup_profile.component("backend.intell_triggers.calendar_trigger"):
+    from backend.intell_triggers.calendar_trigger import calendar_trigger
+with startup_profile.component("backend.intell_triggers.smart_watch_triggers"):
+    from backend.intell_triggers.smart_watch_triggers import router as smart_watch_router
+with startup_profile.component("backend.intell_triggers.voice_trigger"):
+    from backend.intell_triggers.voice_trigger import voice_router
+with startup_profile.component("backend.intell_triggers.environment"):
+    from backend.intell_triggers.environment import environment_router
+with startup_profile.component("backend.intell_triggers.final_trigger"):
+    from backend.intell_triggers.final_trigger import final_router
+with startup_profile.component("backend.intell_triggers.engine_trigger"):
+    from backend.intell_triggers.engine_trigger import engine_router
+with startup_profile.component("backend.intell_triggers.metrics_trigger"):
+    from backend.intell_triggers.metrics_trigger import metrics_router
+with startup_profile.component("backend.intell_triggers.health_trigger"):
+    from backend.intell_triggers.health_trigger import health_router, preload_model_names
+
+from intell.app.core.recommendation_engine.catalog import catalog_store
+from intell.app.core.recommendation_engine.ranked_store import ranked_store
+from backend.services.voice_batch import voice_batches
+from intell.app.core.model_registry import model_registry
+from intell.app.config import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Parse the movie catalog once so /recommendations-engine/ never touches disk
+    with startup_profile.component("movie catalog"):
+        catalog_store.load()
+    # Requests never build the ranked store; build it here if it is missing (or build it offline)
+    if settings.RANKED_STORE_BUILD_ON_STARTUP:
+        with startup_profile.component("ranked store"):
+            await asyncio.to_thread(ranked_store.ensure_built)
+    # Models load in the background; until one has, its first request loads it.
+    # GET /health/models reports when they are ready.
+    model_registry.preload_in_background(preload_model_names())
+    startup_profile.mark_ready()
+    yield
+    voice_batches.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(calendar_trigger)
 app.include_router(smart_watch_router)
@@ -15,6 +56,8 @@ app.include_router(voice_router)
 app.include_router(environment_router)
 app.include_router(final_router)
 app.include_router(engine_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
 
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -0,0 +1,152 @@
+import pandas as pd
+import joblib
+import os
+import warnings
+from functools import lru_cache
+from intell.app.core.compact_forest import CompactForest, export_forest, is_current
+from intell.app.core.environment.mock_iot_generator import generate_mock_iot_data
+from intell.app.core.feature_spec import FeatureSpec
+from intell.app.core.model_registry import model_registry
+
+# Define paths based on project structure
+MODEL_DIR = "intell/app/core/environment"
+MODEL_PATH = os.path.join(MODEL_DIR, "mood_model.pkl")
+ENCODER_PATH = os.path.join(MODEL_DIR, "encoder.pkl")
+SCALER_PATH = os.path.join(MODEL_DIR, "scaler.pkl")
+# Array-only export of model, encoder categories and scaler (intell.app.core.compact_forest)
+COMPACT_MODEL_PATH = os.path.join(MODEL_DIR, "mood_model.npz")
+ENVIRONMENT_MODEL = "environment"
+
+categorical_features = ['time_of_day', 'music_genre', 'movement']
+num_features = ['brightness', 'light_color_temp', 'room_temp', 'sound_level']
+label_map = {0: 'Neutral', 1: 'Stressed', 2: 'Energetic', 3: 'Relaxed', 4: 'Sad'}
+
+
+@lru_cache(maxsize=1)
+def load_sklearn_assets():
+    """The pickled (model, encoder, scaler)."""
+    return joblib.load(MODEL_PATH), joblib.load(ENCODER_PATH), joblib.load(SCALER_PATH)
+
+
+def _encoder_categories(encoder) -> dict:
+    # The encoder's missing-genre category is NaN, named 'music_genre_nan' in the model's columns
+    return {field: ['nan' if pd.isna(value) else str(value) for value in categories]
+            for field, categories in zip(categorical_features, encoder.categories_)}
+
+
+def export_environment_model(output_path: str = COMPACT_MODEL_PATH):
+    """Exports the pickled model, encoder categories and scaler to one .npz file."""
+    sk_model, sk_encoder, sk_scaler = load_sklearn_assets()
+    categories = {f"categories_{field}": values for field, values in _encoder_categories(sk_encoder).items()}
+    export_forest(sk_model, output_path, sources=(MODEL_PATH, ENCODER_PATH, SCALER_PATH),
+                  feature_columns=[str(col) for col in sk_model.feature_names_in_],
+                  scaler_mean=sk_scaler.mean_, scaler_scale=sk_scaler.scale_, **categories)
+
+
+def load_environment_assets(path: str) -> dict:
+    """
+    Loads the model with its feature spec: from the compact export when path is
+    the .npz, from the pickles otherwise. Returns {'model', 'columns', 'spec'}.
+    """
+    if path.endswith(".npz"):
+        model, extra = CompactForest.load(path)
+        columns = extra['feature_columns'].tolist()
+        categories = {field: extra[f'categories_{field}'].tolist() for field in categorical_features}
+        mean, scale = extra['scaler_mean'], extra['scaler_scale']
+    else:
+        model, encoder, scaler = load_sklearn_assets()
+        # Dummy column reference (set from training)
+        columns = list(model.feature_names_in_)
+        categories = _encoder_categories(encoder)
+        mean, scale = scaler.mean_, scaler.scale_
+
+    spec = FeatureSpec(
+        columns,
+        categorical=categories,
+        mean=mean,
+        scale=scale,
+        scaled_columns=num_features,
+        handle_unknown='error',
+        missing_category='nan',
+    )
+    return {'model': model, 'columns': columns, 'spec': spec}
+
+
+def warm_up_environment(assets: dict):
+    """One dummy prediction, so the first real request does not pay first-call costs."""
+    _predict(assets['model'], assets['spec'].encode_one(generate_mock_iot_data()))
+
+
+def _predict(model, X):
+    # The sklearn model was fitted on a DataFrame and is fed the spec's array of the same
+    # columns; its feature-name warning is silenced for this call only
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+        return model.predict(X)
+
+
+def _load_serving_assets(model_path: str) -> dict:
+    # Chosen at every (re)load: the compact export when it was made from the current pickles
+    if is_current(COMPACT_MODEL_PATH, model_path, ENCODER_PATH, SCALER_PATH):
+        return load_environment_assets(COMPACT_MODEL_PATH)
+    # A reload after new pickles were published must not get the cached old ones
+    load_sklearn_assets.cache_clear()
+    return load_environment_assets(model_path)
+
+
+# Nothing is loaded at import: the registry loads the model on first use or at startup preload.
+# A missing file then fails the environment routes only (FileNotFoundError), not the whole app.
+# Publishing new pickles or a new export swaps the model in.
+model_registry.register(ENVIRONMENT_MODEL, MODEL_PATH, _load_serving_assets, warm_up_environment,
+                        watch=(MODEL_PATH, ENCODER_PATH, SCALER_PATH, COMPACT_MODEL_PATH))
+
+
+def environment_assets() -> dict:
+    """The loaded {'model', 'columns', 'spec'}; raises FileNotFoundError when the model files are missing."""
+    return model_registry.get(ENVIRONMENT_MODEL)
+
+
+def predict_environment_mood(iot_data: dict = None) -> dict:
+    """
+    Predicts the room mood from one IoT reading (a mock one if none is given).
+    Returns the same payload as GET /predict-mood.
+    Raises ValueError for a category the encoder was not trained on.
+    """
+    if iot_data is None:
+        iot_data = generate_mock_iot_data()
+
+    assets = environment_assets()
+    with model_registry.timed(ENVIRONMENT_MODEL):
+        pred = _predict(assets['model'], assets['spec'].encode_one(iot_data))[0]
+    mood = label_map[int(pred)]
+
+    return {
+        "iot_input": iot_data,
+        "predicted_mood": mood
+    }
+
+
+def encode_with_pandas(readings: list) -> pd.DataFrame:
+    """Reference pandas encoding of IoT readings; the FeatureSpec built by load_environment_assets produces the same values."""
+    _, encoder, scaler = load_sklearn_assets()
+    input_df = pd.DataFrame(readings)
+
+    # Fill None (missing genre) with 'nan' string so encoder handles it
+    input_df['music_genre'] = input_df['music_genre'].fillna('nan')
+
+    # Encode categorical features
+    cat_encoded = encoder.transform(input_df[categorical_features])
+    cat_encoded_df = pd.DataFrame(cat_encoded, columns=encoder.get_feature_names_out(categorical_features))
+
+    # Scale numerical features
+    num_scaled = scaler.transform(input_df[num_features])
+    num_scaled_df = pd.DataFrame(num_scaled, columns=num_features)
+
+    combined_df = pd.concat([num_scaled_df, cat_encoded_df], axis=1)
+
+    # Ensure same column order as training
+    feature_columns = environment_assets()['columns']
+    for col in feature_columns:
+        if col not in combined_df.columns:
+            combined_df[col] = 0
+    return combined_df[feature_columns]
@@ -0,0 +1,54 @@
+from backend.services.signals import collect_signals
+from intell.app.core.calendar.free_slots import compute_free_slots
+from intell.app.config import settings
+
+# --- Helper Functions ---
+def minutes_to_hm(mins):
+    if mins < 0:
+        mins = 0
+    hours = int(mins / 60)
+    minutes = round(mins % 60)
+    if minutes == 60:
+        hours += 1
+        minutes = 0
+    return f"{hours}h {minutes}m"
+
+def calendar_free_slots(cal_data):
+    """
+    Free time within waking hours (07:00-midnight IST) for the days spanned by the events.
+    Returns (free_slots, total_free_minutes); each slot keeps the legacy "Xh Ym" duration
+    next to the numeric duration_minutes.
+    """
+    result = compute_free_slots([cal_data] if cal_data else [])
+    free_slots = [
+        {**slot, "duration": minutes_to_hm(slot["duration_minutes"])}
+        for slot in result["free_slots"]
+    ]
+    return free_slots, result["total_free_minutes"]
+
+
+async def build_final_recommendation(user_id: str = settings.DEFAULT_USER_ID):
+    """
+    Gathers the environment, smartwatch, voice and calendar signals in-process and
+    consolidates them into the /trigger/final-recommendation payload.
+    Signals are read from the per-user snapshot cache; sources served past their
+    TTL or that missed their latency budget are listed under "stale_sources"
+    (with their last good value, or null if there is none).
+    """
+    signals, stale_sources = await collect_signals(user_id)
+    env_data = signals["environment"] or {}
+    sw_data = signals["smartwatch"] or {}
+    voice_data = signals["voice"] or {}
+    cal_data = signals["calendar"]
+
+    free_slots, total_free_minutes = calendar_free_slots(cal_data)
+
+    return {
+        "environment_mood": env_data.get("predicted_mood"),
+        "smartwatch_mood": sw_data.get("predicted_mood"),
+        "voice_mood": voice_data.get("predicted_emotion"),
+        "calendar_free_slots": free_slots,
+        "calendar_total_free": minutes_to_hm(total_free_minutes),
+        "calendar_total_free_minutes": total_free_minutes,
+        "stale_sources": stale_sources
+    }
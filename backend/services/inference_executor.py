@@ -0,0 +1,160 @@
+"""
+Shared executor for CPU-bound model work called from async endpoints.
+
+Every prediction (librosa feature extraction, Keras, the forests) runs on one
+bounded thread pool sized to the cores, never on the event loop. A thread pool
+suits this work because the models are loaded once in this process and their
+NumPy, TensorFlow and sklearn kernels release the GIL. Each model also has
+its own concurrency limit (an asyncio semaphore), so a burst of slow voice
+requests cannot take every thread away from the fast smartwatch model.
+
+A call is "waiting" from submission until a pool thread starts it. That covers
+both the wait for the model's limit and the wait for a free thread.
+Queue depth, wait time and run time are kept per model and exposed by stats().
+"""
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from collections import deque
+
+from intell.app.config import settings
+
+# Wait and run times kept per model for the percentiles in stats()
+LATENCY_WINDOW = 1000
+
+
+def _ms(seconds):
+    return round(1000 * seconds, 3) if seconds is not None else None
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else None
+
+
+class _ModelLane:
+    """Concurrency limit and counters of one model."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.loop = None
+        self.semaphore = None
+        self.waiting = 0
+        self.running = 0
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+        self.runs = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"calls": 0, "errors": 0, "cancelled": 0, "max_waiting": 0,
+                      "wait_seconds_total": 0.0, "run_seconds_total": 0.0}
+
+
+class InferenceExecutor:
+    def __init__(self, max_workers: int = None, limits: dict = None):
+        """
+        max_workers: pool threads (default: one per core).
+        limits: {model: concurrent calls}; models without one may use the whole pool.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix="inference")
+        self._limits = {name: limit for name, limit in (limits or {}).items() if limit}
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def _lane(self, model: str) -> _ModelLane:
+        with self._lock:
+            lane = self._lanes.get(model)
+            if lane is None:
+                lane = self._lanes[model] = _ModelLane(min(self._limits.get(model, self.max_workers), self.max_workers))
+            return lane
+
+    async def run(self, model: str, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) on the pool within the model's limit and returns its result."""
+        lane = self._lane(model)
+        loop = asyncio.get_running_loop()
+        if lane.loop is not loop:
+            # Semaphores belong to one event loop
+            lane.loop, lane.semaphore = loop, asyncio.Semaphore(lane.limit)
+        semaphore = lane.semaphore
+
+        submitted = time.perf_counter()
+        state = {"started": None}
+        with self._lock:
+            lane.stats["calls"] += 1
+            lane.waiting += 1
+            lane.stats["max_waiting"] = max(lane.stats["max_waiting"], lane.waiting)
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                state["started"] = started
+                lane.waiting -= 1
+                lane.running += 1
+                lane.waits.append(started - submitted)
+                lane.stats["wait_seconds_total"] += started - submitted
+            return fn(*args, **kwargs)
+
+        def done(future):
+            # Runs when the work has really finished (or was cancelled before it started),
+            # so a cancelled caller never lets more than `limit` calls run at once
+            with self._lock:
+                if state["started"] is None:
+                    lane.waiting -= 1
+                    lane.stats["cancelled"] += 1
+                else:
+                    elapsed = time.perf_counter() - state["started"]
+                    lane.running -= 1
+                    lane.runs.append(elapsed)
+                    lane.stats["run_seconds_total"] += elapsed
+                    if not future.cancelled() and future.exception() is not None:
+                        lane.stats["errors"] += 1
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # The loop is closed; nothing waits on its semaphore any more
+
+        try:
+            await semaphore.acquire()
+        except asyncio.CancelledError:
+            with self._lock:
+                lane.waiting -= 1
+                lane.stats["cancelled"] += 1
+            raise
+        future = self._pool.submit(call)
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lanes = {name: (lane.limit, lane.waiting, lane.running, dict(lane.stats), list(lane.waits), list(lane.runs))
+                     for name, lane in self._lanes.items()}
+        models = {}
+        for name, (limit, waiting, running, stats, waits, runs) in lanes.items():
+            finished = stats["calls"] - waiting - running - stats["cancelled"]
+            models[name] = {
+                "limit": limit,
+                "waiting": waiting,
+                "running": running,
+                **{key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()},
+                "wait_avg_ms": _ms(stats["wait_seconds_total"] / (stats["calls"] - waiting - stats["cancelled"]))
+                if stats["calls"] - waiting - stats["cancelled"] > 0 else None,
+                "wait_p95_ms": _ms(_percentile(waits, 0.95)),
+                "run_avg_ms": _ms(stats["run_seconds_total"] / finished) if finished > 0 else None,
+                "run_p95_ms": _ms(_percentile(runs, 0.95)),
+            }
+        return {
+            "max_workers": self.max_workers,
+            "waiting": sum(model["waiting"] for model in models.values()),
+            "running": sum(model["running"] for model in models.values()),
+            "models": models,
+        }
+
+
+inference_executor = InferenceExecutor(
+    max_workers=settings.INFERENCE_MAX_WORKERS or None,
+    limits={
+        "environment": settings.INFERENCE_CONCURRENCY_ENVIRONMENT,
+        "smartwatch": settings.INFERENCE_CONCURRENCY_SMARTWATCH,
+        "voice": settings.INFERENCE_CONCURRENCY_VOICE,
+    },
+)
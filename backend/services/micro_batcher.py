@@ -0,0 +1,83 @@
+"""
+Async micro-batching for models that predict many samples as cheaply as one.
+
+Concurrent submit() calls are queued; the queue is flushed as one batch when it
+reaches `max_batch_size`, or `max_wait_seconds` after the first sample arrived,
+whichever comes first. The batch function runs through `run` (by default in a
+worker thread), and each caller gets the prediction for its own sample.
+"""
+import asyncio
+import logging
+
+
+class MicroBatcher:
+    def __init__(self, predict_batch, max_batch_size: int = 64, max_wait_seconds: float = 0.005,
+                 run=asyncio.to_thread):
+        """
+        predict_batch(list of samples) -> list of predictions, in the same order.
+        run(fn, *args): awaitable that runs fn off the event loop.
+        """
+        self.predict_batch = predict_batch
+        self.run = run
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._loop = None
+        self._pending = []    # (sample, future)
+        self._timer = None
+        self._stats = {"requests": 0, "batches": 0, "full_batches": 0, "batch_errors": 0, "largest_batch": 0}
+
+    async def submit(self, sample):
+        """Queues one sample and returns its prediction."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures and timers belong to one event loop
+            self._loop, self._pending, self._timer = loop, [], None
+
+        future = loop.create_future()
+        self._pending.append((sample, future))
+        self._stats["requests"] += 1
+        if len(self._pending) >= self.max_batch_size:
+            self._stats["full_batches"] += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        self._stats["batches"] += 1
+        self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+        samples = [sample for sample, _ in batch]
+        try:
+            results = await self.run(self.predict_batch, samples)
+        except Exception as e:
+            self._stats["batch_errors"] += 1
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # One bad sample must not fail the requests it was merged with:
+            # predict each sample on its own so only that one fails
+            logging.warning(f"Batch of {len(batch)} failed ({e}); retrying its samples one by one.")
+            await asyncio.gather(*(self._run([item]) for item in batch))
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "avg_batch_size": round(self._stats["requests"] / batches, 2) if batches else None,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
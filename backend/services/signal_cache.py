@@ -0,0 +1,103 @@
+"""
+Per-user snapshot cache for the mood and calendar signal sources.
+
+Entries are keyed by (user_id, source) and expire after a per-source TTL. An
+expired entry is still served while a single background refresh replaces it
+(stale-while-revalidate), so request handlers almost always read from memory.
+At most `max_entries` snapshots are kept; the least recently used are evicted.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 40000
+
+
+class SignalSnapshotCache:
+    def __init__(self, ttls: dict, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttls = dict(ttls)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (user_id, source) -> (payload, fetched_at), least recently used first
+        self._refreshing = {}  # (user_id, source) -> asyncio.Task, while it runs
+        self._evictions = 0
+        self._stats = {
+            source: {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+            for source in self.ttls
+        }
+
+    def get(self, user_id: str, source: str):
+        """
+        Looks up the cached payload for a source.
+        Returns (payload, is_fresh); payload is None when nothing is cached yet.
+        """
+        entry = self._entries.get((user_id, source))
+        stats = self._stats[source]
+        if entry is None:
+            stats["misses"] += 1
+            return None, False
+        self._entries.move_to_end((user_id, source))
+        payload, fetched_at = entry
+        if time.monotonic() - fetched_at <= self.ttls[source]:
+            stats["hits"] += 1
+            return payload, True
+        stats["stale_hits"] += 1
+        return payload, False
+
+    def refresh(self, user_id: str, source: str, fetch) -> asyncio.Task:
+        """
+        Starts a background refresh of one entry using the `fetch` coroutine function.
+        A refresh already running for the same key is returned instead of starting another.
+        """
+        key = (user_id, source)
+        task = self._refreshing.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._refresh(key, fetch))
+            task.add_done_callback(self._log_failure)
+            task.add_done_callback(lambda done, key=key: self._forget_refresh(key, done))
+            self._refreshing[key] = task
+        return task
+
+    def _forget_refresh(self, key, task):
+        if self._refreshing.get(key) is task:
+            del self._refreshing[key]
+
+    async def _refresh(self, key, fetch):
+        user_id, source = key
+        stats = self._stats[source]
+        try:
+            payload = await fetch()
+        except Exception:
+            stats["refresh_errors"] += 1
+            raise
+        stats["refreshes"] += 1
+        self._entries[key] = (payload, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+        return payload
+
+    @staticmethod
+    def _log_failure(task):
+        # Retrieve failures of refreshes nobody awaited so they are logged here
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Signal refresh failed: {task.exception()}")
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters per source, with the configured TTL and hit ratio."""
+        report = {}
+        for source, counts in self._stats.items():
+            lookups = counts["hits"] + counts["stale_hits"] + counts["misses"]
+            report[source] = {
+                **counts,
+                "ttl_seconds": self.ttls[source],
+                "hit_ratio": round(counts["hits"] / lookups, 4) if lookups else None,
+            }
+        report["entries"] = len(self._entries)
+        report["max_entries"] = self.max_entries
+        report["evictions"] = self._evictions
+        return report
@@ -0,0 +1,168 @@
+"""
+In-process signal sources for the mood/calendar triggers.
+
+Each source returns the same payload as its HTTP route, so the routers, the
+final-recommendation aggregator and the recommendation engine can await them
+directly instead of calling back into the server over HTTP.
+"""
+import asyncio
+import glob
+import logging
+import os
+import random
+from functools import partial
+
+from intell.app.core.smart_watch.watch_value_generator import generate_sample_row
+from intell.app.core.smart_watch.predict_smartwatch import predict_batch_moods
+from intell.app.core.smart_watch.stream_features import StreamFeatureEngine
+from intell.app.core.speech_model.speech_model import predict_emotion
+from intell.app.core.calendar.google_calendar import CalendarUnavailable
+from intell.app.core.calendar.event_store import get_event_store
+from backend.services.environment_model import predict_environment_mood
+from backend.services.signal_cache import SignalSnapshotCache
+from backend.services.micro_batcher import MicroBatcher
+from backend.services.inference_executor import inference_executor
+from intell.app.config import settings
+
+VOICE_FILES_DIR = "backend/voice_files"
+
+
+class SignalUnavailable(Exception):
+    """Raised when a source cannot produce a value; carries the HTTP status and body its route returns."""
+
+    def __init__(self, status_code: int, payload: dict):
+        super().__init__(payload.get("error") or payload.get("detail"))
+        self.status_code = status_code
+        self.payload = payload
+
+
+async def environment_signal() -> dict:
+    """Environment (IoT) mood, as returned by GET /predict-mood."""
+    try:
+        return await inference_executor.run("environment", predict_environment_mood)
+    except FileNotFoundError as e:
+        raise SignalUnavailable(503, {"detail": f"Environment model unavailable: {e}"})
+
+
+# Merges concurrent smartwatch predictions into one vectorised predict call
+smartwatch_batcher = MicroBatcher(predict_batch_moods,
+                                  max_batch_size=settings.SMARTWATCH_BATCH_MAX_SIZE,
+                                  max_wait_seconds=settings.SMARTWATCH_BATCH_WINDOW_MS / 1000,
+                                  run=partial(inference_executor.run, "smartwatch"))
+
+# Rolling-window features of the watches streaming telemetry to the server
+stream_features = StreamFeatureEngine(windows=settings.SMARTWATCH_STREAM_WINDOWS,
+                                      max_devices=settings.SMARTWATCH_STREAM_MAX_DEVICES)
+
+
+async def predict_smartwatch_sample(sample_row: dict):
+    """Mood for one smartwatch sample, micro-batched with concurrent requests."""
+    try:
+        return await smartwatch_batcher.submit(sample_row)
+    except (FileNotFoundError, KeyError) as e:
+        raise SignalUnavailable(503, {"detail": f"Smartwatch model unavailable: {e}"})
+    except ValueError as e:
+        raise SignalUnavailable(422, {"detail": f"Invalid smartwatch sample: {e}"})
+
+
+async def smartwatch_signal() -> dict:
+    """Smartwatch mood, as returned by GET /trigger/smartwatch_prediction."""
+    sample_row = generate_sample_row()
+    prediction = await predict_smartwatch_sample(sample_row)
+    return {"sample": sample_row, "predicted_mood": prediction}
+
+
+async def voice_signal() -> dict:
+    """Voice emotion for a random .wav in the voice_files folder, as returned by GET /trigger/voice."""
+    wav_files = glob.glob(os.path.join(VOICE_FILES_DIR, '*.wav'))
+    if not wav_files:
+        raise SignalUnavailable(404, {"error": "No .wav files found in voice_files folder."})
+    file_path = random.choice(wav_files)
+    try:
+        logging.debug(f"Scoring voice file {file_path}")
+        predicted_emotion = await inference_executor.run("voice", predict_emotion, file_path)
+    except Exception as e:
+        raise SignalUnavailable(500, {"filename": os.path.basename(file_path), "error": str(e)})
+    return {
+        "filename": os.path.basename(file_path),
+        "predicted_emotion": predicted_emotion
+    }
+
+
+async def calendar_signal(user_id: str = settings.DEFAULT_USER_ID) -> dict:
+    """
+    Upcoming calendar events, as returned by GET /trigger/calendar.
+    Read from the local event store, which is synced incrementally when due; if the
+    sync fails, previously stored events are returned marked "stale".
+    """
+    try:
+        return await asyncio.to_thread(get_event_store().synced_events, user_id)
+    except CalendarUnavailable as e:
+        raise SignalUnavailable(502, {"detail": f"Calendar error: {e}"})
+
+
+SIGNAL_SOURCES = {
+    "environment": environment_signal,
+    "smartwatch": smartwatch_signal,
+    "voice": voice_signal,
+    "calendar": calendar_signal,
+}
+
+# Sources whose value depends on the user; they are called with the user_id
+USER_SIGNAL_SOURCES = {"calendar"}
+
+SIGNAL_BUDGETS = {
+    "environment": settings.SIGNAL_BUDGET_ENVIRONMENT,
+    "smartwatch": settings.SIGNAL_BUDGET_SMARTWATCH,
+    "voice": settings.SIGNAL_BUDGET_VOICE,
+    "calendar": settings.SIGNAL_BUDGET_CALENDAR,
+}
+
+SIGNAL_TTLS = {
+    "environment": settings.SIGNAL_TTL_ENVIRONMENT,
+    "smartwatch": settings.SIGNAL_TTL_SMARTWATCH,
+    "voice": settings.SIGNAL_TTL_VOICE,
+    "calendar": settings.SIGNAL_TTL_CALENDAR,
+}
+
+# Last good payload per (user, source); also what a source falls back to when it misses its budget
+signal_cache = SignalSnapshotCache(SIGNAL_TTLS, max_entries=settings.SIGNAL_CACHE_MAX_ENTRIES)
+
+
+async def _signal_within_budget(user_id: str, name: str, budget: float):
+    payload, is_fresh = signal_cache.get(user_id, name)
+    if is_fresh:
+        return payload, False
+
+    fetch = SIGNAL_SOURCES[name]
+    if name in USER_SIGNAL_SOURCES:
+        fetch = partial(fetch, user_id)
+    task = signal_cache.refresh(user_id, name, fetch)
+    if payload is not None:
+        # Stale-while-revalidate: answer from memory, the refresh completes in the background
+        return payload, True
+
+    try:
+        # shield() lets a slow call finish in the background and still populate the cache
+        return await asyncio.wait_for(asyncio.shield(task), budget), False
+    except asyncio.TimeoutError:
+        logging.warning(f"Signal source '{name}' exceeded its {budget}s budget; serving last known value.")
+    except Exception as e:
+        logging.warning(f"Signal source '{name}' failed: {e}; serving last known value.")
+    return None, True
+
+
+async def collect_signals(user_id: str = settings.DEFAULT_USER_ID, budgets: dict = None):
+    """
+    Reads all four sources for a user from the snapshot cache, fetching missing ones
+    concurrently, each bounded by its latency budget.
+    Returns ({source: payload or None}, [stale sources]); a source is stale when it was
+    served past its TTL, or timed out/failed with nothing cached (payload None).
+    """
+    budgets = {**SIGNAL_BUDGETS, **(budgets or {})}
+    names = list(SIGNAL_SOURCES)
+    outcomes = await asyncio.gather(*(_signal_within_budget(user_id, name, budgets[name]) for name in names))
+
+    payloads = {name: payload for name, (payload, _) in zip(names, outcomes)}
+    stale = [name for name, (_, is_stale) in zip(names, outcomes) if is_stale]
+    return payloads, stale
@@ -0,0 +1,74 @@
+"""
+Startup profile of the backend.
+
+backend.main imports each of its components through startup_profile.component(),
+which records how long the import took. A module shared by several routers is
+counted in the first component that imports it. Model load and warm-up times
+come from the model registry, once each model has loaded (at the startup
+preload or on its first request).
+
+GET /health/startup serves the report. To print it, with every model loaded
+synchronously:
+    python -m backend.services.startup_profile
+"""
+import time
+from contextlib import contextmanager
+
+from intell.app.core.model_registry import model_registry
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.components = {}  # name -> seconds, in import order
+        self.ready_seconds = None
+
+    @contextmanager
+    def component(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.components[name] = time.perf_counter() - started
+
+    def mark_ready(self):
+        """Called when the app starts serving requests."""
+        self.ready_seconds = time.perf_counter() - self.started
+
+    def report(self) -> dict:
+        models = model_registry.health()
+        return {
+            "components": {name: round(seconds, 4) for name, seconds in self.components.items()},
+            "components_seconds": round(sum(self.components.values()), 4),
+            "ready_seconds": round(self.ready_seconds, 4) if self.ready_seconds is not None else None,
+            "models": {name: {"loaded": model["loaded"], "load_seconds": model["load_seconds"],
+                              "warmup_seconds": model["warmup_seconds"], "last_error": model["last_error"]}
+                       for name, model in models.items()},
+        }
+
+
+startup_profile = StartupProfile()
+
+
+def _print_profile():
+    started = time.perf_counter()
+    import backend.main  # noqa: F401
+    # Run as a script, this file is __main__: backend.main recorded into the imported module's profile
+    from backend.services.startup_profile import startup_profile as profile
+    imported = time.perf_counter() - started
+    model_registry.preload()
+    report = profile.report()
+
+    print(f"{'component':<55} {'seconds':>8}")
+    for name, seconds in report["components"].items():
+        print(f"{name:<55} {seconds:8.3f}")
+    print(f"{'import backend.main (total)':<55} {imported:8.3f}")
+    for name, model in report["models"].items():
+        if model["loaded"]:
+            print(f"{'model ' + name + ' load (+ warm-up)':<55} {model['load_seconds']:8.3f} (+{model['warmup_seconds']:.3f})")
+        else:
+            print(f"{'model ' + name:<55} {'failed':>8}  {model['last_error']}")
+
+
+if __name__ == "__main__":
+    _print_profile()
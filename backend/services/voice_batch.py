@@ -0,0 +1,83 @@
+"""
+Batch voice scoring behind POST /trigger/voice/batch.
+
+All batch requests share one long-lived ExtractionPool of VOICE_BATCH_WORKERS
+processes, started by the first request and stopped with the app. At most
+VOICE_BATCH_MAX_CONCURRENT batches run at once; start() raises BatchBusy
+beyond that, which the route answers with 429. Each predict call of a batch
+runs on the shared inference executor, within the voice model's limit.
+"""
+import asyncio
+import os
+import threading
+import weakref
+
+from backend.services.inference_executor import inference_executor
+from intell.app.core.speech_model.batch_scoring import ExtractionPool, score_files
+from intell.app.core.speech_model.speech_model import mfcc_cache, predict_emotions
+from intell.app.config import settings
+
+
+class BatchBusy(Exception):
+    """Raised when the maximum number of batches is already running."""
+
+
+class VoiceBatchRunner:
+    def __init__(self, workers: int, max_concurrent: int, cache):
+        """workers: extraction processes (0: one per core)."""
+        self.cache = cache
+        self.max_concurrent = max_concurrent
+        self.pool = ExtractionPool(workers or os.cpu_count() or 1, cache.cache_dir, cache.params)
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def start(self, paths, batch_size: int):
+        """
+        Takes a batch slot and returns the iterator of score_files records; raises
+        BatchBusy when none is free. The slot is given back when the iterator is
+        exhausted, closed or discarded. Called on the event loop; the iterator is
+        meant for a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+
+        def predict_batch(matrix):
+            # Blocks the iterating thread, not the loop, until the executor has scored the batch
+            return asyncio.run_coroutine_threadsafe(
+                inference_executor.run("voice", predict_emotions, matrix), loop).result()
+
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                raise BatchBusy(f"{self._active} voice batches are already running")
+            self._active += 1
+        release = self._release_once()
+        records = self._records(paths, predict_batch, batch_size, release)
+        # A response that is dropped before it starts never runs the generator's finally
+        weakref.finalize(records, release)
+        return records
+
+    def _release_once(self):
+        released = False
+
+        def release():
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self._active -= 1
+        return release
+
+    def _records(self, paths, predict_batch, batch_size, release):
+        try:
+            yield from score_files(paths, predict_batch, batch_size=batch_size, cache=self.cache, pool=self.pool)
+        finally:
+            release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active": self._active, "max_concurrent": self.max_concurrent, "workers": self.pool.workers}
+
+    def close(self):
+        self.pool.close()
+
+
+voice_batches = VoiceBatchRunner(settings.VOICE_BATCH_WORKERS, settings.VOICE_BATCH_MAX_CONCURRENT, mfcc_cache)
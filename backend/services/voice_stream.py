@@ -0,0 +1,48 @@
+"""
+Live voice emotion sessions.
+
+A session takes raw audio chunks as they arrive (from a WebSocket or a chunked
+upload), folds them into a StreamingMfcc and, every `interval` seconds of
+audio, predicts the emotion of everything heard so far from the running mean
+MFCC. Memory per session is fixed however long it runs. The feature work
+(FFT, mel and histogram updates) and the predictions run on the shared
+inference executor, within the voice model's limit, never on the event loop.
+"""
+from backend.services.inference_executor import inference_executor
+from intell.app.core.speech_model.speech_model import predict_emotions
+from intell.app.core.speech_model.stream_mfcc import StreamingMfcc
+
+
+class VoiceStream:
+    def __init__(self, sample_rate: int, sample_format: str, interval: float):
+        """Raises ValueError for an unknown sample format or a non-positive rate."""
+        self.mfcc = StreamingMfcc(sample_rate=sample_rate, sample_format=sample_format)
+        self.interval = interval
+        self._next_prediction = interval
+
+    async def feed(self, data: bytes):
+        """Adds a chunk of audio; returns a prediction when another interval has been received, else None."""
+        await inference_executor.run("voice", self.mfcc.push_bytes, data)
+        if self.mfcc.seconds < self._next_prediction or not self.mfcc.frames:
+            return None
+        while self._next_prediction <= self.mfcc.seconds:
+            self._next_prediction += self.interval
+        return await self._predict(final=False)
+
+    async def finish(self) -> dict:
+        """Ends the stream; returns the prediction over the whole of it."""
+        if not self.mfcc.samples_in:
+            return {"final": True, "seconds": 0.0, "error": "No audio received."}
+        await inference_executor.run("voice", self.mfcc.finish)
+        return await self._predict(final=True)
+
+    async def _predict(self, final: bool) -> dict:
+        mfcc_avg = self.mfcc.mean_mfcc()
+        (label, confidence), = await inference_executor.run("voice", predict_emotions, mfcc_avg[None, :])
+        return {
+            "final": final,
+            "seconds": round(self.mfcc.seconds, 3),
+            "frames": self.mfcc.frames,
+            "predicted_emotion": label,
+            "confidence": round(confidence, 4),
+        }
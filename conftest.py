@@ -0,0 +1,4 @@
+"""
+Root of the test suite: its presence puts the repo root on sys.path, so
+`pytest` imports the intell and backend packages the way the app does.
+"""
@@ -20,22 +20,55 @@ const Recommendations = () => {
         console.log('Mood data changed:', moodData);
     }, [moodData]);
 
+    // Rebuilds a v1-shaped slot (full movie records) from a streamed v2 slot record
+    const expandSlot = (record, movieTable, firstId) => {
+        const { type, movie_refs, new_movies, ...slot } = record;
+        return {
+            ...slot,
+            fitting_movies: movie_refs.map((ref, i) => ({ id: firstId + i, ...movieTable[ref] })),
+        };
+    };
+
     const fetchRecommendations = async () => {
         try {
             setLoading(true);
-            const response = await fetch('http://127.0.0.1:8000/recommendations-engine/');
+            // NDJSON stream: a moods record, then one record per slot, then an end record
+            const response = await fetch('http://127.0.0.1:8000/recommendations-engine/stream');
             if (!response.ok) {
                 throw new Error('Failed to fetch recommendations');
             }
             console.log('Response:', response);
-            const data = await response.json();
-            console.log('API Response:', data);
-            setRecommendations(data);
-            
-            // Set mood data from the first item
-            if (data.length > 0) {
-                console.log('Setting mood data from first item:', data[0]);
-                setMoodData(data[0]);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            const movieTable = [];
+            let nextMovieId = 1;
+            let buffered = '';
+
+            const handleRecord = (record) => {
+                if (record.type === 'moods') {
+                    console.log('Setting mood data:', record.moods);
+                    setMoodData(record.moods);
+                    // Render the page as soon as the moods are known; slots fill in as they arrive
+                    setLoading(false);
+                } else if (record.type === 'slot') {
+                    movieTable.push(...record.new_movies);
+                    const slot = expandSlot(record, movieTable, nextMovieId);
+                    nextMovieId += slot.fitting_movies.length;
+                    setRecommendations(prev => [...prev, slot]);
+                }
+            };
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffered += decoder.decode(value, { stream: true });
+                const lines = buffered.split('\n');
+                buffered = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => handleRecord(JSON.parse(line)));
+            }
+            if (buffered.trim()) {
+                handleRecord(JSON.parse(buffered));
             }
         } catch (err) {
             setError(err.message);
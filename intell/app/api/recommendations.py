@@ -1,5 +1,7 @@
-from fastapi import APIRouter
-from app.core.recommendations import engine
+from fastapi import APIRouter, HTTPException
+from intell.app.core.recommendation_engine import engine
+from intell.app.core.recommendation_engine.ranked_store import RankedStoreMissing
+from backend.services.final_recommendation import build_final_recommendation
 
 router = APIRouter()
 
@@ -11,6 +13,11 @@ async def run_recommendation_engine(user_id: str):
     This endpoint triggers the recommendation process and returns
     a list of recommended items.
     """
-    # In a production system, you might run this as a background task
-    recommendations = engine.get_recommendations(user_id)
-    return recommendations 
\ No newline at end of file
+    user_data = await build_final_recommendation(user_id)
+    try:
+        recommendations = await engine.get_slot_movie_recommendations(user_data, user_id=user_id)
+    except engine.UnknownUserError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RankedStoreMissing as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return recommendations
@@ -0,0 +1,88 @@
+"""
+Runtime tunables shared by the backend triggers and the intell core.
+Every value can be overridden through an environment variable of the same name.
+"""
+import os
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+# Latency budget (seconds) per signal source of /trigger/final-recommendation.
+# A source that misses its budget is reported from its last good value (or null).
+SIGNAL_BUDGET_ENVIRONMENT = _env_float("SIGNAL_BUDGET_ENVIRONMENT", 0.5)
+SIGNAL_BUDGET_SMARTWATCH = _env_float("SIGNAL_BUDGET_SMARTWATCH", 1.0)
+SIGNAL_BUDGET_VOICE = _env_float("SIGNAL_BUDGET_VOICE", 2.0)
+SIGNAL_BUDGET_CALENDAR = _env_float("SIGNAL_BUDGET_CALENDAR", 3.0)
+
+# Snapshot TTL (seconds) per signal source. Expired snapshots are still served
+# while a background refresh replaces them.
+SIGNAL_TTL_ENVIRONMENT = _env_float("SIGNAL_TTL_ENVIRONMENT", 60)
+SIGNAL_TTL_SMARTWATCH = _env_float("SIGNAL_TTL_SMARTWATCH", 30)
+SIGNAL_TTL_VOICE = _env_float("SIGNAL_TTL_VOICE", 30)
+SIGNAL_TTL_CALENDAR = _env_float("SIGNAL_TTL_CALENDAR", 300)
+# Snapshots kept at most (one per user and source); the least recently used are evicted
+SIGNAL_CACHE_MAX_ENTRIES = int(os.getenv("SIGNAL_CACHE_MAX_ENTRIES", 40000))
+
+# User served when a request does not name one
+DEFAULT_USER_ID = os.getenv("DEFAULT_USER_ID", "U0000")
+
+# Weight of each signal's mood when ranking recommendations; a higher weight
+# lets that signal's mood count more.
+MOOD_WEIGHT_ENVIRONMENT = _env_float("MOOD_WEIGHT_ENVIRONMENT", 1.0)
+MOOD_WEIGHT_SMARTWATCH = _env_float("MOOD_WEIGHT_SMARTWATCH", 1.0)
+MOOD_WEIGHT_VOICE = _env_float("MOOD_WEIGHT_VOICE", 1.0)
+
+# Best mood-matching titles considered per request by the slot engine
+RECOMMENDATION_CANDIDATE_POOL = int(os.getenv("RECOMMENDATION_CANDIDATE_POOL", 2000))
+
+# Build the sharded ranked store at startup when it is missing ("1"), or only
+# serve a store built offline with `python -m intell.app.core.recommendation_engine.ranked_store` ("0").
+RANKED_STORE_BUILD_ON_STARTUP = os.getenv("RANKED_STORE_BUILD_ON_STARTUP", "1") == "1"
+
+# Smartwatch inference: concurrent single-sample requests are merged into one
+# predict call of at most SMARTWATCH_BATCH_MAX_SIZE samples, waiting at most
+# SMARTWATCH_BATCH_WINDOW_MS for the batch to fill.
+SMARTWATCH_BATCH_MAX_SIZE = int(os.getenv("SMARTWATCH_BATCH_MAX_SIZE", 64))
+SMARTWATCH_BATCH_WINDOW_MS = _env_float("SMARTWATCH_BATCH_WINDOW_MS", 5)
+# Largest request accepted by POST /trigger/smartwatch_prediction/batch
+SMARTWATCH_BATCH_MAX_SAMPLES = int(os.getenv("SMARTWATCH_BATCH_MAX_SAMPLES", 10000))
+
+# Streaming smartwatch telemetry: rolling windows (in samples, about one a
+# second) kept per device, and how many devices are tracked at once (LRU).
+SMARTWATCH_STREAM_WINDOWS = tuple(int(w) for w in os.getenv("SMARTWATCH_STREAM_WINDOWS", "10,60,300").split(","))
+SMARTWATCH_STREAM_MAX_DEVICES = int(os.getenv("SMARTWATCH_STREAM_MAX_DEVICES", 10000))
+
+# Voice features: averaged MFCC vectors cached by file content, in memory (LRU
+# of at most VOICE_MFCC_CACHE_MAX_ENTRIES) and as .npy files in VOICE_MFCC_CACHE_DIR.
+VOICE_MFCC_CACHE_DIR = os.getenv("VOICE_MFCC_CACHE_DIR", "intell/app/outputs/mfcc_cache")
+VOICE_MFCC_CACHE_MAX_ENTRIES = int(os.getenv("VOICE_MFCC_CACHE_MAX_ENTRIES", 1024))
+
+# Batch voice scoring (POST /trigger/voice/batch): files are read from under
+# VOICE_BATCH_ROOT only, MFCCs are extracted by one shared pool of
+# VOICE_BATCH_WORKERS processes (0: one per core) and scored
+# VOICE_BATCH_PREDICT_SIZE files per predict call. At most
+# VOICE_BATCH_MAX_CONCURRENT batches run at once; more get a 429.
+VOICE_BATCH_ROOT = os.getenv("VOICE_BATCH_ROOT", "backend/voice_files")
+VOICE_BATCH_WORKERS = int(os.getenv("VOICE_BATCH_WORKERS", 2))
+VOICE_BATCH_PREDICT_SIZE = int(os.getenv("VOICE_BATCH_PREDICT_SIZE", 1024))
+VOICE_BATCH_MAX_CONCURRENT = int(os.getenv("VOICE_BATCH_MAX_CONCURRENT", 1))
+
+# Live voice streams (/trigger/voice/stream): seconds of audio between two
+# emotion predictions, unless the client asks for another interval.
+VOICE_STREAM_INTERVAL_SECONDS = _env_float("VOICE_STREAM_INTERVAL_SECONDS", 2.0)
+
+# Model inference from async endpoints runs on one shared pool of
+# INFERENCE_MAX_WORKERS threads (0: one per core). Each model may use at most
+# its INFERENCE_CONCURRENCY_* threads at once (0: the whole pool).
+INFERENCE_MAX_WORKERS = int(os.getenv("INFERENCE_MAX_WORKERS", 0))
+INFERENCE_CONCURRENCY_ENVIRONMENT = int(os.getenv("INFERENCE_CONCURRENCY_ENVIRONMENT", 0))
+INFERENCE_CONCURRENCY_SMARTWATCH = int(os.getenv("INFERENCE_CONCURRENCY_SMARTWATCH", 0))
+INFERENCE_CONCURRENCY_VOICE = int(os.getenv("INFERENCE_CONCURRENCY_VOICE", 0))
+
+# Models loaded in the background at startup, by registry name (smart_watch,
+# environment, speech), comma-separated: "all" for every registered model, ""
+# for none. Other models load on their first request. GET /health/models
+# reports ready once these are loaded.
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "all")
@@ -0,0 +1,250 @@
+"""
+Local per-user calendar event store kept current with Calendar sync tokens.
+
+The first sync of a user lists their events in full and stores them together
+with the nextSyncToken; every later sync sends that token and applies only the
+returned deltas (upserts, and deletes for cancelled events). When Google
+expires a token (HTTP 410) the user's events are dropped and fully re-synced.
+
+A user is synced at most once every `min_sync_interval` seconds; in between,
+reads are served from SQLite without any network call. When a sync fails,
+a user who was synced before is served their stored events, marked stale.
+
+Each user's primary calendar is read with their own credentials
+(google_calendar.token_file_for); a user without a token file cannot be synced.
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import google_auth_httplib2
+import httplib2
+from google.auth.exceptions import GoogleAuthError
+from googleapiclient.errors import HttpError
+
+from intell.app.core.calendar import google_calendar
+
+EVENT_STORE_PATH = os.getenv('CALENDAR_EVENT_STORE', 'intell/app/outputs/calendar_events.db')
+MIN_SYNC_INTERVAL = float(os.getenv('CALENDAR_MIN_SYNC_INTERVAL', 60))
+# Events older than this are not fetched by a full sync
+FULL_SYNC_LOOKBACK_DAYS = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    user_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    summary TEXT,
+    start_at TEXT NOT NULL,
+    end_at TEXT NOT NULL,
+    start_utc TEXT NOT NULL,
+    end_utc TEXT NOT NULL,
+    location TEXT,
+    description TEXT,
+    PRIMARY KEY (user_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_by_user_start ON events (user_id, start_utc);
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    last_sync REAL,
+    last_full_sync REAL
+);
+"""
+
+
+def _utc_key(value: str) -> str:
+    """Sortable UTC form of an event start/end (RFC 3339 dateTime or all-day date)."""
+    if len(value) == 10:
+        # All-day events are compared by their date
+        return value + "T00:00:00Z"
+    instant = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return instant.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class CalendarEventStore:
+    """SQLite-backed event store; safe to share between threads."""
+
+    def __init__(self, path: str = EVENT_STORE_PATH, min_sync_interval: float = MIN_SYNC_INTERVAL,
+                 api_endpoint: str = None):
+        self.path = path
+        self.min_sync_interval = min_sync_interval
+        self.api_endpoint = api_endpoint
+        self._local = threading.local()
+        self._user_locks = {}
+        self._locks_guard = threading.Lock()
+        self._stats = {"reads": 0, "syncs_skipped": 0, "incremental_syncs": 0,
+                       "full_syncs": 0, "token_expired": 0, "api_calls": 0, "stale_reads": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+        return conn
+
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    # --- Sync ---
+
+    def _count(self, name: str):
+        # Syncs run on worker threads
+        with self._locks_guard:
+            self._stats[name] += 1
+
+    def _list_pages(self, user_id: str, **params):
+        """Yields every page of events().list on the user's primary calendar; the last page carries nextSyncToken."""
+        creds = google_calendar.load_credentials(google_calendar.token_file_for(user_id))
+        service = google_calendar.get_calendar_service(self.api_endpoint)
+        page_token = None
+        while True:
+            http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+            request = service.events().list(calendarId='primary', singleEvents=True,
+                                            pageToken=page_token, **params)
+            page = request.execute(http=http)
+            self._count("api_calls")
+            yield page
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _apply(self, conn, user_id: str, items) -> None:
+        for event in items:
+            if event.get('status') == 'cancelled':
+                conn.execute("DELETE FROM events WHERE user_id = ? AND event_id = ?", (user_id, event['id']))
+                continue
+            start = event['start'].get('dateTime', event['start'].get('date'))
+            end = event['end'].get('dateTime', event['end'].get('date'))
+            conn.execute(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (user_id, event['id'], event.get('summary', 'No Title'), start, end,
+                 _utc_key(start), _utc_key(end),
+                 event.get('location', 'N/A'), event.get('description', 'N/A')))
+
+    def _full_sync(self, conn, user_id: str) -> str:
+        time_min = (datetime.datetime.utcnow() - datetime.timedelta(days=FULL_SYNC_LOOKBACK_DAYS)).isoformat() + 'Z'
+        sync_token = None
+        conn.execute("DELETE FROM events WHERE user_id = ?", (user_id,))
+        for page in self._list_pages(user_id, timeMin=time_min):
+            self._apply(conn, user_id, page.get('items', []))
+            sync_token = page.get('nextSyncToken', sync_token)
+        self._count("full_syncs")
+        return sync_token
+
+    def _incremental_sync(self, conn, user_id: str, sync_token: str) -> str:
+        for page in self._list_pages(user_id, syncToken=sync_token):
+            self._apply(conn, user_id, page.get('items', []))
+            sync_token = page.get('nextSyncToken', sync_token)
+        self._count("incremental_syncs")
+        return sync_token
+
+    def sync(self, user_id: str, force: bool = False) -> bool:
+        """
+        Brings the user's events up to date. Returns False when the last sync is
+        recent enough that no call was made.
+        """
+        with self._user_lock(user_id):
+            conn = self._connection()
+            row = conn.execute("SELECT sync_token, last_sync, last_full_sync FROM sync_state WHERE user_id = ?",
+                               (user_id,)).fetchone()
+            sync_token, last_sync, last_full_sync = row if row else (None, None, None)
+            now = time.time()
+            if not force and last_sync is not None and now - last_sync < self.min_sync_interval:
+                self._count("syncs_skipped")
+                return False
+
+            # Each sync is one transaction: a failed sync leaves the previous state intact
+            with conn:
+                if sync_token:
+                    try:
+                        sync_token = self._incremental_sync(conn, user_id, sync_token)
+                    except HttpError as error:
+                        if error.resp.status != 410:
+                            raise
+                        # The sync token expired: start over from a full listing
+                        logging.info(f"Calendar sync token for {user_id} expired; running a full sync.")
+                        self._count("token_expired")
+                        sync_token = None
+                if not sync_token:
+                    sync_token = self._full_sync(conn, user_id)
+                    last_full_sync = now
+                conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                             (user_id, sync_token, now, last_full_sync))
+            return True
+
+    # --- Reads ---
+
+    def events(self, user_id: str, days_ahead: int = 9) -> dict:
+        """
+        The user's stored events overlapping the next 'days_ahead' days, ordered by
+        start, in the same shape as google_calendar.fetch_calendar_events.
+        """
+        now = datetime.datetime.utcnow()
+        window_start = now.strftime('%Y-%m-%dT%H:%M:%SZ')
+        window_end = (now + datetime.timedelta(days=days_ahead)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        rows = self._connection().execute(
+            "SELECT summary, start_at, end_at, location, description FROM events "
+            "WHERE user_id = ? AND start_utc < ? AND end_utc > ? ORDER BY start_utc",
+            (user_id, window_end, window_start)).fetchall()
+        self._count("reads")
+        return {"events": [
+            {"summary": summary, "start": start, "end": end, "location": location, "description": description}
+            for summary, start, end, location, description in rows
+        ]}
+
+    def _sync_or_raise(self, user_id: str) -> None:
+        """sync(), with every Calendar API or credential failure raised as CalendarUnavailable."""
+        try:
+            self.sync(user_id)
+        except HttpError as error:
+            logging.error(f'An error occurred with Google Calendar API: {error}')
+            raise google_calendar.CalendarUnavailable(str(error)) from error
+        except (OSError, httplib2.HttpLib2Error) as error:
+            logging.error(f'Could not reach the Google Calendar API: {error}')
+            raise google_calendar.CalendarUnavailable(str(error)) from error
+        except GoogleAuthError as error:
+            # A token refresh during the sync failed
+            logging.error(f'Could not authorize the Google Calendar API for {user_id}: {error}')
+            raise google_calendar.CalendarUnavailable(str(error)) from error
+
+    def synced_events(self, user_id: str, days_ahead: int = 9) -> dict:
+        """
+        Syncs the user if due, then reads their events from the store.
+        When the sync fails for a user who has been synced before, their stored
+        events are returned with "stale": True and the epoch "last_sync"; a user
+        with nothing stored gets CalendarUnavailable.
+        """
+        try:
+            self._sync_or_raise(user_id)
+        except google_calendar.CalendarUnavailable:
+            row = self._connection().execute("SELECT last_sync FROM sync_state WHERE user_id = ?",
+                                             (user_id,)).fetchone()
+            if row is None:
+                raise
+            logging.warning(f"Serving stored calendar events for {user_id} from the last sync.")
+            self._count("stale_reads")
+            return dict(self.events(user_id, days_ahead), stale=True, last_sync=row[0])
+        return self.events(user_id, days_ahead)
+
+    def stats(self) -> dict:
+        with self._locks_guard:
+            return dict(self._stats, min_sync_interval=self.min_sync_interval)
+
+
+_event_store = None
+_event_store_lock = threading.Lock()
+
+
+def get_event_store() -> CalendarEventStore:
+    """The process-wide store, created (with its SQLite file) on first use."""
+    global _event_store
+    with _event_store_lock:
+        if _event_store is None:
+            _event_store = CalendarEventStore()
+        return _event_store
@@ -0,0 +1,159 @@
+"""
+Free-slot computation over one or more calendars.
+
+Busy intervals from every calendar are sorted once and merged, then swept
+against each day's waking window with a single forward pointer, so a user
+costs O(n log n) in their event count regardless of how many days are spanned.
+The sweep compares plain epoch seconds; timezone-aware datetimes are only
+built for day boundaries and for the slots returned.
+"""
+from datetime import datetime, date, time, timedelta
+from dateutil.tz import gettz
+
+DEFAULT_TIMEZONE = "Asia/Kolkata"
+DEFAULT_WAKING_HOURS = (time(7, 0), time(23, 59, 59, 999000))
+DEFAULT_MIN_GAP_MINUTES = 1
+
+
+def _parse_instant(value, tzinfo) -> float:
+    """
+    Accepts a datetime or an ISO string ('Z' suffix or all-day 'YYYY-MM-DD').
+    Returns epoch seconds.
+    """
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        # All-day events and naive timestamps are read in the user's timezone
+        dt = dt.replace(tzinfo=tzinfo)
+    return dt.timestamp()
+
+
+def _iter_events(calendars):
+    """Yields events from a list of calendars; each calendar is an event list or a {"events": [...]} payload."""
+    for calendar in calendars:
+        if not calendar:
+            continue
+        events = calendar.get('events') if isinstance(calendar, dict) else calendar
+        if isinstance(events, list):
+            yield from events
+
+
+def merge_busy_intervals(intervals):
+    """
+    Merges (start, end) pairs into sorted, non-overlapping busy intervals.
+    Touching intervals are joined; empty or inverted ones are dropped.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def _format_instant(epoch_seconds, tzinfo):
+    dt_obj = datetime.fromtimestamp(epoch_seconds, tz=tzinfo)
+    return dt_obj.replace(microsecond=0).isoformat(timespec='milliseconds')
+
+
+def compute_free_slots(calendars, timezone: str = DEFAULT_TIMEZONE, waking_hours=DEFAULT_WAKING_HOURS,
+                       min_gap_minutes: float = DEFAULT_MIN_GAP_MINUTES,
+                       start_date: date = None, end_date: date = None) -> dict:
+    """
+    Computes free time inside the daily waking window across all of a user's calendars.
+
+    calendars: list of calendars, each an event list or a {"events": [...]} payload;
+        events carry 'start'/'end' as ISO strings or datetimes.
+    timezone: IANA name the waking hours are expressed in.
+    waking_hours: (start, end) datetime.time pair; an end at or before the start
+        means the window runs past midnight.
+    min_gap_minutes: gaps must be longer than this to count as free.
+    start_date/end_date: inclusive day range; defaults to the days spanned by the events,
+        and no slots are returned when there are no events and no range.
+
+    Returns {"free_slots": [{"start", "end", "duration_minutes"}], "total_free_minutes"}.
+    """
+    tzinfo = gettz(timezone)
+    busy = merge_busy_intervals(
+        (_parse_instant(e['start'], tzinfo), _parse_instant(e['end'], tzinfo))
+        for e in _iter_events(calendars)
+    )
+
+    if start_date is None or end_date is None:
+        if not busy:
+            return {"free_slots": [], "total_free_minutes": 0}
+        start_date = start_date or datetime.fromtimestamp(busy[0][0], tz=tzinfo).date()
+        end_date = end_date or datetime.fromtimestamp(busy[-1][1], tz=tzinfo).date()
+
+    wake_start, wake_end = waking_hours
+    # Days after its start on which the window ends: 1 when it runs past midnight
+    end_day_offset = timedelta(days=1) if wake_end <= wake_start else timedelta(0)
+
+    free_slots = []
+    cursor = 0  # first busy interval that may still overlap the current or a later window
+
+    current_day = start_date
+    while current_day <= end_date:
+        day_start = datetime.combine(current_day, wake_start, tzinfo=tzinfo).timestamp()
+        # Built from the local end time, so DST changes inside the window are honoured
+        day_end = datetime.combine(current_day + end_day_offset, wake_end, tzinfo=tzinfo).timestamp()
+
+        # Busy intervals that ended before this window can never matter again
+        while cursor < len(busy) and busy[cursor][1] <= day_start:
+            cursor += 1
+
+        last_busy_end = day_start
+        i = cursor
+        while i < len(busy) and busy[i][0] < day_end:
+            busy_start, busy_end = busy[i]
+            if busy_start > last_busy_end:
+                _append_gap(free_slots, last_busy_end, busy_start, min_gap_minutes, tzinfo)
+            last_busy_end = max(last_busy_end, min(busy_end, day_end))
+            i += 1
+
+        if last_busy_end < day_end:
+            _append_gap(free_slots, last_busy_end, day_end, min_gap_minutes, tzinfo)
+
+        current_day += timedelta(days=1)
+
+    total_free_minutes = sum(slot["duration_minutes"] for slot in free_slots)
+    return {"free_slots": free_slots, "total_free_minutes": total_free_minutes}
+
+
+def _append_gap(free_slots, start, end, min_gap_minutes, tzinfo):
+    diff_minutes = (end - start) / 60
+    if diff_minutes > min_gap_minutes:
+        free_slots.append({
+            "start": _format_instant(start, tzinfo),
+            "end": _format_instant(end, tzinfo),
+            "duration_minutes": round(diff_minutes)
+        })
+
+
+def compute_free_slots_batch(users: dict, start_date: date = None, end_date: date = None) -> dict:
+    """
+    Computes free slots for many users in one call (nightly precompute).
+
+    users: {user_id: {"calendars": [...], "timezone": ..., "waking_hours": (start, end),
+            "min_gap_minutes": ...}}; everything but "calendars" is optional.
+    start_date/end_date: shared day range; defaults to each user's event span.
+
+    Returns {user_id: compute_free_slots(...) result}.
+    """
+    return {
+        user_id: compute_free_slots(
+            spec.get("calendars", []),
+            timezone=spec.get("timezone", DEFAULT_TIMEZONE),
+            waking_hours=spec.get("waking_hours", DEFAULT_WAKING_HOURS),
+            min_gap_minutes=spec.get("min_gap_minutes", DEFAULT_MIN_GAP_MINUTES),
+            start_date=spec.get("start_date", start_date),
+            end_date=spec.get("end_date", end_date),
+        )
+        for user_id, spec in users.items()
+    }
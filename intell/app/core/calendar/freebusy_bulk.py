@@ -0,0 +1,261 @@
+"""
+Bulk free/busy fetcher for the nightly recommendation precompute.
+
+Users are grouped by the credential that can read their calendar (the token
+file they point at). Each group's calendars go into freeBusy queries of up to
+`max_items` calendars, and all queries run concurrently on one async HTTP
+client, capped at `max_concurrency` in flight. A credential's access token is
+refreshed once when it is expired, or when the API answers 401; users in a
+group whose credential cannot be refreshed fail on their own without stopping
+the rest.
+
+The busy intervals come back as {"events": [{"start", "end"}, ...]} per user,
+which is what compute_free_slots / compute_free_slots_batch read.
+
+Usage:
+    python -m intell.app.core.calendar.freebusy_bulk users.json busy.json [days_ahead]
+
+users.json: [{"user_id": ..., "token_file": ..., "calendar_id": "primary"}, ...]
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+from typing import NamedTuple
+
+import httpx
+
+CALENDAR_API_BASE_URL = os.getenv('FREEBUSY_API_BASE_URL', 'https://www.googleapis.com/calendar/v3')
+TOKEN_URI = 'https://oauth2.googleapis.com/token'
+# The freeBusy API accepts at most 50 calendars per query
+DEFAULT_MAX_ITEMS = 50
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_RETRIES = 2
+
+
+class FreeBusyUser(NamedTuple):
+    user_id: str
+    token_file: str
+    calendar_id: str = 'primary'
+
+
+class _Credential:
+    """One token file's OAuth token, refreshed at most once at a time."""
+
+    def __init__(self, token_file: str):
+        self.token_file = token_file
+        with open(token_file, 'r') as f:
+            self.info = json.load(f)
+        self._lock = asyncio.Lock()
+        # Set once a refresh fails, so the credential's other queries fail fast
+        self._refresh_error = None
+        self.refreshed = False
+
+    def _expired(self) -> bool:
+        expiry = self.info.get('expiry')
+        if not expiry:
+            return False
+        expires_at = datetime.datetime.fromisoformat(expiry.replace('Z', '+00:00'))
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=datetime.timezone.utc)
+        # Refresh a minute early so the token does not expire mid-query
+        return expires_at - datetime.timedelta(seconds=60) <= datetime.datetime.now(datetime.timezone.utc)
+
+    async def access_token(self, client: httpx.AsyncClient, metrics: dict, stale_token: str = None) -> str:
+        async with self._lock:
+            token = self.info.get('token')
+            # stale_token: the caller got a 401 with it; refresh unless another query already did
+            if token and not self._expired() and token != stale_token:
+                return token
+            if self._refresh_error is not None:
+                raise self._refresh_error
+            try:
+                token, expires_in = await self._refresh(client, metrics)
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                self._refresh_error = e
+                raise
+            expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in)
+            self.info['token'] = token
+            # Same expiry format google-auth writes, so token.json stays readable by google_calendar
+            self.info['expiry'] = expires_at.strftime('%Y-%m-%dT%H:%M:%SZ')
+            self.refreshed = True
+            return token
+
+    async def _refresh(self, client: httpx.AsyncClient, metrics: dict):
+        response = await client.post(self.info.get('token_uri', TOKEN_URI), data={
+            'grant_type': 'refresh_token',
+            'refresh_token': self.info['refresh_token'],
+            'client_id': self.info['client_id'],
+            'client_secret': self.info['client_secret'],
+        })
+        metrics['token_refreshes'] += 1
+        response.raise_for_status()
+        body = response.json()
+        return body['access_token'], body.get('expires_in', 3600)
+
+    def save(self):
+        with open(self.token_file, 'w') as f:
+            json.dump(self.info, f)
+
+
+def load_users(path: str):
+    """Reads the users file: a JSON list of {"user_id", "token_file", "calendar_id"?}."""
+    with open(path, 'r') as f:
+        return [FreeBusyUser(**entry) for entry in json.load(f)]
+
+
+def _batches(users, max_items: int):
+    """Groups users by token file, then splits each group into queries of at most max_items calendars."""
+    groups = {}
+    for user in users:
+        groups.setdefault(user.token_file, []).append(user)
+
+    for token_file, group in groups.items():
+        calendars = {}
+        for user in group:
+            # Users sharing a calendar id share one item in the query
+            calendars.setdefault(user.calendar_id, []).append(user)
+        calendar_ids = list(calendars)
+        for i in range(0, len(calendar_ids), max_items):
+            yield token_file, {cid: calendars[cid] for cid in calendar_ids[i:i + max_items]}
+
+
+async def fetch_busy_intervals(users, days_ahead: int = 9, time_min: datetime.datetime = None,
+                               max_items: int = DEFAULT_MAX_ITEMS,
+                               max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                               retries: int = DEFAULT_RETRIES,
+                               base_url: str = CALENDAR_API_BASE_URL,
+                               transport: httpx.AsyncBaseTransport = None,
+                               save_refreshed_tokens: bool = True) -> dict:
+    """
+    Fetches busy intervals for every user between time_min (default now) and
+    days_ahead days later.
+
+    Returns {"busy": {user_id: {"events": [{"start", "end"}, ...]}},
+             "errors": {user_id: message}, "metrics": {...}}.
+    """
+    time_min = time_min or datetime.datetime.now(datetime.timezone.utc)
+    time_max = time_min + datetime.timedelta(days=days_ahead)
+    metrics = {"users": len(users), "queries": 0, "query_errors": 0, "retries": 0,
+               "token_refreshes": 0, "token_errors": 0, "calendar_errors": 0}
+    busy = {}
+    errors = {}
+    credentials = {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    def fail(calendars, message):
+        for group in calendars.values():
+            for user in group:
+                errors[user.user_id] = message
+
+    async def run_query(client, token_file, calendars):
+        try:
+            credential = credentials.get(token_file)
+            if credential is None:
+                credential = credentials[token_file] = _Credential(token_file)
+        except (OSError, ValueError) as e:
+            metrics["token_errors"] += 1
+            fail(calendars, f"Unreadable token file: {e}")
+            return
+
+        body = {
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "items": [{"id": calendar_id} for calendar_id in calendars],
+        }
+        async with semaphore:
+            stale_token = None
+            attempt = 0
+            while True:
+                try:
+                    token = await credential.access_token(client, metrics, stale_token)
+                except (httpx.HTTPError, KeyError, ValueError) as e:
+                    metrics["token_errors"] += 1
+                    fail(calendars, f"Token refresh failed: {e}")
+                    return
+                try:
+                    response = await client.post("/freeBusy", json=body,
+                                                 headers={"Authorization": f"Bearer {token}"})
+                except httpx.HTTPError as e:
+                    response, error = None, f"{type(e).__name__}: {e}"
+                else:
+                    metrics["queries"] += 1
+                    if response.status_code == 200:
+                        break
+                    error = f"HTTP {response.status_code}"
+                    if response.status_code == 401 and stale_token is None:
+                        # Revoked or early-expired token: refresh once and retry right away,
+                        # without using up one of the `retries`
+                        stale_token = token
+                        metrics["retries"] += 1
+                        continue
+                    if response.status_code < 500 and response.status_code != 429:
+                        break
+                # Connection errors, 429 and 5xx are retried with backoff
+                if attempt >= retries:
+                    break
+                metrics["retries"] += 1
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                attempt += 1
+
+        if response is None or response.status_code != 200:
+            metrics["query_errors"] += 1
+            fail(calendars, f"freeBusy query failed: {error}")
+            return
+
+        try:
+            payload = response.json()
+            results = payload.get("calendars", {}) if isinstance(payload, dict) else None
+        except ValueError:
+            results = None
+        if not isinstance(results, dict):
+            # A 200 that is not a freeBusy response (a proxy's HTML page, a truncated body)
+            metrics["query_errors"] += 1
+            fail(calendars, "freeBusy query failed: malformed response body")
+            return
+        for calendar_id, group in calendars.items():
+            result = results.get(calendar_id, {})
+            if result.get("errors"):
+                metrics["calendar_errors"] += len(group)
+                message = ", ".join(e.get("reason", "unknown") for e in result["errors"])
+                for user in group:
+                    errors[user.user_id] = f"Calendar error: {message}"
+                continue
+            events = [{"start": b["start"], "end": b["end"]} for b in result.get("busy", [])]
+            for user in group:
+                busy[user.user_id] = {"events": events}
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, timeout=30.0,
+                                 limits=httpx.Limits(max_connections=max_concurrency)) as client:
+        await asyncio.gather(*(run_query(client, token_file, calendars)
+                               for token_file, calendars in _batches(users, max_items)))
+    elapsed = time.perf_counter() - started
+
+    if save_refreshed_tokens:
+        for credential in credentials.values():
+            if credential.refreshed:
+                credential.save()
+
+    metrics.update({
+        "users_ok": len(busy),
+        "users_failed": len(errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "users_per_second": round(len(users) / elapsed, 1) if elapsed else None,
+        "queries_per_second": round(metrics["queries"] / elapsed, 1) if elapsed else None,
+    })
+    logging.info(f"freeBusy bulk fetch: {metrics}")
+    return {"busy": busy, "errors": errors, "metrics": metrics}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    users_path, output_path = sys.argv[1], sys.argv[2]
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 9
+    result = asyncio.run(fetch_busy_intervals(load_users(users_path), days_ahead=days))
+    with open(output_path, 'w') as f:
+        json.dump(result, f)
+    print(json.dumps(result["metrics"], indent=4))
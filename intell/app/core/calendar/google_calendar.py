@@ -2,13 +2,20 @@ import datetime
 import os.path
 import json
 import logging
+import re
+import threading
 
+import google_auth_httplib2
+import httplib2
+from google.auth.exceptions import RefreshError, TransportError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow # Use InstalledAppFlow for desktop app
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from intell.app.config import settings
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -16,84 +23,156 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
 
 # Path to your client secrets file (for Desktop app client ID)
-CLIENT_SECRETS_FILE = 'C:/Personal/HackOn Amazon/intell/app/core/calendar/google_credentials.json' # This file MUST be in the same directory as this script
+CLIENT_SECRETS_FILE = 'intell/app/core/calendar/google_credentials.json'
 
-# Directory for token storage
-TOKEN_FILE = 'C:/Personal/HackOn Amazon/token.json' # This token file will also be in the same directory as this script
+# Token storage (access + refresh token), relative to the repo root
+TOKEN_FILE = os.getenv('GOOGLE_CALENDAR_TOKEN_FILE', 'token.json')
 
-def get_calendar_events_json(days_ahead: int = 9) -> str:
-    """Fetches Google Calendar events for the next 'days_ahead' and returns them as a JSON string.
-    Handles OAuth 2.0 authentication for desktop applications.
+# Per-user tokens, one <user_id>.json per user; the default user falls back to TOKEN_FILE
+TOKEN_DIR = os.getenv('GOOGLE_CALENDAR_TOKEN_DIR', 'intell/app/outputs/calendar_tokens')
+_USER_ID = re.compile(r'[A-Za-z0-9_-]+')
+
+# Calendar API base URL; point it at a local fake server for testing, e.g. http://127.0.0.1:8081/
+CALENDAR_API_ENDPOINT = os.getenv('CALENDAR_API_ENDPOINT')
+
+OUTPUT_FILE = 'intell/app/outputs/calendar_events.json'
+
+# Credentials (per token file) and the discovery-built service are created once per process and shared
+_creds = {}
+_services = {}
+_lock = threading.Lock()
+
+
+class CalendarUnavailable(Exception):
+    """Raised when there are no usable credentials or the Calendar API call fails."""
+
+
+def load_credentials(token_file: str = None) -> Credentials:
     """
-    creds = None
-    # The file token.json stores the user's access and refresh tokens, and is
-    # created automatically when the authorization flow completes for the first
-    # time.
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            # We are here if token.json is missing or invalid and not refreshable.
-            # Instead of redirecting to the auth site, log an error and set creds to None.
-            logging.error("No valid credentials found and automatic refresh failed. Please ensure 'token.json' is present and valid.")
-            creds = None # Explicitly set creds to None to ensure subsequent API call fails gracefully.
-    
-    # Save the credentials for the next run, ONLY if they are valid now.
-    if creds and creds.valid:
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
+    Returns the cached credentials of token_file (default token.json), loading them
+    on first use and refreshing (and re-saving) them once they expire.
+    Raises CalendarUnavailable when there are none or the refresh fails.
+    """
+    token_file = token_file or TOKEN_FILE
+    with _lock:
+        creds = _creds.get(token_file)
+        # The file token.json stores the user's access and refresh tokens, and is
+        # created automatically when the authorization flow completes for the first
+        # time.
+        if creds is None and os.path.exists(token_file):
+            creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+        if creds and not creds.valid:
+            if creds.expired and creds.refresh_token:
+                try:
+                    creds.refresh(Request())
+                except (RefreshError, TransportError) as error:
+                    logging.error(f"Could not refresh the Google Calendar credentials in {token_file}: {error}")
+                    raise CalendarUnavailable(f"Credential refresh failed: {error}") from error
+                # Save the refreshed credentials for the next run
+                with open(token_file, 'w') as token:
+                    token.write(creds.to_json())
+            else:
+                creds = None
+        if creds is None:
+            # Instead of redirecting to the auth site, log an error and fail the call.
+            logging.error(f"No valid credentials found and automatic refresh failed. Please ensure '{token_file}' is present and valid.")
+            raise CalendarUnavailable(f"No valid Google Calendar credentials in {token_file}")
+        _creds[token_file] = creds
+        return creds
+
+
+def token_file_for(user_id: str) -> str:
+    """The token file holding user_id's credentials; the default user may use TOKEN_FILE."""
+    if not _USER_ID.fullmatch(user_id):
+        raise CalendarUnavailable(f"Invalid user id {user_id!r}")
+    path = os.path.join(TOKEN_DIR, f"{user_id}.json")
+    if not os.path.exists(path) and user_id == settings.DEFAULT_USER_ID:
+        return TOKEN_FILE
+    return path
+
+
+def get_calendar_service(api_endpoint: str = None):
+    """Returns the Calendar v3 service object, built from the bundled discovery document once per endpoint."""
+    api_endpoint = api_endpoint or CALENDAR_API_ENDPOINT
+    with _lock:
+        service = _services.get(api_endpoint)
+        if service is None:
+            client_options = {'api_endpoint': api_endpoint} if api_endpoint else None
+            # Requests are executed with their own http object (see fetch_calendar_events),
+            # so the service itself carries no credentials
+            service = build('calendar', 'v3', http=httplib2.Http(), client_options=client_options,
+                            static_discovery=True, cache_discovery=False)
+            _services[api_endpoint] = service
+        return service
 
-    try:
-        service = build('calendar', 'v3', credentials=creds)
 
-        # Call the Calendar API
-        now = datetime.datetime.utcnow().isoformat() + 'Z'  # 'Z' indicates UTC time
-        end_time = (datetime.datetime.utcnow() + datetime.timedelta(days=days_ahead)).isoformat() + 'Z'
-        
-        logging.info(f'Getting the upcoming events from {now} to {end_time}')
+def fetch_calendar_events(days_ahead: int = 9, api_endpoint: str = None) -> dict:
+    """
+    Fetches Google Calendar events for the next 'days_ahead' days.
+    Returns {"events": [{summary, start, end, location, description}, ...]}.
+    Safe to call from several threads at once: each call gets its own HTTP connection.
+    """
+    creds = load_credentials()
+    service = get_calendar_service(api_endpoint)
+    # httplib2 connections are not thread-safe, so every call uses a fresh one
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+
+    # Call the Calendar API
+    now = datetime.datetime.utcnow().isoformat() + 'Z'  # 'Z' indicates UTC time
+    end_time = (datetime.datetime.utcnow() + datetime.timedelta(days=days_ahead)).isoformat() + 'Z'
+
+    logging.info(f'Getting the upcoming events from {now} to {end_time}')
+    try:
         events_result = service.events().list(calendarId='primary', timeMin=now,
                                               timeMax=end_time, singleEvents=True,
-                                              orderBy='startTime').execute()
-        events = events_result.get('items', [])
-
-        if not events:
-            logging.info('No upcoming events found.')
-            return json.dumps({"events": []}, indent=4)
-
-        # Format events into a list of dictionaries
-        formatted_events = []
-        for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            end = event['end'].get('dateTime', event['end'].get('date'))
-            formatted_events.append({
-                "summary": event.get('summary', 'No Title'),
-                "start": start,
-                "end": end,
-                "location": event.get('location', 'N/A'),
-                "description": event.get('description', 'N/A')
-            })
-        
-        return json.dumps({"events": formatted_events}, indent=4)
-
+                                              orderBy='startTime').execute(http=http)
     except HttpError as error:
         logging.error(f'An error occurred with Google Calendar API: {error}')
-        return json.dumps({"error": str(error)}, indent=4)
+        raise CalendarUnavailable(str(error)) from error
+    except (OSError, httplib2.HttpLib2Error, TransportError) as error:
+        logging.error(f'Could not reach the Google Calendar API: {error}')
+        raise CalendarUnavailable(str(error)) from error
+    except RefreshError as error:
+        # AuthorizedHttp refreshes the token itself when the API rejects it
+        logging.error(f'Could not refresh the Google Calendar credentials: {error}')
+        raise CalendarUnavailable(f"Credential refresh failed: {error}") from error
+    events = events_result.get('items', [])
+
+    if not events:
+        logging.info('No upcoming events found.')
+
+    # Format events into a list of dictionaries
+    formatted_events = []
+    for event in events:
+        start = event['start'].get('dateTime', event['start'].get('date'))
+        end = event['end'].get('dateTime', event['end'].get('date'))
+        formatted_events.append({
+            "summary": event.get('summary', 'No Title'),
+            "start": start,
+            "end": end,
+            "location": event.get('location', 'N/A'),
+            "description": event.get('description', 'N/A')
+        })
+
+    return {"events": formatted_events}
+
+
+def get_calendar_events_json(days_ahead: int = 9) -> str:
+    """Fetches Google Calendar events for the next 'days_ahead' and returns them as a JSON string.
+    Errors are returned as {"error": ...}.
+    """
+    try:
+        return json.dumps(fetch_calendar_events(days_ahead), indent=4)
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}")
         return json.dumps({"error": str(e)}, indent=4)
 
 if __name__ == '__main__':
     json_output = get_calendar_events_json(days_ahead=9)
-    
-    output_dir = r'C:\Personal\HackOn Amazon\intell\app\outputs'
-    output_file_path = os.path.join(output_dir, 'calendar_events.json')
 
     # Ensure the output directory exists
-    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
 
-    with open(output_file_path, 'w') as f:
+    with open(OUTPUT_FILE, 'w') as f:
         f.write(json_output)
-    logging.info(f"Calendar events saved to {output_file_path}")
+    logging.info(f"Calendar events saved to {OUTPUT_FILE}")
@@ -0,0 +1,277 @@
+"""
+Array-only random forest classifiers for serving.
+
+export_forest() flattens a fitted sklearn RandomForestClassifier into a few
+contiguous NumPy arrays. The nodes of all trees are concatenated, and child
+indices point into the combined arrays:
+    feature (int32), threshold (float64), left / right (int32), missing_left (bool),
+    value (float64, per-node class fractions), roots (int32), classes.
+A leaf points to itself, so the traversal needs no leaf test.
+
+CompactForest walks all trees for all samples at once, one depth level per
+step. For a handful of rows (single predictions), it first evaluates every split
+in one vectorised pass, giving each node's successor, so that each level costs
+one gather. It follows sklearn's rules: X is float32, a sample goes
+left when x <= threshold, and NaN goes to the missing_left side. The leaf
+fractions are summed tree by tree and divided by the tree count, like
+RandomForestClassifier.predict_proba, so predict_proba and predict match sklearn
+exactly.
+
+The .npz file holds only arrays: it loads without unpickling any Python objects,
+and extra arrays (feature columns, scaler parameters) can be stored alongside.
+
+Export the shipped models and time them against sklearn (their predictions are
+compared in intell/tests/test_compact_forest.py):
+    python -m intell.app.core.compact_forest
+"""
+import hashlib
+import os
+
+import numpy as np
+
+# Rows traversed at once; bounds the (rows x trees) working arrays
+PREDICT_CHUNK_ROWS = 512
+# Up to this many rows, every split is evaluated for every row in one pass
+SUCCESSOR_MAX_ROWS = 8
+_FOREST_KEYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots", "classes")
+
+
+class CompactForest:
+    """A random forest classifier held as flat node arrays."""
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, classes, n_features_in):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features_in)
+        self.n_trees = len(roots)
+        self.max_depth = self._max_depth()
+        # Forests trained without NaN never send one left at a split; skip the NaN test then
+        self._has_missing_left = bool(missing_left.any())
+        # Index arrays are stored as int32; take() is fastest with native intp indices
+        self._feature, self._left, self._right, self._roots = (
+            np.asarray(a, dtype=np.intp) for a in (feature, left, right, roots))
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompactForest":
+        """Flattens a fitted RandomForestClassifier (single output)."""
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be exported.")
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            own = np.arange(offset, offset + n, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int32))
+            # sklearn < 1.3 has no missing-value routing: NaN fails x <= threshold and goes right
+            missing_left = getattr(tree, "missing_go_to_left", None)
+            missing.append(np.zeros(n, dtype=bool) if missing_left is None else missing_left.astype(bool))
+            # Class fractions per node, as DecisionTreeClassifier.predict_proba returns them
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            if not np.allclose(totals, 1.0):
+                value = value / np.where(totals == 0, 1.0, totals)
+            values.append(value)
+            offset += n
+        return cls(np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+                   np.concatenate(rights), np.concatenate(missing), np.concatenate(values),
+                   np.asarray(roots, dtype=np.int32), np.asarray(forest.classes_), forest.n_features_in_)
+
+    def _max_depth(self) -> int:
+        """Steps after which every sample has reached a leaf in every tree."""
+        depth = 0
+        nodes = self.roots.copy()
+        while True:
+            left, right = self.left[nodes], self.right[nodes]
+            internal = left != nodes
+            if not internal.any():
+                return depth
+            nodes = np.concatenate((left[internal], right[internal]))
+            depth += 1
+
+    def save(self, path: str, **extra):
+        """Writes the forest (and any extra arrays) to an .npz file, atomically."""
+        arrays = {key: getattr(self, key) for key in _FOREST_KEYS if key != "classes"}
+        arrays["classes"] = self.classes_
+        arrays["n_features_in"] = np.asarray(self.n_features_in_)
+        arrays.update({f"extra_{key}": np.asarray(value) for key, value in extra.items()})
+        # Object arrays (sklearn keeps string labels as objects) would need pickle to load
+        arrays = {key: value.astype(str) if value.dtype == object else value for key, value in arrays.items()}
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Reads an .npz written by save(); returns (forest, {extra_name: array})."""
+        with np.load(path, allow_pickle=False) as data:
+            forest = cls(*(data[key] for key in _FOREST_KEYS), int(data["n_features_in"]))
+            extra = {key[len("extra_"):]: data[key] for key in data.files if key.startswith("extra_")}
+        return forest, extra
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """(n_samples, n_trees) leaf index of each sample in each tree."""
+        if X.shape[0] <= SUCCESSOR_MAX_ROWS:
+            return self._leaves_by_successor(X)
+        return self._leaves_by_level(X)
+
+    def _leaves_by_successor(self, X: np.ndarray) -> np.ndarray:
+        # Every split decision at once gives each node's successor; each tree is
+        # then walked with one gather per level. Cheapest for a few rows.
+        n, n_nodes = X.shape[0], len(self._feature)
+        x = X.take(self._feature, axis=1)
+        go_left = x <= self.threshold
+        if self._has_missing_left:
+            go_left |= np.isnan(x) & self.missing_left
+        row_offsets = np.arange(0, n * n_nodes, n_nodes, dtype=np.intp)[:, None]
+        successor = (np.where(go_left, self._left, self._right) + row_offsets).ravel()
+        nodes = self._roots + row_offsets
+        for _ in range(self.max_depth):
+            nodes = successor.take(nodes)
+        return nodes - row_offsets
+
+    def _leaves_by_level(self, X: np.ndarray) -> np.ndarray:
+        # Only the split on each sample's current node is evaluated, one level at a time
+        n = X.shape[0]
+        flat = X.ravel()
+        row_offsets = np.arange(0, n * X.shape[1], X.shape[1], dtype=np.intp)[:, None]
+        nodes = np.broadcast_to(self._roots, (n, self.n_trees))
+        for _ in range(self.max_depth):
+            x = flat.take(row_offsets + self._feature.take(nodes))
+            go_left = x <= self.threshold.take(nodes)
+            if self._has_missing_left:
+                go_left |= np.isnan(x) & self.missing_left.take(nodes)
+            nodes = np.where(go_left, self._left.take(nodes), self._right.take(nodes))
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Mean class fractions of the trees, for an (n_samples, n_features) matrix."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, but the forest expects {self.n_features_in_} features.")
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], PREDICT_CHUNK_ROWS):
+            leaves = self._leaves(X[start:start + PREDICT_CHUNK_ROWS])
+            # Summing over the outer (tree) axis adds tree by tree, in order, as sklearn does
+            proba[start:start + len(leaves)] = np.add.reduce(self.value[leaves.T], axis=0)
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def source_digest(*paths) -> str:
+    """sha256 over the contents of the given files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def export_forest(forest, path: str, sources=(), **extra) -> CompactForest:
+    """
+    Flattens a fitted RandomForestClassifier and saves it, with extra arrays, to
+    path. `sources`: the files it was exported from, fingerprinted for is_current().
+    """
+    compact = CompactForest.from_sklearn(forest)
+    if sources:
+        extra["source_digest"] = source_digest(*sources)
+    compact.save(path, **extra)
+    return compact
+
+
+def is_current(path: str, *sources) -> bool:
+    """
+    True when the export at path exists and was made from the current contents of
+    its source files (or when only the export is deployed). File times are not
+    used: a git checkout does not preserve them.
+    """
+    if not os.path.exists(path):
+        return False
+    try:
+        digest = source_digest(*sources)
+    except OSError:
+        return True
+    with np.load(path, allow_pickle=False) as data:
+        return "extra_source_digest" in data.files and str(data["extra_source_digest"]) == digest
+
+
+def _rss_after(statement: str) -> tuple:
+    """(peak RSS in MB, seconds) of running `statement` in a fresh interpreter (Linux)."""
+    import subprocess
+    import sys
+
+    # VmHWM, unlike ru_maxrss, is not carried over from the parent across exec
+    code = ("import time, warnings; warnings.simplefilter('ignore'); started = time.perf_counter(); "
+            f"{statement}; elapsed = time.perf_counter() - started; "
+            "hwm = [line.split()[1] for line in open('/proc/self/status') if line.startswith('VmHWM')][0]; "
+            "print(int(hwm) / 1024, elapsed)")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), float(output[1])
+
+
+def _benchmark():
+    """Exports the shipped forests (to a temp dir) and times them against sklearn."""
+    import shutil
+    import tempfile
+    import time
+    import warnings
+
+    import joblib
+
+    from intell.app.core.smart_watch import predict_smartwatch as watch
+    from backend.services import environment_model as env
+
+    warnings.simplefilter("ignore")
+    rng = np.random.default_rng(0)
+
+    def per_call(fn, X, n):
+        started = time.perf_counter()
+        for _ in range(n):
+            fn(X)
+        return (time.perf_counter() - started) / n
+
+    # The committed exports are left untouched
+    out_dir = tempfile.mkdtemp(prefix="compact_forest_")
+    watch_npz, env_npz = os.path.join(out_dir, "smart_watch.npz"), os.path.join(out_dir, "mood_model.npz")
+    watch.export_smart_watch_model(output_path=watch_npz)
+    env.export_environment_model(output_path=env_npz)
+    for name, pkl_path, npz_path in (
+            ("smartwatch", watch.SMART_WATCH_MODEL_PATH, watch_npz),
+            ("environment", env.MODEL_PATH, env_npz)):
+        sklearn_model = joblib.load(pkl_path)
+        forest = sklearn_model["model"][-1] if isinstance(sklearn_model, dict) else sklearn_model
+        compact, _ = CompactForest.load(npz_path)
+
+        X = rng.normal(0, 2, (20000, forest.n_features_in_)).astype(np.float32)
+        single = X[:1]
+        sk_one, compact_one = per_call(forest.predict, single, 200), per_call(compact.predict, single, 2000)
+        sk_many, compact_many = per_call(forest.predict, X, 3) / len(X), per_call(compact.predict, X, 3) / len(X)
+        sk_rss, sk_load = _rss_after(f"import joblib; joblib.load({pkl_path!r})")
+        compact_rss, compact_load = _rss_after(
+            f"from intell.app.core.compact_forest import CompactForest; CompactForest.load({npz_path!r})")
+        print(f"{name}: {len(compact.roots)} trees, {len(compact.feature)} nodes, "
+              f"max depth {compact.max_depth}\n"
+              f"  file      {os.path.getsize(pkl_path) / 1024:7.0f} KB -> {os.path.getsize(npz_path) / 1024:5.0f} KB\n"
+              f"  cold load {sk_load * 1000:7.1f} ms -> {compact_load * 1000:5.1f} ms "
+              f"(peak RSS {sk_rss:.0f} MB -> {compact_rss:.0f} MB)\n"
+              f"  1 sample  {sk_one * 1e6:7.0f} us -> {compact_one * 1e6:5.0f} us\n"
+              f"  {len(X)} rows {sk_many * 1e6:5.2f} us/row -> {compact_many * 1e6:5.2f} us/row")
+    shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    _benchmark()
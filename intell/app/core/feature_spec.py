@@ -0,0 +1,213 @@
+"""
+Compiled feature encoding for the tabular mood models.
+
+A FeatureSpec is built once, when a model is loaded. It turns the model's
+trained column list, the vocabulary of each categorical field and the
+StandardScaler parameters into a fixed map from each input field (and each
+categorical value) to a column index. Encoding a request then writes the
+values straight into a preallocated NumPy matrix, scales the scaled columns in
+one vectorised step and returns the float32 matrix the forest predicts on. No
+DataFrame is built on the request path.
+
+The result is bit-identical to the pandas path: scaling is done in float64
+exactly as StandardScaler.transform does it, and the cast to float32 is the one
+the forest applies to its input anyway.
+
+Microbenchmark against the pandas path:
+    python -m intell.app.core.feature_spec
+"""
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ENCODED_DTYPE = np.float32
+
+
+def unix_timestamp(value) -> float:
+    """
+    Seconds since the epoch for a timestamp string; naive values are read as UTC,
+    like pandas' Timestamp.timestamp(). Numbers are passed through.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        # Formats fromisoformat does not know: same parser as the pandas path
+        dt = pd.to_datetime(value).to_pydatetime()
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class FeatureSpec:
+    """Index map from raw sample fields to the model's feature columns."""
+
+    def __init__(self, columns, categorical: dict = None, scaler=None, scaled_columns=None,
+                 converters: dict = None, handle_unknown: str = "ignore", missing_category=None,
+                 mean=None, scale=None):
+        """
+        columns: the model's feature columns, in order.
+        categorical: {field: vocabulary}. A value's one-hot column is '<field>_<value>';
+            values without a column (the category dropped at training) encode as all zeros.
+        scaler: a fitted StandardScaler applied to `scaled_columns` (default: its
+            feature_names_in_, or every column).
+        mean, scale: the scaler's mean_/scale_ arrays, instead of the scaler itself.
+        converters: {field: function} applied to a field's raw value (e.g. unix_timestamp).
+        handle_unknown: "ignore" encodes values outside the vocabulary as all zeros;
+            "error" raises ValueError, like OneHotEncoder(handle_unknown='error').
+        missing_category: vocabulary entry that a missing (absent, None or NaN) categorical
+            value maps to.
+        """
+        self.columns = [str(col) for col in columns]
+        index = {col: i for i, col in enumerate(self.columns)}
+        self.width = len(self.columns)
+        self.handle_unknown = handle_unknown
+        self.missing_category = missing_category
+        self.converters = dict(converters or {})
+
+        # field -> {value: column index or None (known value without a column)}
+        self.categorical = {}
+        one_hot = set()
+        for field, vocabulary in (categorical or {}).items():
+            values = {}
+            for value in vocabulary:
+                column = index.get(f"{field}_{value}")
+                values[value] = column
+                if column is not None:
+                    one_hot.add(column)
+            self.categorical[field] = values
+
+        # Every remaining column is read from the sample field of the same name
+        self.numeric = [(col, i) for i, col in enumerate(self.columns) if i not in one_hot]
+
+        if scaler is not None:
+            if scaled_columns is None:
+                names = getattr(scaler, "feature_names_in_", None)
+                scaled_columns = list(names) if names is not None else None
+            mean = scaler.mean_ if scaler.with_mean else None
+            scale = scaler.scale_ if scaler.with_std else None
+        if mean is not None or scale is not None:
+            if scaled_columns is None:
+                scaled_columns = self.columns
+            self.scaled_index = np.array([index[str(col)] for col in scaled_columns], dtype=np.intp)
+            self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+            self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+            # Scaling the whole matrix in place avoids gather/scatter when every column is scaled
+            self.scale_all = np.array_equal(self.scaled_index, np.arange(self.width))
+        else:
+            self.scaled_index = None
+
+    @classmethod
+    def from_dummy_columns(cls, columns, categorical_fields, **kwargs):
+        """Spec for get_dummies-encoded columns: each field's vocabulary is read from its '<field>_' columns."""
+        columns = [str(col) for col in columns]
+        categorical = {}
+        for field in categorical_fields:
+            prefix = field + "_"
+            categorical[field] = [col[len(prefix):] for col in columns if col.startswith(prefix)]
+        return cls(columns, categorical=categorical, **kwargs)
+
+    def _category_column(self, field, values, value):
+        if _is_missing(value) and self.missing_category is not None:
+            value = self.missing_category
+        try:
+            return values[value]
+        except (KeyError, TypeError):
+            if self.handle_unknown == "error":
+                raise ValueError(f"Found unknown category {value!r} for '{field}'") from None
+            return None
+
+    def encode(self, samples) -> np.ndarray:
+        """Encodes a list of sample dicts into an (n, width) float32 matrix."""
+        X = np.zeros((len(samples), self.width), dtype=np.float64)
+        numeric = self.numeric
+        converters = self.converters
+        for row, sample in enumerate(samples):
+            out = X[row]
+            for field, column in numeric:
+                value = sample.get(field, 0)
+                if field in converters and value is not None:
+                    value = converters[field](value)
+                out[column] = np.nan if value is None else float(value)
+            for field, values in self.categorical.items():
+                # An absent field encodes as all zeros, unless absent means "missing category"
+                if field in sample or self.missing_category is not None:
+                    column = self._category_column(field, values, sample.get(field))
+                    if column is not None:
+                        out[column] = 1.0
+
+        if self.scaled_index is not None:
+            # Same float64 operations as StandardScaler.transform
+            if self.scale_all:
+                if self.mean is not None:
+                    X -= self.mean
+                if self.scale is not None:
+                    X /= self.scale
+            else:
+                scaled = X[:, self.scaled_index]
+                if self.mean is not None:
+                    scaled -= self.mean
+                if self.scale is not None:
+                    scaled /= self.scale
+                X[:, self.scaled_index] = scaled
+        return X.astype(ENCODED_DTYPE)
+
+    def encode_one(self, sample: dict) -> np.ndarray:
+        """Encodes one sample into a (1, width) float32 matrix."""
+        return self.encode([sample])
+
+
+def _benchmark(repeats: int = 200, batch: int = 1000):
+    """
+    Prints per-sample encoding time of the pandas path and the compiled spec for
+    both models; intell/tests/test_feature_spec.py checks that they agree.
+    """
+    import time
+    import warnings
+
+    from backend.services import environment_model as env
+    from intell.app.core.environment.mock_iot_generator import generate_mock_iot_data
+    from intell.app.core.smart_watch import predict_smartwatch as watch
+    from intell.app.core.smart_watch.watch_value_generator import generate_sample_row
+
+    warnings.simplefilter("ignore")
+
+    def per_call(fn, arg, n):
+        started = time.perf_counter()
+        for _ in range(n):
+            fn(arg)
+        return (time.perf_counter() - started) / n
+
+    assets = watch.load_smart_watch_assets(watch.SMART_WATCH_MODEL_PATH)
+    pipeline, spec = assets["model"], assets["spec"]
+    watch_rows = [generate_sample_row() for _ in range(batch)]
+
+    def watch_pandas(rows):
+        return pipeline[:-1].transform(watch.encode_samples(rows, assets["columns"])).astype(ENCODED_DTYPE)
+
+    env_rows = [generate_mock_iot_data() for _ in range(batch)]
+
+    def env_pandas(rows):
+        return env.encode_with_pandas(rows).to_numpy(dtype=ENCODED_DTYPE)
+
+    for name, pandas_fn, spec_fn, rows in (
+            ("smartwatch", watch_pandas, spec.encode, watch_rows),
+            ("environment", env_pandas, env.environment_assets()["spec"].encode, env_rows)):
+        one_pandas = per_call(pandas_fn, rows[:1], repeats)
+        one_spec = per_call(spec_fn, rows[:1], repeats)
+        many_pandas = per_call(pandas_fn, rows, max(repeats // 20, 3)) / batch
+        many_spec = per_call(spec_fn, rows, max(repeats // 20, 3)) / batch
+        print(f"{name:12s} 1 row: pandas {one_pandas * 1e6:8.1f}us  spec {one_spec * 1e6:6.1f}us ({one_pandas / one_spec:5.1f}x)  "
+              f"{batch} rows: pandas {many_pandas * 1e6:6.2f}us/row  spec {many_spec * 1e6:5.2f}us/row "
+              f"({many_pandas / many_spec:4.1f}x)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,221 @@
+"""
+Process-wide registry of loaded models.
+
+A model is registered once with its file path and a loader; the registry loads
+it on first use (or at startup through preload), runs its warm-up, and hands the
+same loaded object to every caller afterwards. Callers must treat it as
+read-only.
+
+When the model file, or another file it watches, is replaced (a new mtime),
+the next get() starts a reload on a background thread; callers keep the current model until the new one has
+loaded and warmed up, then a single reference assignment swaps it in. A failed
+reload keeps the previous model. Publish new files with os.replace so a reload
+never reads a half-written file.
+
+Load, warm-up and predict timings are kept per model and exposed by stats().
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Predict latencies kept per model for the percentiles in stats()
+LATENCY_WINDOW = 1000
+
+
+def _mtimes(paths) -> tuple:
+    # A missing file is None, so its later appearance counts as a change
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except FileNotFoundError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+class _Entry:
+    def __init__(self, name, path, loader, warmup, check_interval, watch):
+        self.name = name
+        self.path = path
+        self.watch = tuple(watch) if watch else (path,)
+        self.loader = loader
+        self.warmup = warmup
+        self.check_interval = check_interval
+        self.model = None
+        self.mtime = None
+        self.last_check = 0.0
+        self.load_lock = threading.Lock()
+        self.reloading = False
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"loads": 0, "load_errors": 0, "last_error": None, "last_load_seconds": None,
+                      "last_warmup_seconds": None, "loaded_at": None,
+                      "predictions": 0, "predict_seconds_total": 0.0}
+
+
+class ModelRegistry:
+    """Loads each registered model once and swaps in a new version when its file changes."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str, loader, warmup=None, check_interval: float = 5.0, watch=None):
+        """
+        Registers a model; nothing is loaded yet. Registering an existing name is a no-op.
+        loader(path) returns the model object; warmup(model), if given, runs a dummy
+        prediction before the model is served.
+        watch: the files whose change triggers a reload (default: path alone), for
+        loaders that choose between several files when they run.
+        """
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(name, path, loader, warmup, check_interval, watch)
+
+    def _entry(self, name: str) -> _Entry:
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise KeyError(f"Model '{name}' is not registered") from None
+
+    def _load(self, entry: _Entry):
+        """Loads and warms up the entry's file; returns (model, mtime) without publishing it."""
+        started = time.perf_counter()
+        try:
+            mtime = _mtimes(entry.watch)
+            if all(m is None for m in mtime):
+                raise FileNotFoundError(f"No model file at {', '.join(entry.watch)}")
+            model = entry.loader(entry.path)
+            loaded = time.perf_counter()
+            if entry.warmup is not None:
+                entry.warmup(model)
+        except Exception as e:
+            entry.stats["load_errors"] += 1
+            entry.stats["last_error"] = f"{type(e).__name__}: {e}"
+            raise
+        warmed = time.perf_counter()
+        entry.stats["loads"] += 1
+        entry.stats["last_error"] = None
+        entry.stats["last_load_seconds"] = round(loaded - started, 4)
+        entry.stats["last_warmup_seconds"] = round(warmed - loaded, 4)
+        entry.stats["loaded_at"] = time.time()
+        logging.info(f"Loaded model '{entry.name}' from {entry.path} in {loaded - started:.3f}s "
+                     f"(warm-up {warmed - loaded:.3f}s).")
+        return model, mtime
+
+    def load(self, name: str):
+        """Loads the model synchronously (startup, or first use) and returns it."""
+        entry = self._entry(name)
+        with entry.load_lock:
+            if entry.model is None:
+                entry.model, entry.mtime = self._load(entry)
+                entry.last_check = time.monotonic()
+            return entry.model
+
+    def get(self, name: str):
+        """
+        Returns the current model, loading it on first use. A changed file triggers
+        a background reload; the caller never waits for it.
+        """
+        entry = self._entry(name)
+        model = entry.model
+        if model is None:
+            return self.load(name)
+
+        now = time.monotonic()
+        if now - entry.last_check >= entry.check_interval:
+            entry.last_check = now
+            try:
+                changed = _mtimes(entry.watch) != entry.mtime
+            except OSError as e:
+                logging.warning(f"Could not stat model file {entry.path}: {e}")
+                changed = False
+            if changed:
+                self._start_reload(entry)
+        return model
+
+    def _start_reload(self, entry: _Entry):
+        with self._lock:
+            if entry.reloading:
+                return
+            entry.reloading = True
+        threading.Thread(target=self._reload, args=(entry,), name=f"model-reload-{entry.name}", daemon=True).start()
+
+    def _reload(self, entry: _Entry):
+        try:
+            model, mtime = self._load(entry)
+            # A single reference assignment is the atomic swap
+            entry.model, entry.mtime = model, mtime
+        except Exception as e:
+            logging.error(f"Reloading model '{entry.name}' failed, keeping the previous version: {e}")
+        finally:
+            with self._lock:
+                entry.reloading = False
+
+    def preload(self, names=None):
+        """Loads the given (default: all) registered models, logging failures instead of raising."""
+        for name in names if names is not None else list(self._entries):
+            try:
+                self.load(name)
+            except Exception as e:
+                logging.error(f"Could not preload model '{name}': {e}")
+
+    def preload_in_background(self, names=None) -> threading.Thread:
+        """
+        Starts preload(names) on a daemon thread and returns it. Requests arriving
+        meanwhile load the model they need themselves (the registry loads it once).
+        """
+        thread = threading.Thread(target=self.preload, args=(names,), name="model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    @contextmanager
+    def timed(self, name: str):
+        """Records the duration of the enclosed prediction for the model."""
+        entry = self._entry(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            entry.latencies.append(elapsed)
+            entry.stats["predictions"] += 1
+            entry.stats["predict_seconds_total"] += elapsed
+
+    def health(self, names=None) -> dict:
+        """Readiness of the given (default: all) registered models, without loading any."""
+        result = {}
+        for name in names if names is not None else list(self._entries):
+            entry = self._entry(name)
+            result[name] = {
+                "loaded": entry.model is not None,
+                "loading": entry.load_lock.locked() or entry.reloading,
+                "path": entry.path,
+                "loaded_at": entry.stats["loaded_at"],
+                "load_seconds": entry.stats["last_load_seconds"],
+                "warmup_seconds": entry.stats["last_warmup_seconds"],
+                "last_error": entry.stats["last_error"],
+            }
+        return result
+
+    def stats(self) -> dict:
+        result = {}
+        for name, entry in list(self._entries.items()):
+            latencies = sorted(entry.latencies)
+            predictions = entry.stats["predictions"]
+            result[name] = {
+                **entry.stats,
+                "predict_seconds_total": round(entry.stats["predict_seconds_total"], 4),
+                "path": entry.path,
+                "loaded": entry.model is not None,
+                "version_mtime": max((m for m in entry.mtime or () if m is not None), default=None),
+                "predict_avg_ms": round(1000 * entry.stats["predict_seconds_total"] / predictions, 3) if predictions else None,
+                "predict_p50_ms": round(1000 * latencies[len(latencies) // 2], 3) if latencies else None,
+                "predict_p95_ms": round(1000 * latencies[int(len(latencies) * 0.95)], 3) if latencies else None,
+            }
+        return result
+
+
+model_registry = ModelRegistry()
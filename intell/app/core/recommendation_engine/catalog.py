@@ -0,0 +1,169 @@
+"""
+In-memory movie catalog for the slot recommendation engine.
+
+The mood/title JSON and the movie metadata CSV are parsed once into typed
+structures; a user's ranked rows are joined against them by build_ranking,
+which also builds that user's mood -> movies inverted index. CatalogStore hands
+out the current Catalog and swaps in a freshly loaded one when any source
+file's mtime changes; the reload runs on a background thread and requests
+already holding the old Catalog keep using it.
+"""
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+BASE_PATH = "intell/app/core/recommendation_engine"
+MOOD_JSON_PATH = os.path.join(BASE_PATH, "mood_movie_recommendations (2).json")
+MOVIES_CSV_PATH = "intell/app/ingestion/movie_dataset/movies_large.csv"
+
+
+class MovieMeta(NamedTuple):
+    title: str
+    duration_minutes: int
+    moods: Tuple[str, ...]
+
+
+class Movie(NamedTuple):
+    movie_id: str
+    title: str
+    duration_minutes: int
+    ranking_score: float
+    moods: Tuple[str, ...]
+
+
+class Catalog(NamedTuple):
+    metadata: Dict[str, MovieMeta]  # movie_id -> title/duration/moods
+    mtimes: Tuple[float, ...]       # source file mtimes the catalog was built from
+
+
+class Ranking(NamedTuple):
+    movies: Dict[str, Movie]         # movie_id -> Movie with the user's ranking_score
+    by_mood: Dict[str, List[Movie]]  # mood -> titled movies, highest ranking_score first
+
+
+def _source_mtimes(paths) -> Tuple[float, ...]:
+    return tuple(os.stat(path).st_mtime for path in paths)
+
+
+def load_catalog(mood_json_path: str = MOOD_JSON_PATH, movies_csv_path: str = MOVIES_CSV_PATH) -> Catalog:
+    """
+    Joins titles and mood tags with durations.
+    Only movies that have a duration are kept.
+    """
+    mtimes = _source_mtimes((mood_json_path, movies_csv_path))
+
+    with open(mood_json_path, 'r', encoding='utf-8') as f:
+        mood_recommendations = json.load(f)
+
+    metadata = {}
+    with open(movies_csv_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            movie_id = row['movie_id']
+            info = mood_recommendations.get(movie_id, {})
+            metadata[movie_id] = MovieMeta(
+                title=info.get('name', ''),
+                duration_minutes=int(float(row['duration_minutes'])),
+                moods=tuple(m.strip().lower() for m in info.get('moods', [])),
+            )
+
+    return Catalog(metadata=metadata, mtimes=mtimes)
+
+
+def build_ranking(ranked_rows, metadata: Dict[str, MovieMeta]) -> Ranking:
+    """
+    Joins one user's (movie_id, ranking_score) rows with the catalog metadata.
+    Rows for movies without metadata are dropped.
+    """
+    movies = {}
+    for movie_id, ranking_score in ranked_rows:
+        meta = metadata.get(movie_id)
+        if meta is None:
+            continue
+        movies[movie_id] = Movie(
+            movie_id=movie_id,
+            title=meta.title,
+            duration_minutes=meta.duration_minutes,
+            ranking_score=ranking_score,
+            moods=meta.moods,
+        )
+
+    # Inverted index: score-ordered posting list per mood. Untitled movies are
+    # never recommended, so they are left out of it.
+    by_mood = {}
+    for movie in sorted(movies.values(), key=lambda m: m.ranking_score, reverse=True):
+        if not movie.title:
+            continue
+        for mood in movie.moods:
+            by_mood.setdefault(mood, []).append(movie)
+
+    return Ranking(movies=movies, by_mood=by_mood)
+
+
+class CatalogStore:
+    """Holds the current Catalog and reloads it when its source files change."""
+
+    def __init__(self, paths: Tuple[str, str] = (MOOD_JSON_PATH, MOVIES_CSV_PATH),
+                 check_interval: float = 5.0):
+        self.paths = paths
+        self.check_interval = check_interval
+        self._catalog = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._last_check = 0.0
+
+    def load(self) -> Catalog:
+        """Loads the catalog synchronously (app startup)."""
+        catalog = load_catalog(*self.paths)
+        with self._lock:
+            self._catalog = catalog
+            self._last_check = time.monotonic()
+        logging.info(f"Loaded movie catalog with {len(catalog.metadata)} movies.")
+        return catalog
+
+    def get(self) -> Catalog:
+        """
+        Returns the current catalog, loading it on first use.
+        A changed source file triggers a background reload; the caller gets the
+        catalog that is current now and never waits for the reload.
+        """
+        catalog = self._catalog
+        if catalog is None:
+            return self.load()
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            try:
+                changed = _source_mtimes(self.paths) != catalog.mtimes
+            except OSError as e:
+                logging.warning(f"Could not stat catalog files: {e}")
+                changed = False
+            if changed:
+                self._start_reload()
+        return catalog
+
+    def _start_reload(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="catalog-reload", daemon=True).start()
+
+    def _reload(self):
+        try:
+            catalog = load_catalog(*self.paths)
+            # A single reference assignment is the atomic swap
+            self._catalog = catalog
+            logging.info(f"Reloaded movie catalog with {len(catalog.metadata)} movies.")
+        except Exception as e:
+            logging.error(f"Catalog reload failed, keeping the previous catalog: {e}")
+        finally:
+            with self._lock:
+                self._reloading = False
+
+
+catalog_store = CatalogStore()
@@ -1,81 +1,65 @@
-import json
-import csv
 import asyncio
+import heapq
+from bisect import bisect_right
 from datetime import datetime
+from itertools import islice
 from dateutil import parser, tz
-import os
-import httpx
-
-async def get_slot_movie_recommendations():
-    # === File Paths ===
-    base_path = r"C:\Personal\HackOn Amazon\intell\app\core\recommendation_engine"
-    json_path = os.path.join(base_path, "mood_movie_recommendations (2).json")
-    csv_path = os.path.join(base_path, "U0000_ranked_with_moods.csv")
-    movies_path = r"C:\Personal\HackOn Amazon\intell\app\ingestion\movie_dataset\movies_large.csv"
-
-    # === Step 1: Load mood & calendar data from API ===
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get("http://127.0.0.1:8000/trigger/final-recommendation")
-            response.raise_for_status()  # Raise an exception for bad status codes
-            user_data = response.json()
-        except httpx.RequestError as e:
-            print(f"Error fetching data from API: {e}")
-            return {"error": "Failed to fetch user data from API"}
-
-    user_moods = {
-        user_data["environment_mood"].lower(),
-        user_data["smartwatch_mood"].lower(),
-        user_data["voice_mood"].lower()
-    }
 
-    # === Step 2: Load mood-ranked CSV ===
-    ranked_data = []
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            mood_list = [m.strip().lower() for m in row['mood'].split(',')]
-            if any(m in user_moods for m in mood_list):
-                ranked_data.append({
-                    'movie_id': row['movie_id'],
-                    'ranking_score': float(row['ranking_score']),
-                    'mood_list': mood_list
-                })
-    
-    matching_movie_ids = [row['movie_id'] for row in ranked_data]
-
-    # === Step 3: Load mood-based recommendations (dict format with movie_id as key) ===
-    with open(json_path, 'r', encoding='utf-8') as f:
-        mood_recommendations = json.load(f)
-
-    movie_title_map = {k: v['name'] for k, v in mood_recommendations.items()}
-
-    # === Step 4: Load movie metadata and merge ranking ===
-    movie_meta = []
-    with open(movies_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['movie_id'] in matching_movie_ids:
-                # Find ranking score for this movie
-                ranking_score = next((r['ranking_score'] for r in ranked_data if r['movie_id'] == row['movie_id']), 0.0)
-                movie_meta.append({
-                    'movie_id': row['movie_id'],
-                    'title': movie_title_map.get(row['movie_id'], ''),
-                    'duration_minutes': int(float(row['duration_minutes'])),
-                    'ranking_score': ranking_score
-                })
-
-    # Sort by ranking score
-    movie_meta.sort(key=lambda x: x['ranking_score'], reverse=True)
-
-    # === Step 5: Process future calendar slots ===
+from intell.app.core.recommendation_engine.mood_index import top_k_by_moods
+from intell.app.core.recommendation_engine.planner import iter_plan_slots
+from intell.app.core.recommendation_engine.ranked_store import ranked_store
+from intell.app.config import settings
+
+DEFAULT_SOURCE_WEIGHTS = {
+    "environment": settings.MOOD_WEIGHT_ENVIRONMENT,
+    "smartwatch": settings.MOOD_WEIGHT_SMARTWATCH,
+    "voice": settings.MOOD_WEIGHT_VOICE,
+}
+
+
+class UnknownUserError(LookupError):
+    """Raised when the ranked store has no rows for the requested user."""
+
+
+def _iter_slots(user_data: dict, user_id: str, limit: int, offset: int, mode: str,
+                source_weights: dict, candidate_pool: int):
+    """
+    Shared core of every response format. Yields one
+    (slot_id, start, end, free_minutes, movie_count, movies) tuple per future
+    slot, in time order, computing each slot only when it is requested.
+    This is CPU work: the async entry points below run it on worker threads.
+    """
+    # === Step 1: Weighted moods from the consolidated signals ===
+    # A source that missed its latency budget may be null
+    source_weights = {**DEFAULT_SOURCE_WEIGHTS, **(source_weights or {})}
+    mood_weights = {}
+    for source, key in (("environment", "environment_mood"), ("smartwatch", "smartwatch_mood"), ("voice", "voice_mood")):
+        mood = user_data[key]
+        if mood:
+            mood = mood.lower()
+            mood_weights[mood] = max(mood_weights.get(mood, 0), source_weights[source])
+
+    # === Step 2: Best mood-matching movies, merged from the user's mood index ===
+    ranking = ranked_store.get_user(user_id)
+    if ranking is None:
+        raise UnknownUserError(f"No ranked movies for user {user_id}")
+    candidates = top_k_by_moods(ranking.by_mood, mood_weights, candidate_pool)
+    weighted_scores = {movie.movie_id: score for score, movie in candidates}
+
+    # Duration-sorted index: the movies fitting a slot are the prefix found by bisect
+    by_duration = sorted((movie for _, movie in candidates), key=lambda m: m.duration_minutes)
+    durations = [movie.duration_minutes for movie in by_duration]
+
+    # === Step 3: Process future calendar slots ===
     now = datetime.now(tz=tz.tzlocal())
     future_slots = []
 
     for slot in user_data["calendar_free_slots"]:
         start = parser.isoparse(slot['start'])
         end = parser.isoparse(slot['end'])
-        if end > now:
+        if end > now and 'duration_minutes' in slot:
+            future_slots.append((start, end, slot['duration_minutes']))
+        elif end > now:
             duration_str = slot['duration']
             hours = 0
             minutes = 0
@@ -90,41 +74,184 @@ async def get_slot_movie_recommendations():
 
     future_slots.sort()
 
-    # === Step 6: Generate output JSON ===
-    final_output = []
-    global_movie_id = 1
+    # === Step 4: Movies per slot ===
+    if mode == "plan":
+        # One packed playlist per slot; a title is never planned twice
+        playlists = iter_plan_slots(by_duration, [free_minutes for _, _, free_minutes in future_slots])
 
     for idx, (start, end, free_minutes) in enumerate(future_slots, 1):
-        # Filter movies that fit in the time slot
-        fitting_movies = [movie for movie in movie_meta if movie['duration_minutes'] <= free_minutes]
+        if mode == "plan":
+            top_movies = next(playlists)
+            fit_count = len(top_movies)
+        else:
+            # Best `limit` movies (after `offset`) among those that fit in the time slot
+            fit_count = bisect_right(durations, free_minutes)
+            top_movies = heapq.nlargest(offset + limit, islice(by_duration, fit_count),
+                                        key=lambda m: weighted_scores[m.movie_id])[offset:]
+        yield idx, start, end, free_minutes, fit_count, top_movies
+
+
+def _mood_header(user_data: dict) -> dict:
+    return {
+        "environment_mood": user_data["environment_mood"],
+        "voice_mood": user_data["voice_mood"],
+        "smartwatch_mood": user_data["smartwatch_mood"],
+    }
+
+
+def _slot_fields(idx, start, end, free_minutes, fit_count, top_movies, mode: str) -> dict:
+    slot_output = {
+        "slot_id": idx,
+        "start_time": start.isoformat(),
+        "end_time": end.isoformat(),
+        "free_minutes": free_minutes,
+        "movie_count": fit_count,
+    }
+    if mode == "plan":
+        slot_output["planned_minutes"] = sum(movie.duration_minutes for movie in top_movies)
+    return slot_output
+
+
+def _movie_entry(movie) -> dict:
+    return {
+        "title": movie.title,
+        "duration_minutes": movie.duration_minutes,
+        "ranking_score": round(movie.ranking_score, 2),
+    }
+
+
+class _MovieTable:
+    """Append-only v2 movie table; a slot refers to a movie by its row number."""
+
+    def __init__(self):
+        self.rows = []
+        self._refs = {}
+
+    def refs(self, movies):
+        refs = []
+        for movie in movies:
+            ref = self._refs.get(movie.movie_id)
+            if ref is None:
+                ref = self._refs[movie.movie_id] = len(self.rows)
+                self.rows.append({"movie_id": movie.movie_id, **_movie_entry(movie)})
+            refs.append(ref)
+        return refs
 
+
+async def get_slot_movie_recommendations(user_data: dict, user_id: str = settings.DEFAULT_USER_ID,
+                                         limit: int = 50, offset: int = 0, mode: str = "list",
+                                         source_weights: dict = None,
+                                         candidate_pool: int = settings.RECOMMENDATION_CANDIDATE_POOL):
+    """
+    Builds per-slot movie recommendations from a consolidated mood/calendar
+    object (the /trigger/final-recommendation payload) and the user's ranked movies.
+
+    Only the `candidate_pool` best movies matching the user's moods are considered.
+    Each signal's mood is weighted by `source_weights` ("environment", "smartwatch",
+    "voice"; defaults from settings), and list mode ranks by that weighted score.
+
+    mode="list": each slot lists at most `limit` movies, best ranked first, skipping
+    the first `offset`; "movie_count" is the number of candidates that fit the slot.
+    mode="plan": each slot gets the set of titles with the highest total ranking score
+    that fits in it back to back ("planned_minutes"), without repeating a title
+    across slots; `limit` and `offset` do not apply.
+
+    This is the v1 format: a mood header before every slot and the full movie
+    record in every slot it appears in. See get_slot_movie_recommendations_v2.
+    """
+    return await asyncio.to_thread(_recommendations_v1, user_data, user_id, limit, offset, mode,
+                                   source_weights, candidate_pool)
+
+
+def _recommendations_v1(user_data, user_id, limit, offset, mode, source_weights, candidate_pool):
+    final_output = []
+    global_movie_id = 1
+
+    for idx, start, end, free_minutes, fit_count, top_movies in _iter_slots(
+            user_data, user_id, limit, offset, mode, source_weights, candidate_pool):
         fitting_movie_list = []
-        for movie in fitting_movies:
-            title = movie['title']
-            if not title:  # Skip if title is empty
-                continue
+        for movie in top_movies:
             fitting_movie_list.append({
                 "id": global_movie_id,
-                "movie_id": movie['movie_id'],
-                "title": title,
-                "duration_minutes": movie['duration_minutes'],
-                "ranking_score": round(movie['ranking_score'], 2)
+                "movie_id": movie.movie_id,
+                **_movie_entry(movie),
             })
             global_movie_id += 1
 
-        final_output.append({
-            "environment_mood": user_data["environment_mood"],
-            "voice_mood": user_data["voice_mood"],
-            "smartwatch_mood": user_data["smartwatch_mood"],
-        })
-
-        final_output.append({
-            "slot_id": idx,
-            "start_time": start.isoformat(),
-            "end_time": end.isoformat(),
-            "free_minutes": free_minutes,
-            "movie_count": len(fitting_movie_list),
-            "fitting_movies": fitting_movie_list
-        })
+        final_output.append(_mood_header(user_data))
+
+        slot_output = _slot_fields(idx, start, end, free_minutes, fit_count, top_movies, mode)
+        slot_output["fitting_movies"] = fitting_movie_list
+        final_output.append(slot_output)
 
     return final_output
+
+
+async def get_slot_movie_recommendations_v2(user_data: dict, user_id: str = settings.DEFAULT_USER_ID,
+                                            limit: int = 50, offset: int = 0, mode: str = "list",
+                                            source_weights: dict = None,
+                                            candidate_pool: int = settings.RECOMMENDATION_CANDIDATE_POOL):
+    """
+    Same recommendations as get_slot_movie_recommendations in the compact v2 format:
+
+        {"version": 2, "moods": {...},
+         "movies": [{movie_id, title, duration_minutes, ranking_score}, ...],
+         "slots": [{slot_id, start_time, end_time, free_minutes, movie_count, movie_refs}, ...]}
+
+    The mood header is sent once and every movie's record once. A slot's
+    "movie_refs" are indexes into "movies", in ranked order.
+    """
+    return await asyncio.to_thread(_recommendations_v2, user_data, user_id, limit, offset, mode,
+                                   source_weights, candidate_pool)
+
+
+def _recommendations_v2(user_data, user_id, limit, offset, mode, source_weights, candidate_pool):
+    table = _MovieTable()
+    slots = []
+    for idx, start, end, free_minutes, fit_count, top_movies in _iter_slots(
+            user_data, user_id, limit, offset, mode, source_weights, candidate_pool):
+        slot_output = _slot_fields(idx, start, end, free_minutes, fit_count, top_movies, mode)
+        slot_output["movie_refs"] = table.refs(top_movies)
+        slots.append(slot_output)
+
+    return {"version": 2, "moods": _mood_header(user_data), "movies": table.rows, "slots": slots}
+
+
+async def iter_slot_movie_recommendations_v2(user_data: dict, user_id: str = settings.DEFAULT_USER_ID,
+                                             limit: int = 50, offset: int = 0, mode: str = "list",
+                                             source_weights: dict = None,
+                                             candidate_pool: int = settings.RECOMMENDATION_CANDIDATE_POOL):
+    """
+    Streaming variant of the v2 format, one record per yield:
+
+        {"type": "moods", "version": 2, "moods": {...}}
+        {"type": "slot", ..., "new_movies": [...], "movie_refs": [...]}
+        ...
+        {"type": "end", "slot_count": n}
+
+    "new_movies" are appended, in order, to the movie table built from earlier
+    records and "movie_refs" index into that table. A slot is computed only after
+    the previous record has been handed out, so a client can render the first slot
+    before the last one exists. Unknown users raise UnknownUserError before
+    anything is yielded.
+    """
+    slots = _iter_slots(user_data, user_id, limit, offset, mode, source_weights, candidate_pool)
+    # Pull the first slot up front so lookup errors surface before the stream starts.
+    # Each slot is computed on a worker thread, one at a time, never on the event loop.
+    first = await asyncio.to_thread(next, slots, None)
+
+    yield {"type": "moods", "version": 2, "moods": _mood_header(user_data)}
+
+    table = _MovieTable()
+    slot_count = 0
+    slot = first
+    while slot is not None:
+        idx, start, end, free_minutes, fit_count, top_movies = slot
+        sent = len(table.rows)
+        record = {"type": "slot", **_slot_fields(idx, start, end, free_minutes, fit_count, top_movies, mode)}
+        record["movie_refs"] = table.refs(top_movies)
+        record["new_movies"] = table.rows[sent:]
+        slot_count += 1
+        yield record
+        slot = await asyncio.to_thread(next, slots, None)
+    yield {"type": "end", "slot_count": slot_count}
@@ -0,0 +1,43 @@
+"""
+Multi-mood retrieval over the catalog's inverted index.
+
+Each mood has a posting list of movies ordered by ranking_score. The union for a
+set of moods is produced by a k-way heap merge of those lists, each scaled by its
+mood's weight, and stops as soon as K distinct movies have come out; a query
+costs O(K log m) for m moods no matter how large the catalog is.
+"""
+import heapq
+
+
+def top_k_by_moods(by_mood: dict, mood_weights: dict, k: int):
+    """
+    Returns up to k (weighted_score, Movie) pairs, best first, for movies tagged with
+    any of the weighted moods. A movie tagged with several of them is scored by its
+    highest weighted posting and appears once.
+
+    by_mood: mood -> list of Movies, highest ranking_score first.
+    mood_weights: mood -> weight (> 0); moods missing from the index are ignored.
+    """
+    heap = []
+    for mood, weight in mood_weights.items():
+        postings = by_mood.get(mood)
+        if postings and weight > 0:
+            heap.append((-weight * postings[0].ranking_score, 0, mood, weight))
+    heapq.heapify(heap)
+
+    seen = set()
+    results = []
+    while heap and len(results) < k:
+        neg_score, position, mood, weight = heap[0]
+        postings = by_mood[mood]
+        movie = postings[position]
+        if movie.movie_id not in seen:
+            seen.add(movie.movie_id)
+            results.append((-neg_score, movie))
+
+        position += 1
+        if position < len(postings):
+            heapq.heapreplace(heap, (-weight * postings[position].ranking_score, position, mood, weight))
+        else:
+            heapq.heappop(heap)
+    return results
@@ -0,0 +1,81 @@
+"""
+Playlist planner: fills each free slot with the set of titles that maximises
+total ranking_score within the slot length, never repeating a title across slots.
+
+Each slot is a 0/1 knapsack over whole minutes, solved exactly by a NumPy DP
+(one vector update per candidate). To keep that in the millisecond range for
+large catalogs, the DP only sees a bounded shortlist: the best titles by score
+plus the best by score per minute, which is where any optimal packing draws from
+in practice.
+"""
+import numpy as np
+
+# Candidates kept per ranking (score, score per minute) before the DP runs
+DEFAULT_SHORTLIST_SIZE = 128
+
+
+def _shortlist(ranked_lists, capacity, used, size):
+    """Walks each ranking and keeps the first `size` unused titles that fit the slot."""
+    shortlist = {}
+    for ranked in ranked_lists:
+        taken = 0
+        for movie in ranked:
+            if movie.duration_minutes <= capacity and movie.movie_id not in used:
+                shortlist[movie.movie_id] = movie
+                taken += 1
+                if taken == size:
+                    break
+    return list(shortlist.values())
+
+
+def _knapsack(movies, capacity):
+    """Exact 0/1 knapsack over integer minutes; returns the chosen movies."""
+    weights = [max(m.duration_minutes, 1) for m in movies]
+    best = np.zeros(capacity + 1)
+    taken = np.zeros((len(movies), capacity + 1), dtype=bool)
+
+    for i, (movie, weight) in enumerate(zip(movies, weights)):
+        if weight > capacity:
+            continue
+        with_item = best[:capacity + 1 - weight] + movie.ranking_score
+        improves = with_item > best[weight:]
+        taken[i, weight:] = improves
+        best[weight:] = np.where(improves, with_item, best[weight:])
+
+    chosen = []
+    remaining = capacity
+    for i in range(len(movies) - 1, -1, -1):
+        if taken[i, remaining]:
+            chosen.append(movies[i])
+            remaining -= weights[i]
+    chosen.reverse()
+    return chosen
+
+
+def iter_plan_slots(movies, slot_minutes, shortlist_size: int = DEFAULT_SHORTLIST_SIZE):
+    """
+    Plans a playlist for each slot, in the order given, yielding each one as soon
+    as it is solved.
+
+    movies: candidate Movie records (duration_minutes, ranking_score, movie_id).
+    slot_minutes: free minutes per slot.
+    Yields one list of Movies per slot, best ranked first; a title picked for an
+    earlier slot is not offered to later ones.
+    """
+    ranked_lists = (
+        sorted(movies, key=lambda m: m.ranking_score, reverse=True),
+        sorted(movies, key=lambda m: m.ranking_score / max(m.duration_minutes, 1), reverse=True),
+    )
+    used = set()
+    for capacity in slot_minutes:
+        capacity = int(capacity)
+        shortlist = _shortlist(ranked_lists, capacity, used, shortlist_size) if capacity > 0 else []
+        playlist = _knapsack(shortlist, capacity) if shortlist else []
+        playlist.sort(key=lambda m: m.ranking_score, reverse=True)
+        used.update(m.movie_id for m in playlist)
+        yield playlist
+
+
+def plan_slots(movies, slot_minutes, shortlist_size: int = DEFAULT_SHORTLIST_SIZE):
+    """Returns the playlists of iter_plan_slots as a list."""
+    return list(iter_plan_slots(movies, slot_minutes, shortlist_size))
@@ -0,0 +1,238 @@
+"""
+User-sharded store of ranked movies for multi-user recommendation serving.
+
+build_ranked_store consolidates the per-user `<user>_ranked.csv` files written by
+the user_activity pipeline into a fixed number of shard files. Each shard holds
+the rows of its users back to back plus an index of (offset, length) per user,
+and the shard a user lives in is crc32(user_id) % num_shards.
+
+RankedStore opens a shard (memory-mapped, with its index) the first time one of
+its users is requested and keeps it open; a user's rows are then one slice of
+that map. Built rankings are kept in an LRU capped at `max_users`, so cold users
+are evicted and the process never opens a file per request.
+
+The store is built offline, or by the backend at startup when it is missing
+(ensure_built); a request never builds it.
+
+Usage (rebuild after the ranking pipeline runs):
+    python -m intell.app.core.recommendation_engine.ranked_store [num_shards]
+"""
+import csv
+import json
+import logging
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from intell.app.core.recommendation_engine.catalog import build_ranking, catalog_store
+
+RANKED_DIR = "intell/app/core/user_activity/ranked"
+STORE_DIR = "intell/app/core/recommendation_engine/ranked_store"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_NUM_SHARDS = 64
+DEFAULT_MAX_USERS = 50000
+
+
+class RankedStoreMissing(RuntimeError):
+    """Raised when the ranked store has not been built."""
+
+
+def shard_of(user_id: str, num_shards: int) -> int:
+    return zlib.crc32(user_id.encode('utf-8')) % num_shards
+
+
+def _shard_paths(store_dir: str, shard: int):
+    base = os.path.join(store_dir, f"shard_{shard:04d}")
+    return base + ".csv", base + ".idx"
+
+
+def build_ranked_store(ranked_dir: str = RANKED_DIR, store_dir: str = STORE_DIR,
+                       num_shards: int = DEFAULT_NUM_SHARDS) -> dict:
+    """
+    Consolidates every `<user>_ranked.csv` in ranked_dir into num_shards shard files.
+    The new store is written next to store_dir and swapped in with a rename.
+    Returns the manifest.
+    """
+    tmp_dir = store_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    data_files = [open(_shard_paths(tmp_dir, i)[0], 'wb') for i in range(num_shards)]
+    index_files = [open(_shard_paths(tmp_dir, i)[1], 'w', encoding='utf-8') for i in range(num_shards)]
+    users = 0
+    try:
+        for file in sorted(os.listdir(ranked_dir)):
+            if not file.endswith("_ranked.csv"):
+                continue
+            user_id = file.replace("_ranked.csv", "")
+            shard = shard_of(user_id, num_shards)
+
+            with open(os.path.join(ranked_dir, file), 'r', encoding='utf-8') as f:
+                lines = [f"{row['movie_id']},{row['ranking_score']}\n" for row in csv.DictReader(f)]
+
+            payload = ''.join(lines).encode('utf-8')
+            offset = data_files[shard].tell()
+            data_files[shard].write(payload)
+            index_files[shard].write(f"{user_id},{offset},{len(payload)}\n")
+            users += 1
+    finally:
+        for f in data_files + index_files:
+            f.close()
+
+    manifest = {"num_shards": num_shards, "users": users, "built_at": time.time()}
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    old_dir = store_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.rename(store_dir, old_dir)
+    os.rename(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    logging.info(f"Built ranked store for {users} users in {num_shards} shards at {store_dir}")
+    return manifest
+
+
+class _Shard:
+    def __init__(self, store_dir: str, shard: int):
+        data_path, index_path = _shard_paths(store_dir, shard)
+        self.index = {}
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                user_id, offset, length = line.rstrip('\n').split(',')
+                self.index[user_id] = (int(offset), int(length))
+        self._file = open(data_path, 'rb')
+        # mmap refuses empty files; such a shard has no rows to read
+        has_rows = os.fstat(self._file.fileno()).st_size > 0
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if has_rows else None
+
+    def rows(self, user_id: str):
+        location = self.index.get(user_id)
+        if location is None:
+            return None
+        offset, length = location
+        if length == 0:
+            return []
+        text = self._map[offset:offset + length].decode('utf-8')
+        rows = []
+        for line in text.splitlines():
+            movie_id, score = line.split(',')
+            rows.append((movie_id, float(score)))
+        return rows
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class RankedStore:
+    """Serves per-user Rankings from the sharded store."""
+
+    def __init__(self, store_dir: str = STORE_DIR, ranked_dir: str = RANKED_DIR,
+                 max_users: int = DEFAULT_MAX_USERS, check_interval: float = 5.0):
+        self.store_dir = store_dir
+        self.ranked_dir = ranked_dir
+        self.max_users = max_users
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._num_shards = None
+        self._manifest_mtime = None
+        self._last_check = 0.0
+        self._shards = {}
+        self._users = OrderedDict()  # user_id -> (catalog mtimes, Ranking), least recently used first
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "unknown_users": 0}
+
+    def ensure_built(self):
+        """Builds the store from ranked_dir if it is missing; a startup step, never run per request."""
+        if not os.path.exists(os.path.join(self.store_dir, MANIFEST_FILE)):
+            logging.warning(f"Ranked store not found at {self.store_dir}; building it from {self.ranked_dir}.")
+            build_ranked_store(self.ranked_dir, self.store_dir)
+
+    def _open_manifest(self):
+        manifest_path = os.path.join(self.store_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise RankedStoreMissing(f"Ranked store not found at {self.store_dir}; build it with "
+                                     f"python -m intell.app.core.recommendation_engine.ranked_store")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            self._num_shards = json.load(f)["num_shards"]
+        self._manifest_mtime = os.stat(manifest_path).st_mtime
+        self._last_check = time.monotonic()
+
+    def _check_rebuilt(self):
+        # A rebuilt store replaces the whole directory; drop everything opened from the old one
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.stat(os.path.join(self.store_dir, MANIFEST_FILE)).st_mtime
+        except OSError:
+            return
+        if mtime != self._manifest_mtime:
+            logging.info("Ranked store was rebuilt; reopening shards.")
+            self._close_shards()
+            self._users.clear()
+            self._open_manifest()
+
+    def _close_shards(self):
+        for shard in self._shards.values():
+            shard.close()
+        self._shards.clear()
+
+    def get_user(self, user_id: str):
+        """Returns the user's Ranking, or None if the store has no rows for them; RankedStoreMissing if unbuilt."""
+        catalog = catalog_store.get()
+        with self._lock:
+            if self._num_shards is None:
+                self._open_manifest()
+            else:
+                self._check_rebuilt()
+
+            cached = self._users.get(user_id)
+            # rankings built against an older catalog are rebuilt
+            if cached is not None and cached[0] == catalog.mtimes:
+                self._users.move_to_end(user_id)
+                self._stats["hits"] += 1
+                return cached[1]
+            self._stats["misses"] += 1
+
+            shard_id = shard_of(user_id, self._num_shards)
+            shard = self._shards.get(shard_id)
+            if shard is None:
+                shard = self._shards[shard_id] = _Shard(self.store_dir, shard_id)
+            rows = shard.rows(user_id)
+            if rows is None:
+                self._stats["unknown_users"] += 1
+                return None
+
+            ranking = build_ranking(rows, catalog.metadata)
+            self._users[user_id] = (catalog.mtimes, ranking)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._stats["evictions"] += 1
+            return ranking
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "cached_users": len(self._users),
+                "max_users": self.max_users,
+                "open_shards": len(self._shards),
+                "num_shards": self._num_shards,
+            }
+
+
+ranked_store = RankedStore()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    shards = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUM_SHARDS
+    print(build_ranked_store(num_shards=shards))
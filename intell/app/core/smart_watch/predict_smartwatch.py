@@ -2,15 +2,110 @@ import pandas as pd
 import joblib
 import logging
 
+from intell.app.core.compact_forest import CompactForest, export_forest, is_current
+from intell.app.core.feature_spec import FeatureSpec, unix_timestamp
+from intell.app.core.model_registry import model_registry
+from intell.app.core.smart_watch.watch_value_generator import generate_sample_row
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def predict_single_sample_mood(sample_data: dict, model_path: str = "C:/Personal/HackOn Amazon/intell/app/outputs/smart_watch.pkl"):    
-    logging.info("Loading model for single sample prediction...")
+SMART_WATCH_MODEL_PATH = "intell/app/outputs/smart_watch.pkl"
+# Array-only export of the same model (intell.app.core.compact_forest)
+SMART_WATCH_COMPACT_PATH = "intell/app/outputs/smart_watch.npz"
+SMART_WATCH_MODEL = "smart_watch"
+# One-hot encoded at training time with get_dummies(drop_first=True)
+CATEGORICAL_COLUMNS = ["activity_type", "location_type"]
+
+
+def load_smart_watch_assets(model_path: str) -> dict:
+    """
+    Loads the pickled {'model', 'columns'} assets written by smart_watch_mood.save_model,
+    or their compact .npz export, and compiles their feature spec: 'spec' encodes
+    samples straight into the input of 'estimator'.
+    """
+    if model_path.endswith(".npz"):
+        return _load_compact_assets(model_path)
+    loaded_assets = joblib.load(model_path)
+    # Raises KeyError for files saved without both keys
+    assets = {'model': loaded_assets['model'], 'columns': loaded_assets['columns']}
+    assets['spec'], assets['estimator'] = compile_smart_watch_spec(assets['model'], assets['columns'])
+    return assets
+
+
+def compile_smart_watch_spec(model, trained_columns):
+    """
+    Returns (spec, estimator). The scaler step of the training pipeline is folded
+    into the spec, so the estimator is the forest alone.
+    """
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = None
+    estimator = model
+    if isinstance(model, Pipeline) and len(model.steps) == 2 and isinstance(model[0], StandardScaler):
+        scaler, estimator = model[0], model[-1]
+    spec = FeatureSpec.from_dummy_columns(
+        trained_columns, CATEGORICAL_COLUMNS, scaler=scaler,
+        scaled_columns=None if scaler is None else list(trained_columns),
+        converters={'timestamp': unix_timestamp})
+    return spec, estimator
+
+
+def _load_compact_assets(model_path: str) -> dict:
+    forest, extra = CompactForest.load(model_path)
+    columns = pd.Index(extra['columns'].tolist())
+    spec = FeatureSpec.from_dummy_columns(
+        columns, CATEGORICAL_COLUMNS, mean=extra['scaler_mean'], scale=extra['scaler_scale'],
+        converters={'timestamp': unix_timestamp})
+    return {'model': forest, 'columns': columns, 'spec': spec, 'estimator': forest}
+
+
+def export_smart_watch_pipeline(pipeline, trained_columns, output_path: str = SMART_WATCH_COMPACT_PATH,
+                                source_path: str = None):
+    """
+    Writes the compact export of a trained Pipeline(StandardScaler, RandomForestClassifier).
+    source_path: the pickle it was saved to, fingerprinted so a stale export is not served.
+    """
+    scaler, forest = pipeline[0], pipeline[-1]
+    export_forest(forest, output_path, sources=[source_path] if source_path else (),
+                  columns=[str(col) for col in trained_columns],
+                  scaler_mean=scaler.mean_, scaler_scale=scaler.scale_)
+    logging.info(f"Compact smartwatch model exported to {output_path}")
+
+
+def export_smart_watch_model(model_path: str = SMART_WATCH_MODEL_PATH, output_path: str = SMART_WATCH_COMPACT_PATH):
+    """Exports the pickled smartwatch model to its compact .npz form."""
+    assets = joblib.load(model_path)
+    export_smart_watch_pipeline(assets['model'], assets['columns'], output_path, source_path=model_path)
+
+
+def _load_serving_assets(model_path: str) -> dict:
+    # Chosen at every (re)load: the compact export is served when it was made from the current pickle
+    if is_current(SMART_WATCH_COMPACT_PATH, model_path):
+        return load_smart_watch_assets(SMART_WATCH_COMPACT_PATH)
+    return load_smart_watch_assets(model_path)
+
+
+def warm_up_smart_watch(assets: dict):
+    """One dummy prediction, so the first real request does not pay first-call costs."""
+    _predict_with_assets(generate_sample_row(), assets)
+
+
+def _registered_model(model_path: str) -> str:
+    # The default model is registered at import; other paths get their own entry
+    if model_path == SMART_WATCH_MODEL_PATH:
+        return SMART_WATCH_MODEL
+    name = f"{SMART_WATCH_MODEL}:{model_path}"
+    model_registry.register(name, model_path, load_smart_watch_assets, warm_up_smart_watch)
+    return name
+
+
+def predict_single_sample_mood(sample_data: dict, model_path: str = SMART_WATCH_MODEL_PATH):
+    """Predicts the mood for one smartwatch sample with the shared, preloaded model."""
+    name = _registered_model(model_path)
     try:
-        loaded_assets = joblib.load(model_path)
-        model = loaded_assets['model']
-        trained_columns = loaded_assets['columns']
+        assets = model_registry.get(name)
     except FileNotFoundError:
         logging.error(f"Model file not found at {model_path}. Please ensure the training script has been run and the model is saved.")
         return "Error: Model not found."
@@ -18,43 +113,72 @@ def predict_single_sample_mood(sample_data: dict, model_path: str = "C:/Personal
         logging.error("Model file does not contain 'model' or 'columns' keys. Ensure the save_model function is correctly saving both.")
         return "Error: Invalid model file."
 
-    logging.info("Preprocessing single sample...")
-    sample_df = pd.DataFrame([sample_data])
+    with model_registry.timed(name):
+        return _predict_with_assets(sample_data, assets)
+
+
+def predict_batch_moods(samples: list, model_path: str = SMART_WATCH_MODEL_PATH) -> list:
+    """
+    Predicts the moods for many smartwatch samples with one model.predict call.
+    Raises FileNotFoundError/KeyError when the model cannot be loaded, and
+    ValueError when a sample cannot be encoded.
+    """
+    if not samples:
+        return []
+    name = _registered_model(model_path)
+    assets = model_registry.get(name)
+    with model_registry.timed(name):
+        return assets['estimator'].predict(assets['spec'].encode(samples)).tolist()
+
+
+def encode_samples(samples: list, trained_columns: pd.Index) -> pd.DataFrame:
+    """
+    Encodes raw samples into the trained feature columns, the same way for one
+    sample or many (the pandas reference for the compiled spec used to predict):
+      - 'timestamp' strings become Unix timestamps (naive values are read as UTC)
+      - each categorical value sets its own trained one-hot column; the category
+        dropped at training time (drop_first) and unseen ones leave all of them 0
+      - missing columns are 0 and everything is cast to float
+    """
+    sample_df = pd.DataFrame(samples)
 
     # Convert datetime column to numerical (Unix timestamp)
-    if 'timestamp' in sample_df.columns and sample_df['timestamp'].dtype == 'object':
-        try:
-            sample_df['timestamp'] = pd.to_datetime(sample_df['timestamp'])
-            sample_df['timestamp'] = sample_df['timestamp'].apply(lambda x: x.timestamp())
-            logging.info("Converted 'timestamp' in sample to Unix timestamp.")
-        except ValueError:
-            logging.warning("Could not convert 'timestamp' in sample to datetime.")
-
-    # Apply one-hot encoding for categorical columns in the sample
-    categorical_cols = [col for col in ["activity_type", "location_type"] if col in sample_df.columns]
-    if categorical_cols:
-        sample_df = pd.get_dummies(sample_df, columns=categorical_cols, prefix=categorical_cols, drop_first=True)
-        logging.info(f"Applied one-hot encoding to {categorical_cols} in sample.")
+    # (pandas 3 infers the 'str' dtype rather than 'object' for strings)
+    if 'timestamp' in sample_df.columns and not pd.api.types.is_numeric_dtype(sample_df['timestamp']):
+        timestamps = pd.to_datetime(sample_df['timestamp'], utc=True, format='mixed')
+        sample_df['timestamp'] = (timestamps - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)
 
     # Align sample columns with trained model columns
     sample_X = sample_df.reindex(columns=trained_columns, fill_value=0)
-    
-    # Ensure data types match (important for consistent prediction)
-    # This part can be tricky if the original dtypes are not preserved or if new categories appear.
-    # For simplicity, we'll try to cast to float where applicable, assuming numerical features.
-    for col in trained_columns:
-        if col in sample_X.columns and sample_X[col].dtype != trained_columns.dtype:
-            try:
-                sample_X[col] = sample_X[col].astype(float)
-            except:
-                # Fallback for columns that genuinely aren't convertible to float (e.g., if a new unexpected string got in)
-                logging.warning(f"Could not cast column '{col}' to float for prediction.")
-                pass # Leave as is, or consider more robust error handling
-
-    logging.info("Making prediction...")
-    prediction = model.predict(sample_X)
+
+    # One-hot columns are named '<column>_<value>' by get_dummies at training time
+    for col in CATEGORICAL_COLUMNS:
+        if col not in sample_df.columns:
+            continue
+        prefix = col + "_"
+        for trained_col in trained_columns:
+            if trained_col.startswith(prefix):
+                sample_X[trained_col] = (sample_df[col] == trained_col[len(prefix):]).astype(float)
+
+    return sample_X.astype(float)
+
+
+def _predict_with_assets(sample_data: dict, assets: dict):
+    logging.debug("Preprocessing single sample...")
+    try:
+        sample_X = assets['spec'].encode_one(sample_data)
+    except ValueError as e:
+        logging.warning(f"Could not encode sample for prediction: {e}")
+        raise
+
+    logging.debug("Making prediction...")
+    prediction = assets['estimator'].predict(sample_X)
     return prediction[0]
-from intell.app.core.smart_watch.watch_value_generator import generate_sample_row
+
+
+# A new smart_watch.pkl (or a new export) is hot-swapped in
+model_registry.register(SMART_WATCH_MODEL, SMART_WATCH_MODEL_PATH, _load_serving_assets, warm_up_smart_watch,
+                        watch=(SMART_WATCH_MODEL_PATH, SMART_WATCH_COMPACT_PATH))
 
 if __name__ == "__main__":
     logging.info("\n--- Running single sample prediction script ---")
@@ -1,60 +1,184 @@
+"""
+Trains the smartwatch mood model.
+
+The telemetry export's columns are declared up front: the timestamp, the
+numeric features, the categorical features and the label. The CSV is read with
+those dtypes, and every feature is written straight into one float64 matrix in
+a single pass. Categorical columns are one-hot encoded with drop_first, as
+get_dummies did, so the trained columns match what predict_smartwatch encodes.
+The forest trains on all cores. An optional grid search runs its cross-validation
+fits in a process pool.
+
+Usage:
+    python -m intell.app.core.smart_watch.smart_watch_mood [data.csv] [--search]
+"""
 import pandas as pd
 import numpy as np
 import joblib
 import logging
-from pathlib import Path
+import os
+import sys
+import time
+from contextlib import contextmanager
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GridSearchCV, train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report
 
+from intell.app.core.smart_watch.predict_smartwatch import CATEGORICAL_COLUMNS, export_smart_watch_pipeline
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+DATA_PATH = "intell/app/ingestion/synthetic_emotion_dataset.csv"
+
+# Schema of the telemetry export
+TIMESTAMP_COLUMN = "timestamp"
+NUMERIC_COLUMNS = [
+    "heart_rate", "hrv", "skin_temp", "eda", "spo2", "respiratory_rate", "steps",
+    "movement_intensity", "calories_burned", "distance", "sedentary_minutes",
+    "sleep_duration", "rem_sleep", "deep_sleep", "light_sleep", "sleep_score",
+    "sleep_interruptions", "stress_score", "readiness_score", "mindfulness_minutes",
+    "ambient_light", "ambient_noise", "screen_time_minutes", "typing_speed_wpm",
+    "social_interactions",
+]
+LABEL_COLUMN = "emotion"
+
+# Grid tried by --search; its cross-validation fits run in parallel processes
+SEARCH_GRID = {
+    "classifier__n_estimators": [100, 200],
+    "classifier__max_depth": [None, 20],
+    "classifier__min_samples_leaf": [1, 5],
+}
+SEARCH_CV_FOLDS = 3
+# The search runs on a stratified sample of at most this many training rows
+SEARCH_MAX_ROWS = 200000
+
+
+class StageTimer:
+    """Wall-clock time of each named training stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - started
+            logging.info(f"Stage '{name}' took {self.stages[name]:.2f}s")
+
+    def report(self) -> str:
+        total = sum(self.stages.values())
+        lines = [f"{name:<10} {seconds:9.2f}s {100 * seconds / total if total else 0:5.1f}%"
+                 for name, seconds in self.stages.items()]
+        return "\n".join(lines + [f"{'total':<10} {total:9.2f}s"])
+
+
 def load_data(csv_file: str) -> pd.DataFrame:
     logging.info("Loading data from CSV...")
-    df = pd.read_csv(csv_file)
-    return df
+    dtypes = {col: "float64" for col in NUMERIC_COLUMNS}
+    dtypes.update({col: "category" for col in CATEGORICAL_COLUMNS})
+    dtypes[LABEL_COLUMN] = "category"
+    dtypes[TIMESTAMP_COLUMN] = "str"
+    return pd.read_csv(csv_file, usecols=[TIMESTAMP_COLUMN, *NUMERIC_COLUMNS, *CATEGORICAL_COLUMNS, LABEL_COLUMN],
+                       dtype=dtypes)
 
-def preprocess_data(df: pd.DataFrame):
-    logging.info("Preprocessing data...")
 
-    # Attempt to convert datetime columns to numerical (Unix timestamp)
-    for col in df.columns:
-        if df[col].dtype == 'object' and col != "emotion":  # Exclude the target label, now 'emotion'
-            try:
-                # Attempt to convert to datetime
-                df[col] = pd.to_datetime(df[col])
-                # If successful, convert to Unix timestamp
-                df[col] = df[col].apply(lambda x: x.timestamp())
-                logging.info(f"Converted column '{col}' to Unix timestamp.")
-            except ValueError:
-                # If conversion fails, it's not a datetime string, assume it's a categorical string
-                logging.info(f"Column '{col}' is not a datetime string. Applying one-hot encoding.")
-                df = pd.get_dummies(df, columns=[col], prefix=col, drop_first=True) # Apply one-hot encoding
-
-    # Drop rows with missing values if any
-    df.dropna(inplace=True)
-
-    # Separate features and labels
-    X = df.drop(columns=["emotion"])  # assuming 'emotion' is the target label
-    y = df["emotion"]
+def encode_features(df: pd.DataFrame, trained_columns=None):
+    """
+    Encodes the schema's columns into one float64 matrix. Returns (X, y) as a
+    DataFrame and a Series. Timestamps become Unix seconds: ones with an offset
+    or 'Z' are converted to UTC, naive ones are read as UTC, and a column may mix
+    all three. Rows with a missing or unparseable timestamp, a missing numeric
+    value or a missing label are dropped. A missing category leaves its one-hot
+    columns at 0.
+    trained_columns: encode into an existing model's columns (categories without a
+    column, including ones the model never saw, leave theirs at 0) instead of
+    deriving them from the data.
+    """
+    logging.info("Encoding features...")
+    # Naive timestamps are read as UTC, like predict_smartwatch.encode_samples at serving time
+    timestamps = pd.to_datetime(df[TIMESTAMP_COLUMN], format="ISO8601", errors="coerce", utc=True)
+    seconds = ((timestamps - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)).to_numpy(
+        dtype=np.float64, na_value=np.nan)
 
+    # One-hot columns are '<column>_<value>' for every sorted category but the first (drop_first)
+    dummies = []
+    for col in CATEGORICAL_COLUMNS:
+        if trained_columns is None:
+            values = sorted(df[col].dropna().unique())[1:]
+        else:
+            prefix = col + "_"
+            values = [trained[len(prefix):] for trained in trained_columns if trained.startswith(prefix)]
+        # -1 for the dropped category, unknown and missing values
+        codes = pd.Categorical(df[col], categories=values).codes
+        dummies.append((col, values, codes))
+
+    columns = [TIMESTAMP_COLUMN, *NUMERIC_COLUMNS] + [f"{col}_{value}" for col, values, _ in dummies for value in values]
+    X = np.zeros((len(df), len(columns)), dtype=np.float64)
+    X[:, 0] = seconds
+    X[:, 1:1 + len(NUMERIC_COLUMNS)] = df[NUMERIC_COLUMNS].to_numpy(dtype=np.float64, na_value=np.nan)
+    offset = 1 + len(NUMERIC_COLUMNS)
+    rows = np.arange(len(df))
+    for col, values, codes in dummies:
+        hot = codes >= 0
+        X[rows[hot], offset + codes[hot]] = 1.0
+        offset += len(values)
+    if trained_columns is not None and columns != list(trained_columns):
+        raise ValueError("The model's columns do not match the telemetry schema; retrain it from scratch.")
+
+    keep = ~np.isnan(X[:, :1 + len(NUMERIC_COLUMNS)]).any(axis=1) & df[LABEL_COLUMN].notna().to_numpy()
+    if not keep.all():
+        logging.info(f"Dropping {int((~keep).sum())} rows with missing values.")
+    X = pd.DataFrame(X[keep], columns=columns)
+    y = pd.Series(df[LABEL_COLUMN].to_numpy()[keep].astype(str), name=LABEL_COLUMN)
+    return X, y
+
+
+def preprocess_data(df: pd.DataFrame):
+    logging.info("Preprocessing data...")
+    X, y = encode_features(df)
     return train_test_split(X, y, test_size=0.2, random_state=42)
 
-def build_pipeline() -> Pipeline:
+
+def build_pipeline(n_jobs: int = -1, **classifier_params) -> Pipeline:
     logging.info("Building model pipeline...")
+    params = {"n_estimators": 100, "random_state": 42, **classifier_params}
     pipeline = Pipeline([
         ("scaler", StandardScaler()),
-        ("classifier", RandomForestClassifier(n_estimators=100, random_state=42))
+        # Trees are fitted on every core; the fitted forest does not depend on n_jobs
+        ("classifier", RandomForestClassifier(n_jobs=n_jobs, **params))
     ])
     return pipeline
 
+
+def search_hyperparameters(X_train, y_train, grid: dict = None, n_jobs: int = -1,
+                           max_rows: int = SEARCH_MAX_ROWS) -> dict:
+    """
+    Grid search with SEARCH_CV_FOLDS-fold cross-validation; the fits are spread
+    over n_jobs worker processes (joblib's process pool memory-maps large arrays
+    instead of copying them) and each uses one core. Returns the best
+    classifier parameters.
+    """
+    if len(X_train) > max_rows:
+        X_train, _, y_train, _ = train_test_split(X_train, y_train, train_size=max_rows,
+                                                  stratify=y_train, random_state=42)
+    search = GridSearchCV(build_pipeline(n_jobs=1), grid or SEARCH_GRID, cv=SEARCH_CV_FOLDS,
+                          scoring="f1_macro", n_jobs=n_jobs, refit=False)
+    search.fit(X_train, y_train)
+    logging.info(f"Best parameters {search.best_params_} (macro F1 {search.best_score_:.3f}) "
+                 f"from {len(search.cv_results_['params'])} candidates on {len(X_train)} rows.")
+    return {name.split("__", 1)[1]: value for name, value in search.best_params_.items()}
+
+
 def train_and_evaluate(X_train, X_test, y_train, y_test, pipeline: Pipeline):
     logging.info("Training the model...")
     pipeline.fit(X_train, y_train)
-    
+
     logging.info("Evaluating model...")
     predictions = pipeline.predict(X_test)
     report = classification_report(y_test, predictions)
@@ -62,14 +186,43 @@ def train_and_evaluate(X_train, X_test, y_train, y_test, pipeline: Pipeline):
 
     return pipeline
 
-def save_model(model: Pipeline, X_train_cols: pd.Index, output_path: str = "C:/Personal/HackOn Amazon/intell/app/outputs/smart_watch.pkl"):
-    joblib.dump({'model': model, 'columns': X_train_cols}, output_path)
+def save_model(model: Pipeline, X_train_cols: pd.Index, output_path: str = "intell/app/outputs/smart_watch.pkl"):
+    # Write next to the target and rename over it, so a running server's model
+    # registry never loads a half-written file
+    tmp_path = output_path + ".tmp"
+    joblib.dump({'model': model, 'columns': X_train_cols}, tmp_path)
+    os.replace(tmp_path, output_path)
     logging.info(f"Model and feature columns saved to {output_path}")
+    # The server loads the array-only export of the same model
+    export_smart_watch_pipeline(model, X_train_cols, os.path.splitext(output_path)[0] + ".npz", source_path=output_path)
+
+
+def train_smart_watch_model(data_path: str = DATA_PATH, output_path: str = "intell/app/outputs/smart_watch.pkl",
+                            search: bool = False, n_jobs: int = -1) -> StageTimer:
+    """Runs every training stage, printing the evaluation and a timing report."""
+    timer = StageTimer()
+    with timer.stage("load"):
+        df = load_data(data_path)
+    with timer.stage("encode"):
+        X, y = encode_features(df)
+        del df
+    with timer.stage("split"):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    params = {}
+    if search:
+        with timer.stage("search"):
+            params = search_hyperparameters(X_train, y_train, n_jobs=n_jobs)
+    pipeline = build_pipeline(n_jobs=n_jobs, **params)
+    with timer.stage("train"):
+        pipeline.fit(X_train, y_train)
+    with timer.stage("evaluate"):
+        print(classification_report(y_test, pipeline.predict(X_test)))
+    with timer.stage("save"):
+        save_model(pipeline, X_train.columns, output_path)
+    print(timer.report())
+    return timer
+
 
 if __name__ == "__main__":
-    DATA_PATH = "C:/Personal/HackOn Amazon/intell/app/ingestion/synthetic_emotion_dataset.csv"  # Updated path
-    df = load_data(DATA_PATH)
-    X_train, X_test, y_train, y_test = preprocess_data(df)
-    model_pipeline = build_pipeline()
-    trained_model = train_and_evaluate(X_train, X_test, y_train, y_test, model_pipeline)
-    save_model(trained_model, X_train.columns) # Pass X_train.columns to save_model
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    train_smart_watch_model(args[0] if args else DATA_PATH, search="--search" in sys.argv)
@@ -0,0 +1,127 @@
+"""
+Incremental updates of the smartwatch mood model.
+
+A new labelled batch is encoded into the model's trained columns and scaled
+with its fitted scaler. `new_trees` more trees are then grown on it with
+warm_start. The existing trees are kept; beyond `max_trees` the oldest are
+dropped, so the forest slowly forgets old data instead of growing without
+bound. The scaler is not refitted, because the existing trees split on its
+output. The updated model is published with save_model (os.replace, plus the
+compact export), and the running server's model registry swaps it in.
+
+A batch must contain exactly the classes the model knows: warm_start cannot add
+or drop a class, so those batches need a full retrain.
+
+The new trees' share of the forest sets how strongly a batch counts: against
+100 existing trees, 20 new ones only partly correct for a drifted batch. For a
+large shift, grow more trees and lower max_trees so the oldest ones are dropped.
+
+Part of each batch is held out to score the model before and after the update.
+With --compare, a full retrain on the original data plus the batch is scored on
+the same holdout as well.
+
+Usage:
+    python -m intell.app.core.smart_watch.smart_watch_update batch.csv [--trees=20] [--max-trees=300] [--compare]
+"""
+import json
+import logging
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+from intell.app.core.smart_watch.predict_smartwatch import SMART_WATCH_MODEL_PATH
+from intell.app.core.smart_watch.smart_watch_mood import (
+    DATA_PATH, build_pipeline, encode_features, load_data, save_model,
+)
+
+DEFAULT_NEW_TREES = 20
+DEFAULT_MAX_TREES = 300
+HOLDOUT_FRACTION = 0.2
+
+
+def _scores(pipeline, X, y) -> dict:
+    predictions = pipeline.predict(X)
+    return {"accuracy": round(accuracy_score(y, predictions), 4),
+            "macro_f1": round(f1_score(y, predictions, average="macro"), 4)}
+
+
+def update_pipeline(pipeline, X_batch: pd.DataFrame, y_batch: pd.Series,
+                    new_trees: int = DEFAULT_NEW_TREES, max_trees: int = DEFAULT_MAX_TREES):
+    """
+    Grows new_trees trees on the batch, in place. Raises ValueError when the
+    batch's classes differ from the model's.
+    """
+    scaler, forest = pipeline[0], pipeline[-1]
+    batch_classes = set(np.unique(y_batch))
+    if batch_classes != set(forest.classes_):
+        raise ValueError(f"Batch classes {sorted(batch_classes)} differ from the model's "
+                         f"{sorted(forest.classes_)}; retrain the model from scratch.")
+
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + new_trees)
+    forest.fit(scaler.transform(X_batch), y_batch)
+    forest.set_params(warm_start=False)
+    if len(forest.estimators_) > max_trees:
+        forest.estimators_ = forest.estimators_[-max_trees:]
+        forest.n_estimators = max_trees
+    return pipeline
+
+
+def update_smart_watch_model(batch_path: str, model_path: str = SMART_WATCH_MODEL_PATH,
+                             new_trees: int = DEFAULT_NEW_TREES, max_trees: int = DEFAULT_MAX_TREES,
+                             compare_with: str = None) -> dict:
+    """
+    Updates and republishes the model at model_path with the labelled batch CSV.
+    Returns a report: update throughput, holdout scores before and after, and
+    (compare_with: the original training CSV) those of a full retrain.
+    """
+    assets = joblib.load(model_path)
+    pipeline, columns = assets['model'], assets['columns']
+
+    X, y = encode_features(load_data(batch_path), trained_columns=columns)
+    X_batch, X_holdout, y_batch, y_holdout = train_test_split(
+        X, y, test_size=HOLDOUT_FRACTION, stratify=y, random_state=42)
+    report = {"batch_rows": len(X_batch), "holdout_rows": len(X_holdout),
+              "before": _scores(pipeline, X_holdout, y_holdout)}
+
+    started = time.perf_counter()
+    update_pipeline(pipeline, X_batch, y_batch, new_trees, max_trees)
+    elapsed = time.perf_counter() - started
+    report.update({
+        "update_seconds": round(elapsed, 3),
+        "update_rows_per_second": round(len(X_batch) / elapsed, 1),
+        "trees": len(pipeline[-1].estimators_),
+        "after": _scores(pipeline, X_holdout, y_holdout),
+    })
+    save_model(pipeline, columns, model_path)
+
+    if compare_with:
+        base_X, base_y = encode_features(load_data(compare_with), trained_columns=columns)
+        full_X = pd.concat([base_X, X_batch], ignore_index=True)
+        full_y = pd.concat([base_y, y_batch], ignore_index=True)
+        retrained = build_pipeline()
+        started = time.perf_counter()
+        retrained.fit(full_X, full_y)
+        elapsed = time.perf_counter() - started
+        report["full_retrain"] = {
+            "rows": len(full_X),
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(len(full_X) / elapsed, 1),
+            **_scores(retrained, X_holdout, y_holdout),
+        }
+
+    logging.info(f"Smartwatch model update: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[2:] if arg.startswith("--") and "=" in arg)
+    result = update_smart_watch_model(sys.argv[1],
+                                      new_trees=int(options.get("trees", DEFAULT_NEW_TREES)),
+                                      max_trees=int(options.get("max-trees", DEFAULT_MAX_TREES)),
+                                      compare_with=DATA_PATH if "--compare" in sys.argv else None)
+    print(json.dumps(result, indent=4))
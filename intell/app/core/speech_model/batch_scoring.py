@@ -0,0 +1,230 @@
+"""
+Batch voice emotion scoring over directories and file lists.
+
+MFCC extraction (decode, resample, MFCC) is the expensive step and is spread
+over an ExtractionPool of worker processes, one per core by default. Only a
+few chunks of paths are handed to the pool at a time, so a pool can be shared
+by several callers and a caller that stops early leaves little work behind.
+Each worker goes
+through its own MfccCache on the shared disk tier, so files scored before are
+not decoded again. Vectors arrive in completion order and are stacked into one
+(n, 40, 1) tensor per `batch_size` files, so the model runs one predict call
+per batch instead of one per file. Results are yielded as each batch is scored.
+
+The pool uses the spawn start method, and this module does not import the
+model: workers only load NumPy, librosa and the cache.
+
+Usage (NDJSON on stdout, or appended to --out; paths already scored in --out
+are skipped, so an interrupted backfill resumes where it stopped):
+    python -m intell.app.core.speech_model.batch_scoring <dir or file>... [--out=scores.ndjson] [--workers=N] [--batch=N]
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from itertools import islice
+
+import numpy as np
+
+from intell.app.config import settings
+from intell.app.core.speech_model.mfcc_cache import DEFAULT_PARAMS, MfccCache
+
+AUDIO_EXTENSIONS = (".wav",)
+DEFAULT_BATCH_SIZE = 1024
+# Paths handed to a worker at a time, and chunks in flight per worker
+POOL_CHUNKSIZE = 8
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+_worker_cache = None
+
+
+def iter_audio_files(sources):
+    """Paths of the audio files in sources (directories, walked recursively in name order, or files)."""
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(AUDIO_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield source
+
+
+def _init_worker(cache_dir: str, params: dict):
+    global _worker_cache
+    # The parent keeps the memory tier; a worker only needs the disk tier
+    _worker_cache = MfccCache(cache_dir, max_entries=0, params=params)
+
+
+def _extract(path: str):
+    try:
+        return path, np.array(_worker_cache.get(path)), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def _extract_chunk(paths: list) -> list:
+    return [_extract(path) for path in paths]
+
+
+class ExtractionPool:
+    """Worker processes extracting MFCCs through an MfccCache's disk tier; started on first use."""
+
+    def __init__(self, workers: int, cache_dir: str, params: dict):
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.params = params
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _started(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: the workers must not inherit the model or the server's threads
+                self._pool = multiprocessing.get_context("spawn").Pool(
+                    self.workers, initializer=_init_worker, initargs=(self.cache_dir, self.params))
+            return self._pool
+
+    def extract(self, paths):
+        """
+        Yields (path, vector, error) for each path in completion order. At most
+        CHUNKS_IN_FLIGHT_PER_WORKER chunks per worker are queued at once.
+        """
+        pool = self._started()
+        paths = iter(paths)
+        done = queue.Queue()
+        in_flight = 0
+        exhausted = False
+        while True:
+            while not exhausted and in_flight < self.workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                chunk = list(islice(paths, POOL_CHUNKSIZE))
+                if not chunk:
+                    exhausted = True
+                    break
+                pool.apply_async(_extract_chunk, (chunk,), callback=done.put,
+                                 error_callback=lambda e, chunk=chunk: done.put(
+                                     [(path, None, f"{type(e).__name__}: {e}") for path in chunk]))
+                in_flight += 1
+            if not in_flight:
+                return
+            results = done.get()
+            in_flight -= 1
+            yield from results
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def _score(pending, predict_batch):
+    paths = [path for path, _ in pending]
+    try:
+        results = predict_batch(np.stack([vector for _, vector in pending]))
+    except Exception as e:
+        logging.exception("Batch voice prediction failed")
+        return [{"path": path, "error": f"{type(e).__name__}: {e}"} for path in paths]
+    return [{"path": path, "predicted_emotion": label, "confidence": round(confidence, 4)}
+            for path, (label, confidence) in zip(paths, results)]
+
+
+def score_files(paths, predict_batch, workers: int = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                cache: MfccCache = None, pool: ExtractionPool = None):
+    """
+    Yields {"path", "predicted_emotion", "confidence"} (or {"path", "error"}) for each
+    path, in completion order.
+    predict_batch: maps an (n, n_mfcc) float32 matrix to n (label, confidence) pairs.
+    workers: extraction processes of a pool started for this call (default: one per
+        core); 0 extracts in this process.
+    cache: MfccCache whose directory and parameters the workers use (and which is
+        used directly when workers is 0).
+    pool: a long-lived ExtractionPool to use instead; it is left running.
+    """
+    if cache is None:
+        cache = MfccCache(settings.VOICE_MFCC_CACHE_DIR, params=DEFAULT_PARAMS)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pending = []
+    owned_pool = None
+    if pool is not None:
+        results = pool.extract(paths)
+    elif workers == 0:
+        def extracted():
+            for path in paths:
+                try:
+                    yield path, cache.get(path), None
+                except Exception as e:
+                    yield path, None, f"{type(e).__name__}: {e}"
+        results = extracted()
+    else:
+        owned_pool = ExtractionPool(workers, cache.cache_dir, cache.params)
+        results = owned_pool.extract(paths)
+    try:
+        for path, vector, error in results:
+            if error is not None:
+                yield {"path": path, "error": error}
+                continue
+            pending.append((path, vector))
+            if len(pending) >= batch_size:
+                yield from _score(pending, predict_batch)
+                pending = []
+        if pending:
+            yield from _score(pending, predict_batch)
+    finally:
+        results.close()
+        if owned_pool is not None:
+            owned_pool.close()
+
+
+def _scored_paths(out_path: str) -> set:
+    if not os.path.exists(out_path):
+        return set()
+    with open(out_path, 'r', encoding='utf-8') as f:
+        records = (json.loads(line) for line in f if line.strip())
+        # Files that failed are tried again
+        return {record["path"] for record in records if "error" not in record}
+
+
+def main(argv):
+    options = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    sources = [arg for arg in argv if not arg.startswith("--")]
+    if not sources:
+        print(__doc__)
+        sys.exit(1)
+
+    # Imported here so that the spawned workers, which import this module, never load the model
+    from intell.app.core.speech_model.speech_model import mfcc_cache, predict_emotions
+
+    out_path = options.get("out")
+    done = _scored_paths(out_path) if out_path else set()
+    paths = (path for path in iter_audio_files(sources) if path not in done)
+    workers = int(options["workers"]) if "workers" in options else None
+    batch_size = int(options.get("batch", DEFAULT_BATCH_SIZE))
+
+    out = open(out_path, 'a', encoding='utf-8') if out_path else sys.stdout
+    started = time.perf_counter()
+    scored = errors = 0
+    try:
+        for record in score_files(paths, predict_emotions, workers=workers, batch_size=batch_size, cache=mfcc_cache):
+            out.write(json.dumps(record) + "\n")
+            scored += 1
+            errors += "error" in record
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    logging.info(f"Scored {scored} files ({errors} errors, {len(done)} skipped) in {elapsed:.1f}s"
+                 f" ({scored / elapsed if elapsed else 0:.1f} files/s)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main(sys.argv[1:])
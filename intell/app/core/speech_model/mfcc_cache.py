@@ -0,0 +1,223 @@
+"""
+Content-addressed cache of the voice model's MFCC features.
+
+Decoding a .wav, resampling it to 22050 Hz and computing its MFCCs dominates
+the voice path, and the same files are scored again and again. The averaged
+MFCC vector of a file is therefore cached under sha256(file content +
+extraction parameters): a renamed or copied file still hits, and an edited
+file, or a change of sample rate or coefficient count, misses.
+
+Two tiers are kept: an in-memory LRU of at most `max_entries` vectors, and one
+`<key>.npy` file per vector in `cache_dir`, shared by every process and kept
+across restarts. The digests of the `max_entries` most recently used paths are
+remembered for as long as their size and mtime are unchanged, so a hit reads
+neither the audio nor librosa.
+
+Hit rates and the extraction time saved are reported by stats().
+
+Microbenchmark over the voice_files folder:
+    python -m intell.app.core.speech_model.mfcc_cache [folder]
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Bump when the extraction code changes in a way the parameters do not capture
+FEATURE_VERSION = 1
+DEFAULT_PARAMS = {"sr": 22050, "n_mfcc": 40}
+DEFAULT_MAX_ENTRIES = 1024
+_READ_CHUNK = 1 << 20
+
+
+def compute_mfcc_avg(filepath: str, sr: int = 22050, n_mfcc: int = 40) -> np.ndarray:
+    """n_mfcc MFCCs of the file resampled to sr, averaged over time, as a float32 vector."""
+    # Imported here so that cache hits never pay for importing librosa
+    import librosa
+
+    y, sr = librosa.load(filepath, sr=sr)
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc)
+    return np.mean(mfcc, axis=1).astype(np.float32)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MfccCache:
+    """Memory LRU and .npy disk cache of compute_mfcc_avg results, keyed by content and parameters."""
+
+    def __init__(self, cache_dir: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 params: dict = None, extract=compute_mfcc_avg):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.params = dict(DEFAULT_PARAMS if params is None else params)
+        self.extract = extract
+        self._params_key = json.dumps({"version": FEATURE_VERSION, **self.params}, sort_keys=True)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> read-only vector, least recently used first
+        self._digests = OrderedDict()  # path -> (size, mtime_ns, content digest), an LRU like _entries
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0,
+                       "disk_write_errors": 0, "hash_seconds_total": 0.0,
+                       "hit_seconds_total": 0.0, "extract_seconds_total": 0.0}
+
+    def key(self, path: str) -> str:
+        """Cache key of the file's current content under this cache's parameters."""
+        stat = os.stat(path)
+        with self._lock:
+            known = self._digests.get(path)
+            if known is not None:
+                self._digests.move_to_end(path)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            content = known[2]
+        else:
+            started = time.perf_counter()
+            content = file_digest(path)
+            with self._lock:
+                self._stats["hash_seconds_total"] += time.perf_counter() - started
+                self._digests[path] = (stat.st_size, stat.st_mtime_ns, content)
+                self._digests.move_to_end(path)
+                while len(self._digests) > self.max_entries:
+                    self._digests.popitem(last=False)
+        return hashlib.sha256(f"{content}:{self._params_key}".encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _load_from_disk(self, key: str):
+        try:
+            return np.load(self._disk_path(key), allow_pickle=False)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable MFCC cache file {self._disk_path(key)}: {e}")
+            return None
+
+    def _save_to_disk(self, key: str, vector: np.ndarray):
+        # Written next to the target and renamed over it, so readers never see half a file
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.save(f, vector, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write MFCC cache file {path}: {e}")
+            with self._lock:
+                self._stats["disk_write_errors"] += 1
+
+    def get(self, path: str) -> np.ndarray:
+        """The averaged MFCC vector of the file (read-only), extracted only on a miss of both tiers."""
+        started = time.perf_counter()
+        key = self.key(path)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                self._stats["hit_seconds_total"] += time.perf_counter() - started
+                return vector
+
+        vector = self._load_from_disk(key)
+        if vector is not None:
+            vector.setflags(write=False)
+            self._remember(key, vector)
+            with self._lock:
+                self._stats["disk_hits"] += 1
+                self._stats["hit_seconds_total"] += time.perf_counter() - started
+            return vector
+
+        extract_started = time.perf_counter()
+        vector = np.ascontiguousarray(self.extract(path, **self.params), dtype=np.float32)
+        with self._lock:
+            self._stats["misses"] += 1
+            self._stats["extract_seconds_total"] += time.perf_counter() - extract_started
+        self._save_to_disk(key, vector)
+        vector.setflags(write=False)
+        self._remember(key, vector)
+        return vector
+
+    def clear_memory(self):
+        """Drops the memory tier (and remembered digests); the disk tier is kept."""
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        avg_extract = stats["extract_seconds_total"] / stats["misses"] if stats["misses"] else None
+        avg_hit = stats["hit_seconds_total"] / hits if hits else None
+        return {
+            **{name: round(value, 4) if isinstance(value, float) else value for name, value in stats.items()},
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "cache_dir": self.cache_dir,
+            "params": self.params,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "memory_hit_rate": round(stats["memory_hits"] / lookups, 4) if lookups else None,
+            "extract_avg_ms": round(1000 * avg_extract, 3) if avg_extract is not None else None,
+            "hit_avg_ms": round(1000 * avg_hit, 3) if avg_hit is not None else None,
+            # Each hit would otherwise have cost one average extraction
+            "saved_seconds_estimate": round(hits * avg_extract - stats["hit_seconds_total"], 4)
+            if avg_extract is not None else None,
+        }
+
+
+def _benchmark(folder: str = "backend/voice_files", repeats: int = 20):
+    """Prints the per-file time of uncached extraction, a disk-tier hit and a memory-tier hit."""
+    import tempfile
+
+    files = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".wav"))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = MfccCache(cache_dir)
+
+        started = time.perf_counter()
+        for path in files:
+            cache.get(path)
+        cold = (time.perf_counter() - started) / len(files)
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            cache.clear_memory()
+            for path in files:
+                cache.get(path)
+        disk = (time.perf_counter() - started) / (repeats * len(files))
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for path in files:
+                cache.get(path)
+        memory = (time.perf_counter() - started) / (repeats * len(files))
+
+        identical = all(np.array_equal(cache.get(path), compute_mfcc_avg(path)) for path in files)
+        print(f"{len(files)} files  identical={identical}  extract {cold * 1000:8.2f}ms  "
+              f"disk hit {disk * 1000:6.3f}ms ({cold / disk:6.0f}x)  "
+              f"memory hit {memory * 1000:6.3f}ms ({cold / memory:6.0f}x)")
+        print(json.dumps(cache.stats(), indent=4))
+
+
+if __name__ == "__main__":
+    _benchmark(*sys.argv[1:2])
@@ -1,39 +1,77 @@
+import os
 import sys
 import numpy as np
-import librosa
-from keras.models import load_model
 
-# Load the trained model
-model = load_model("C:/Personal/HackOn Amazon/intell/app/core/speech_model/speech_model.keras")
+from intell.app.config import settings
+from intell.app.core.model_registry import model_registry
+from intell.app.core.speech_model.mfcc_cache import MfccCache
+
+SPEECH_MODEL_PATH = "intell/app/core/speech_model/speech_model.keras"
+SPEECH_MODEL = "speech"
 
 # Hardcoded emotion labels (in same order as training)
 emotion_labels = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'ps', 'sad']
 
+def load_speech_model(path):
+    # Keras (and TensorFlow) are imported with the model, not with this module
+    from keras.models import load_model
+
+    return load_model(path)
+
+def warm_up_speech_model(model):
+    """One dummy prediction, so the first real request does not pay first-call costs."""
+    model.predict(np.zeros((1, 40, 1), dtype=np.float32), verbose=0)
+
+# Loaded on first use, or by the startup preload
+model_registry.register(SPEECH_MODEL, SPEECH_MODEL_PATH, load_speech_model, warm_up_speech_model)
+
+# MFCC vectors of files already seen, keyed by content; repeats skip decoding
+mfcc_cache = MfccCache(settings.VOICE_MFCC_CACHE_DIR, max_entries=settings.VOICE_MFCC_CACHE_MAX_ENTRIES,
+                       params={"sr": 22050, "n_mfcc": 40})
+
 def extract_mfcc_avg(filepath):
     """
     Extracts 40 MFCC features averaged over time from an audio file.
     Returns a NumPy array shaped (1, 40, 1) for model input.
     """
-    y, sr = librosa.load(filepath, sr=22050)
-    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40)
-    mfcc_avg = np.mean(mfcc, axis=1).astype(np.float32)
+    mfcc_avg = mfcc_cache.get(filepath)
     return np.reshape(mfcc_avg, (1, 40, 1))
 
 def predict_emotion(audio_path):
     """
-    Predicts emotion from a given WAV file path using the preloaded model.
+    Predicts emotion from a given WAV file path using the shared model.
     Returns the predicted label as a string.
     """
     input_data = extract_mfcc_avg(audio_path)
-    pred = model.predict(input_data)
+    model = model_registry.get(SPEECH_MODEL)
+    with model_registry.timed(SPEECH_MODEL):
+        pred = model.predict(input_data, verbose=0)
     predicted_index = np.argmax(pred)
     predicted_label = emotion_labels[predicted_index]
     return predicted_label
 
+def predict_emotions(mfcc_avgs):
+    """
+    Predicts emotions for a stack of averaged MFCC vectors (n, 40) in one model.predict call.
+    Returns a (label, confidence) pair per vector.
+    """
+    input_data = np.reshape(np.asarray(mfcc_avgs, dtype=np.float32), (-1, 40, 1))
+    model = model_registry.get(SPEECH_MODEL)
+    with model_registry.timed(SPEECH_MODEL):
+        pred = model.predict(input_data, batch_size=256, verbose=0)
+    indices = np.argmax(pred, axis=1)
+    return [(emotion_labels[i], float(pred[row, i])) for row, i in enumerate(indices)]
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    if len(sys.argv) < 2:
         print("Usage: python predict.py path/to/audio.wav")
+        print("       python predict.py <dir or file>... [--out=scores.ndjson] [--workers=N] [--batch=N]")
         sys.exit(1)
-    
-    audio_path = sys.argv[1]
-    predict_emotion(audio_path)
+
+    if len(sys.argv) == 2 and os.path.isfile(sys.argv[1]):
+        print(predict_emotion(sys.argv[1]))
+    else:
+        # Directories and file lists are scored in parallel; the spawned workers re-import
+        # this module, which is cheap now that the model is only loaded on first use
+        from intell.app.core.speech_model.batch_scoring import main
+        main(sys.argv[1:])
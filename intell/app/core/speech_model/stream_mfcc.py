@@ -0,0 +1,196 @@
+"""
+Incremental mean MFCC over live audio.
+
+extract_mfcc_avg loads a whole file at 22050 Hz and averages librosa's MFCCs
+(n_fft 2048, hop 512, centred frames, 128 Slaney mel bands, power_to_db with
+top_db 80, orthonormal DCT-II) over time. StreamingMfcc computes the same
+average while the audio is still arriving, in memory that does not grow with
+the length of the stream:
+
+- Frames are cut from a buffer holding at most one window of samples, and the
+  centring pad is added at the start and, on finish(), at the end.
+- The DCT is linear, so the mean of the per-frame MFCCs is the DCT of the mean
+  per-band dB value. Only the per-band dB values need summing.
+- top_db clips every value to (global max - top_db), and the global max is
+  only known at the end. Each band therefore keeps a histogram (count and sum
+  per HISTOGRAM_BIN_DB bin) of its dB values. That gives the clipped sum
+  exactly, except for the one bin the threshold falls in, where the error is
+  at most HISTOGRAM_BIN_DB per value in it.
+
+Audio at another sample rate is resampled with scipy's polyphase filter in
+blocks with enough overlap to match one resample_poly call over the whole
+signal. librosa.load resamples with soxr instead, so such streams differ from
+extract_mfcc_avg by the difference between the two filters. Audio sent at
+22050 Hz is not resampled.
+"""
+import math
+
+import numpy as np
+from scipy.fft import dct
+
+TARGET_SR = 22050
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+N_MFCC = 40
+TOP_DB = 80.0
+AMIN = 1e-10
+
+# dB histogram per band: power_to_db never goes below 10*log10(AMIN)
+HISTOGRAM_MIN_DB = 10 * math.log10(AMIN)
+HISTOGRAM_MAX_DB = 100.0
+HISTOGRAM_BIN_DB = 0.5
+
+# Raw sample formats accepted by push_bytes
+SAMPLE_FORMATS = {"pcm_s16le": (np.dtype("<i2"), 1 / 32768.0), "f32le": (np.dtype("<f4"), 1.0)}
+
+_mel_bases = {}
+
+
+def mel_basis(sr: int = TARGET_SR, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """librosa's default (Slaney) mel filterbank, built once per configuration."""
+    key = (sr, n_fft, n_mels)
+    if key not in _mel_bases:
+        import librosa
+
+        _mel_bases[key] = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).astype(np.float64)
+    return _mel_bases[key]
+
+
+class _StreamResampler:
+    """resample_poly over a stream: each block is filtered with the input around it."""
+
+    def __init__(self, rate: int, target: int):
+        g = math.gcd(rate, target)
+        self.up, self.down = target // g, rate // g
+        # resample_poly's filter reaches 10 * max(up, down) samples at the upsampled rate
+        reach = math.ceil(10 * max(self.up, self.down) / self.up) + 1
+        self.context = math.ceil(reach / self.down) * self.down
+        # Zeros before the signal, as resample_poly assumes
+        self.pending = np.zeros(self.context, dtype=np.float64)
+        self.consumed = 0  # input samples already turned into output
+
+    def push(self, samples: np.ndarray, final: bool = False) -> np.ndarray:
+        # scipy.signal takes half a second to import; only resampled streams need it
+        from scipy.signal import resample_poly
+
+        self.pending = np.concatenate([self.pending, samples])
+        if final:
+            # The last output samples depend on zeros after the signal
+            n = len(self.pending) - self.context
+            padded = np.concatenate([self.pending, np.zeros(self.context)])
+            out = resample_poly(padded, self.up, self.down)
+            first = self.context * self.up // self.down
+            total = math.ceil((self.consumed + n) * self.up / self.down)
+            emitted = self.consumed * self.up // self.down
+            self.pending = np.zeros(0)
+            return out[first:first + total - emitted]
+        # Blocks of whole `down` samples keep the output aligned with one long call
+        n = (len(self.pending) - 2 * self.context) // self.down * self.down
+        if n <= 0:
+            return np.zeros(0)
+        out = resample_poly(self.pending[:n + 2 * self.context], self.up, self.down)
+        first = self.context * self.up // self.down
+        self.pending = self.pending[n:]
+        self.consumed += n
+        return out[first:first + n * self.up // self.down]
+
+
+class StreamingMfcc:
+    """Running mean of librosa's MFCCs over a live mono stream."""
+
+    def __init__(self, sample_rate: int = TARGET_SR, sample_format: str = "pcm_s16le",
+                 n_mfcc: int = N_MFCC, top_db: float = TOP_DB):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unknown sample format {sample_format!r}; expected one of {sorted(SAMPLE_FORMATS)}")
+        if sample_rate <= 0:
+            raise ValueError("sample_rate must be positive")
+        self.sample_rate = sample_rate
+        self.dtype, self.sample_scale = SAMPLE_FORMATS[sample_format]
+        self.n_mfcc = n_mfcc
+        self.top_db = top_db
+        self.resampler = _StreamResampler(sample_rate, TARGET_SR) if sample_rate != TARGET_SR else None
+        self.window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N_FFT) / N_FFT)  # periodic Hann
+        self.mel = mel_basis()
+
+        self.samples_in = 0
+        self.frames = 0
+        self.finished = False
+        self._partial = b""  # bytes of a sample split across chunks
+        # Centred frames: the first one is preceded by n_fft // 2 zeros
+        self._buffer = np.zeros(N_FFT // 2, dtype=np.float64)
+        self._max_db = -np.inf
+        self._n_bins = int(math.ceil((HISTOGRAM_MAX_DB - HISTOGRAM_MIN_DB) / HISTOGRAM_BIN_DB))
+        self._counts = np.zeros((N_MELS, self._n_bins), dtype=np.int64)
+        self._sums = np.zeros((N_MELS, self._n_bins), dtype=np.float64)
+        self._band_offsets = (np.arange(N_MELS) * self._n_bins)[None, :]
+
+    @property
+    def seconds(self) -> float:
+        """Seconds of audio received so far."""
+        return self.samples_in / self.sample_rate
+
+    def push_bytes(self, data: bytes) -> int:
+        """Appends raw little-endian samples; returns the number of new frames."""
+        data = self._partial + data
+        usable = len(data) - len(data) % self.dtype.itemsize
+        self._partial = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype).astype(np.float64) * self.sample_scale
+        return self.push(samples)
+
+    def push(self, samples: np.ndarray) -> int:
+        """Appends mono float samples in [-1, 1]; returns the number of new frames."""
+        if self.finished:
+            raise ValueError("The stream is finished")
+        samples = np.asarray(samples, dtype=np.float64)
+        self.samples_in += len(samples)
+        if self.resampler is not None:
+            samples = self.resampler.push(samples)
+        return self._frames(samples)
+
+    def finish(self) -> int:
+        """Adds the final, zero-padded frames; nothing can be pushed afterwards."""
+        if self.finished:
+            return 0
+        tail = self.resampler.push(np.zeros(0), final=True) if self.resampler is not None else np.zeros(0)
+        added = self._frames(np.concatenate([tail, np.zeros(N_FFT // 2)]))
+        self.finished = True
+        return added
+
+    def _frames(self, samples: np.ndarray) -> int:
+        buffer = np.concatenate([self._buffer, samples])
+        n = 0 if len(buffer) < N_FFT else 1 + (len(buffer) - N_FFT) // HOP_LENGTH
+        if n:
+            frames = np.lib.stride_tricks.sliding_window_view(buffer, N_FFT)[::HOP_LENGTH][:n]
+            power = np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2
+            db = 10 * np.log10(np.maximum(AMIN, power @ self.mel.T))
+            self._add(db)
+            self.frames += n
+        # Keep only the samples the next frame needs
+        self._buffer = buffer[n * HOP_LENGTH:]
+        return n
+
+    def _add(self, db: np.ndarray):
+        self._max_db = max(self._max_db, float(db.max()))
+        bins = np.clip(((db - HISTOGRAM_MIN_DB) / HISTOGRAM_BIN_DB).astype(np.int64), 0, self._n_bins - 1)
+        flat = (bins + self._band_offsets).ravel()
+        size = N_MELS * self._n_bins
+        self._counts += np.bincount(flat, minlength=size).reshape(N_MELS, self._n_bins)
+        self._sums += np.bincount(flat, weights=db.ravel(), minlength=size).reshape(N_MELS, self._n_bins)
+
+    def _mean_db(self) -> np.ndarray:
+        if self.top_db is None:
+            return self._sums.sum(axis=1) / self.frames
+        threshold = self._max_db - self.top_db
+        t_bin = int(np.clip((threshold - HISTOGRAM_MIN_DB) // HISTOGRAM_BIN_DB, 0, self._n_bins - 1))
+        above = self._sums[:, t_bin + 1:].sum(axis=1)
+        below = self._counts[:, :t_bin].sum(axis=1) * threshold
+        # The threshold's own bin: its values are within one bin of the threshold
+        straddling = np.maximum(self._sums[:, t_bin], self._counts[:, t_bin] * threshold)
+        return (above + below + straddling) / self.frames
+
+    def mean_mfcc(self) -> np.ndarray:
+        """The mean MFCC vector of the frames so far (float32, n_mfcc), or None before the first frame."""
+        if not self.frames:
+            return None
+        return dct(self._mean_db(), type=2, norm="ortho")[:self.n_mfcc].astype(np.float32)
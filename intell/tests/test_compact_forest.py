@@ -0,0 +1,69 @@
+import shutil
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+
+from backend.services import environment_model as env
+from intell.app.core.compact_forest import SUCCESSOR_MAX_ROWS, CompactForest, export_forest, is_current
+from intell.app.core.smart_watch import predict_smartwatch as watch
+
+SHIPPED_MODELS = {
+    "smartwatch": (watch.SMART_WATCH_MODEL_PATH, watch.SMART_WATCH_COMPACT_PATH),
+    "environment": (env.MODEL_PATH, env.COMPACT_MODEL_PATH),
+}
+
+
+def _sklearn_forest(pkl_path):
+    model = joblib.load(pkl_path)
+    # The smartwatch pickle holds {'model': Pipeline, 'columns': ...}; the forest is the last step
+    return model["model"][-1] if isinstance(model, dict) else model
+
+
+@pytest.fixture(autouse=True)
+def _quiet_sklearn():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+@pytest.mark.parametrize("name", sorted(SHIPPED_MODELS))
+def test_predicts_exactly_like_sklearn(name, tmp_path):
+    pkl_path, _ = SHIPPED_MODELS[name]
+    forest = _sklearn_forest(pkl_path)
+    npz_path = str(tmp_path / "forest.npz")
+    export_forest(forest, npz_path)
+    compact, _ = CompactForest.load(npz_path)
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(0, 2, (2000, forest.n_features_in_)).astype(np.float32)
+    X[::17, 0] = np.nan
+    # Both traversals: every split at once for a few rows, level by level for more
+    for rows in (X[:1], X[:SUCCESSOR_MAX_ROWS], X):
+        assert np.array_equal(compact.predict_proba(rows), forest.predict_proba(rows))
+        assert np.array_equal(compact.predict(rows), forest.predict(rows))
+
+
+@pytest.mark.parametrize("name", sorted(SHIPPED_MODELS))
+def test_committed_exports_match_their_pickles(name):
+    pkl_path, npz_path = SHIPPED_MODELS[name]
+    sources = (pkl_path, env.ENCODER_PATH, env.SCALER_PATH) if name == "environment" else (pkl_path,)
+    assert is_current(npz_path, *sources)
+
+
+def test_is_current_goes_false_when_a_source_changes(tmp_path):
+    pkl_path = str(tmp_path / "mood_model.pkl")
+    shutil.copy(env.MODEL_PATH, pkl_path)
+    npz_path = str(tmp_path / "mood_model.npz")
+    export_forest(joblib.load(pkl_path), npz_path, sources=(pkl_path,))
+    assert is_current(npz_path, pkl_path)
+
+    with open(pkl_path, "ab") as f:
+        f.write(b"\0")
+    assert not is_current(npz_path, pkl_path)
+
+    # Re-exporting from the new pickle makes it current again
+    export_forest(joblib.load(pkl_path), npz_path, sources=(pkl_path,))
+    assert is_current(npz_path, pkl_path)
+    assert not is_current(str(tmp_path / "missing.npz"), pkl_path)
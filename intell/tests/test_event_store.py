@@ -0,0 +1,157 @@
+"""
+Sync tests of the calendar event store against a local stand-in for the
+Calendar API events().list endpoint, reached through api_endpoint over real HTTP.
+"""
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from intell.app.core.calendar import google_calendar
+from intell.app.core.calendar.event_store import CalendarEventStore
+
+
+def _event(event_id, hours_from_now, summary=None, status="confirmed"):
+    start = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=hours_from_now)
+    end = start + datetime.timedelta(hours=1)
+    return {"id": event_id, "status": status, "summary": summary or event_id,
+            "start": {"dateTime": start.strftime('%Y-%m-%dT%H:%M:%SZ')},
+            "end": {"dateTime": end.strftime('%Y-%m-%dT%H:%M:%SZ')}}
+
+
+class _CalendarHandler(BaseHTTPRequestHandler):
+    """
+    GET .../calendars/primary/events. A full listing returns server.full_items two per
+    page, the last page carrying server.next_token. A syncToken in server.expired gets a
+    410; any other returns server.deltas. server.failing answers everything with a 500.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.requests.append(params)
+        if not url.path.endswith("/calendars/primary/events"):
+            return self._reply(404, {"error": {"code": 404, "message": "not found"}})
+        if self.server.failing:
+            return self._reply(500, {"error": {"code": 500, "message": "backend error"}})
+
+        if "syncToken" in params:
+            if params["syncToken"] in self.server.expired:
+                return self._reply(410, {"error": {"code": 410, "message": "Sync token is no longer valid"}})
+            return self._reply(200, {"items": self.server.deltas, "nextSyncToken": self.server.next_token})
+
+        start = int(params.get("pageToken", 0))
+        page = {"items": self.server.full_items[start:start + 2]}
+        if start + 2 < len(self.server.full_items):
+            page["nextPageToken"] = str(start + 2)
+        else:
+            page["nextSyncToken"] = self.server.next_token
+        return self._reply(200, page)
+
+
+@pytest.fixture
+def calendar_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CalendarHandler)
+    server.requests = []
+    server.full_items = []
+    server.deltas = []
+    server.expired = set()
+    server.next_token = "token-1"
+    server.failing = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/calendar/v3/"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def store(calendar_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(google_calendar, "TOKEN_DIR", str(tmp_path))
+    expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    (tmp_path / "alice.json").write_text(json.dumps({
+        "token": "valid-token", "refresh_token": "refresh", "client_id": "client", "client_secret": "secret",
+        "expiry": expiry.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }))
+    return CalendarEventStore(str(tmp_path / "events.db"), min_sync_interval=0, api_endpoint=calendar_server.url)
+
+
+def _summaries(result):
+    return [event["summary"] for event in result["events"]]
+
+
+def test_full_then_incremental_sync(calendar_server, store):
+    calendar_server.full_items = [_event("a", 1), _event("b", 2), _event("c", 3), _event("old", -100)]
+
+    assert _summaries(store.synced_events("alice")) == ["a", "b", "c"]
+    assert [("syncToken" in r, r.get("pageToken")) for r in calendar_server.requests] == [(False, None), (False, "2")]
+
+    calendar_server.requests.clear()
+    calendar_server.deltas = [_event("b", 5, summary="b moved"), _event("c", 3, status="cancelled"), _event("d", 4)]
+    calendar_server.next_token = "token-2"
+
+    result = store.synced_events("alice")
+
+    assert _summaries(result) == ["a", "d", "b moved"]
+    assert "stale" not in result
+    assert [r.get("syncToken") for r in calendar_server.requests] == ["token-1"]
+    assert (store.stats()["full_syncs"], store.stats()["incremental_syncs"]) == (1, 1)
+
+
+def test_expired_sync_token_falls_back_to_a_full_sync(calendar_server, store):
+    calendar_server.full_items = [_event("a", 1)]
+    store.synced_events("alice")
+
+    calendar_server.requests.clear()
+    calendar_server.expired.add("token-1")
+    calendar_server.full_items = [_event("x", 2), _event("y", 3)]
+    calendar_server.next_token = "token-2"
+
+    assert _summaries(store.synced_events("alice")) == ["x", "y"]
+    assert [r.get("syncToken") for r in calendar_server.requests] == ["token-1", None]
+    stats = store.stats()
+    assert (stats["token_expired"], stats["full_syncs"]) == (1, 2)
+
+
+def test_failed_sync_serves_stored_events_as_stale(calendar_server, store):
+    calendar_server.full_items = [_event("a", 1), _event("b", 2)]
+    store.synced_events("alice")
+
+    calendar_server.failing = True
+    calendar_server.deltas = [_event("c", 3)]
+    result = store.synced_events("alice")
+
+    assert _summaries(result) == ["a", "b"]
+    assert result["stale"] is True
+    assert result["last_sync"] > 0
+    assert store.stats()["stale_reads"] == 1
+
+    # The failed sync left the stored state alone, so the next one picks up from token-1
+    calendar_server.failing = False
+    calendar_server.requests.clear()
+    assert _summaries(store.synced_events("alice")) == ["a", "b", "c"]
+    assert [r.get("syncToken") for r in calendar_server.requests] == ["token-1"]
+
+
+def test_failed_first_sync_raises(calendar_server, store):
+    calendar_server.failing = True
+    with pytest.raises(google_calendar.CalendarUnavailable):
+        store.synced_events("alice")
+    # No token file: nothing stored to fall back on either
+    with pytest.raises(google_calendar.CalendarUnavailable):
+        store.synced_events("bob")
@@ -0,0 +1,41 @@
+import random
+import warnings
+
+import numpy as np
+import pytest
+
+from backend.services import environment_model as env
+from intell.app.core.environment.mock_iot_generator import generate_mock_iot_data
+from intell.app.core.feature_spec import ENCODED_DTYPE
+from intell.app.core.smart_watch import predict_smartwatch as watch
+from intell.app.core.smart_watch.watch_value_generator import generate_sample_row
+
+
+@pytest.fixture(autouse=True)
+def _quiet_sklearn():
+    # The pickled pipelines warn about feature names and versions on every transform
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def test_smartwatch_spec_matches_the_pandas_encoding():
+    random.seed(1)
+    assets = watch.load_smart_watch_assets(watch.SMART_WATCH_MODEL_PATH)
+    rows = [generate_sample_row() for _ in range(300)]
+
+    for batch in (rows[:1], rows):
+        expected = assets["model"][:-1].transform(watch.encode_samples(batch, assets["columns"]))
+        assert np.array_equal(assets["spec"].encode(batch), expected.astype(ENCODED_DTYPE))
+
+
+def test_environment_spec_matches_the_pandas_encoding():
+    random.seed(2)
+    rows = [generate_mock_iot_data() for _ in range(300)]
+
+    # The spec is the same whether it is built from the pickles or the compact export
+    for path in (env.MODEL_PATH, env.COMPACT_MODEL_PATH):
+        spec = env.load_environment_assets(path)["spec"]
+        for batch in (rows[:1], rows):
+            expected = env.encode_with_pandas(batch).to_numpy(dtype=ENCODED_DTYPE)
+            assert np.array_equal(spec.encode(batch), expected)
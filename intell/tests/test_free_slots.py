@@ -0,0 +1,120 @@
+import random
+from datetime import date, datetime, time, timedelta, timezone
+
+from intell.app.core.calendar.free_slots import compute_free_slots, merge_busy_intervals
+
+UTC_DAY = date(2030, 1, 7)
+
+
+def _slots(result):
+    return [(slot["start"], slot["end"], slot["duration_minutes"]) for slot in result["free_slots"]]
+
+
+def _event(start, end):
+    return {"start": start, "end": end}
+
+
+def test_overlapping_and_nested_events_are_merged():
+    assert merge_busy_intervals([(5, 10), (1, 3), (2, 4), (6, 7), (10, 12), (20, 20)]) == [(1, 4), (5, 12)]
+
+    events = [
+        _event("2030-01-07T09:00:00Z", "2030-01-07T11:00:00Z"),
+        _event("2030-01-07T09:30:00Z", "2030-01-07T10:00:00Z"),  # nested
+        _event("2030-01-07T10:30:00Z", "2030-01-07T12:00:00Z"),  # overlapping
+    ]
+    result = compute_free_slots([events], timezone="UTC", waking_hours=(time(8), time(14)),
+                                start_date=UTC_DAY, end_date=UTC_DAY)
+    assert _slots(result) == [
+        ("2030-01-07T08:00:00.000+00:00", "2030-01-07T09:00:00.000+00:00", 60),
+        ("2030-01-07T12:00:00.000+00:00", "2030-01-07T14:00:00.000+00:00", 120),
+    ]
+    assert result["total_free_minutes"] == 180
+
+
+def test_events_outside_the_window_are_ignored():
+    events = [
+        _event("2030-01-07T05:00:00Z", "2030-01-07T07:00:00Z"),  # before waking up
+        _event("2030-01-07T22:00:00Z", "2030-01-07T23:00:00Z"),  # after the window
+        _event("2030-01-06T12:00:00Z", "2030-01-06T13:00:00Z"),  # another day
+        _event("2030-01-07T07:30:00Z", "2030-01-07T08:30:00Z"),  # straddles the window start
+    ]
+    result = compute_free_slots([events], timezone="UTC", waking_hours=(time(8), time(20)),
+                                start_date=UTC_DAY, end_date=UTC_DAY)
+    assert _slots(result) == [("2030-01-07T08:30:00.000+00:00", "2030-01-07T20:00:00.000+00:00", 690)]
+
+
+def test_all_day_and_naive_events_are_read_in_the_user_timezone():
+    calendars = [
+        [_event("2030-01-07", "2030-01-08")],  # all-day: the whole local day is busy
+        {"events": [_event("2030-01-08T09:00:00", "2030-01-08T10:00:00")]},  # naive: local time
+    ]
+    result = compute_free_slots(calendars, timezone="Asia/Kolkata", waking_hours=(time(8), time(12)),
+                                start_date=UTC_DAY, end_date=UTC_DAY + timedelta(days=1))
+    assert _slots(result) == [
+        ("2030-01-08T08:00:00.000+05:30", "2030-01-08T09:00:00.000+05:30", 60),
+        ("2030-01-08T10:00:00.000+05:30", "2030-01-08T12:00:00.000+05:30", 120),
+    ]
+
+
+def test_windows_across_a_dst_change_follow_local_time():
+    # New York moves to daylight time at 02:00 on 2026-03-08 and back on 2026-11-01
+    spring = compute_free_slots([], timezone="America/New_York", waking_hours=(time(22), time(6)),
+                                start_date=date(2026, 3, 7), end_date=date(2026, 3, 7))
+    assert _slots(spring) == [("2026-03-07T22:00:00.000-05:00", "2026-03-08T06:00:00.000-04:00", 420)]
+
+    autumn = compute_free_slots([], timezone="America/New_York", waking_hours=(time(22), time(6)),
+                                start_date=date(2026, 10, 31), end_date=date(2026, 10, 31))
+    assert _slots(autumn) == [("2026-10-31T22:00:00.000-04:00", "2026-11-01T06:00:00.000-05:00", 540)]
+
+    # A day window on the transition day is an hour shorter in elapsed time
+    day = compute_free_slots([], timezone="America/New_York", waking_hours=(time(0), time(12)),
+                             start_date=date(2026, 3, 8), end_date=date(2026, 3, 8))
+    assert day["total_free_minutes"] == 11 * 60
+
+
+def _brute_force_free_minutes(events, day_count, wake_start_minute, wake_end_minute, min_gap):
+    """Free runs found minute by minute, in minutes from the first day's midnight (UTC)."""
+    busy = set()
+    for start, end in events:
+        busy.update(range(start, end))
+    runs = []
+    for day in range(day_count):
+        run_start = None
+        for minute in range(day * 1440 + wake_start_minute, day * 1440 + wake_end_minute + 1):
+            free = minute < day * 1440 + wake_end_minute and minute not in busy
+            if free and run_start is None:
+                run_start = minute
+            elif not free and run_start is not None:
+                if minute - run_start > min_gap:
+                    runs.append((run_start, minute))
+                run_start = None
+    return runs
+
+
+def test_matches_a_minute_by_minute_reference():
+    rng = random.Random(7)
+    origin = datetime.combine(UTC_DAY, time(0), tzinfo=timezone.utc)
+
+    def iso(minute):
+        return (origin + timedelta(minutes=minute)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    for _ in range(50):
+        day_count = rng.randint(1, 3)
+        events = []
+        for _ in range(rng.randint(0, 25)):
+            start = rng.randrange(0, day_count * 1440)
+            events.append((start, start + rng.randint(1, 240)))
+        # Split the events over two calendars
+        calendars = [[_event(iso(s), iso(e)) for s, e in events[::2]], [_event(iso(s), iso(e)) for s, e in events[1::2]]]
+        min_gap = rng.choice([0, 1, 15])
+
+        result = compute_free_slots(calendars, timezone="UTC", waking_hours=(time(7), time(22)),
+                                    min_gap_minutes=min_gap, start_date=UTC_DAY,
+                                    end_date=UTC_DAY + timedelta(days=day_count - 1))
+
+        expected = _brute_force_free_minutes(events, day_count, 7 * 60, 22 * 60, min_gap)
+        got = [(round((datetime.fromisoformat(slot["start"]) - origin).total_seconds() / 60),
+                round((datetime.fromisoformat(slot["end"]) - origin).total_seconds() / 60))
+               for slot in result["free_slots"]]
+        assert got == expected
+        assert result["total_free_minutes"] == sum(end - start for start, end in expected)
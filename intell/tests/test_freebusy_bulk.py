@@ -0,0 +1,143 @@
+"""
+End-to-end tests of freebusy_bulk against a local stand-in for the freeBusy
+and OAuth token endpoints, served over real HTTP on 127.0.0.1.
+"""
+import asyncio
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from intell.app.core.calendar.freebusy_bulk import FreeBusyUser, fetch_busy_intervals
+
+FRESH_TOKEN = "fresh-token"
+BUSY = [{"start": "2030-01-01T10:00:00Z", "end": "2030-01-01T11:00:00Z"}]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    /token: refresh token "good" gets FRESH_TOKEN, anything else a 400.
+    /freeBusy: tokens other than FRESH_TOKEN and "valid-token" get a 401. Calendar
+    ids starting with "broken" carry a per-calendar error, and a query for a
+    "nonjson" calendar is answered with an HTML page.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, content_type="application/json"):
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/token":
+            form = dict(pair.split("=", 1) for pair in raw.decode().split("&"))
+            self.server.refreshes.append(form["refresh_token"])
+            if form["refresh_token"] == "good":
+                return self._reply(200, {"access_token": FRESH_TOKEN, "expires_in": 3600})
+            return self._reply(400, {"error": "invalid_grant"})
+
+        if self.path == "/freeBusy":
+            token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+            body = json.loads(raw)
+            ids = [item["id"] for item in body["items"]]
+            self.server.queries.append((token, ids))
+            if token not in (FRESH_TOKEN, "valid-token"):
+                return self._reply(401, {"error": "unauthorized"})
+            if any(cid.startswith("nonjson") for cid in ids):
+                return self._reply(200, "<html>gateway</html>", content_type="text/html")
+            calendars = {cid: {"errors": [{"reason": "notFound"}]} if cid.startswith("broken") else {"busy": BUSY}
+                         for cid in ids}
+            return self._reply(200, {"calendars": calendars})
+
+        self._reply(404, {"error": "not found"})
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.queries = []
+    server.refreshes = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _token_file(tmp_path, server, name, token="valid-token", refresh_token="good", expired=False):
+    expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=-1 if expired else 1)
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps({
+        "token": token, "refresh_token": refresh_token, "client_id": "client", "client_secret": "secret",
+        "token_uri": server.url + "/token", "expiry": expiry.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }))
+    return str(path)
+
+
+def _fetch(server, users, **kwargs):
+    # An explicit transport keeps httpx from routing 127.0.0.1 through an environment proxy
+    return asyncio.run(fetch_busy_intervals(users, base_url=server.url, transport=httpx.AsyncHTTPTransport(),
+                                            retries=0, **kwargs))
+
+
+def test_calendars_are_batched_per_token_file(stub_server, tmp_path):
+    token_a = _token_file(tmp_path, stub_server, "a")
+    token_b = _token_file(tmp_path, stub_server, "b")
+    users = [FreeBusyUser(f"A{i}", token_a, f"cal-a{i}") for i in range(120)]
+    users += [FreeBusyUser(f"B{i}", token_b, f"cal-b{i}") for i in range(10)]
+    # Users sharing a calendar share one item in the query
+    users.append(FreeBusyUser("A-shared", token_a, "cal-a0"))
+
+    result = _fetch(stub_server, users, max_items=50)
+
+    assert sorted(len(ids) for _, ids in stub_server.queries) == [10, 20, 50, 50]
+    assert result["metrics"]["queries"] == 4
+    assert result["errors"] == {}
+    assert len(result["busy"]) == len(users)
+    assert result["busy"]["A-shared"] == {"events": BUSY}
+
+
+def test_partial_failures_stay_with_their_calendars(stub_server, tmp_path):
+    token = _token_file(tmp_path, stub_server, "ok")
+    other = _token_file(tmp_path, stub_server, "other")
+    users = [FreeBusyUser("ok", token, "cal-ok"), FreeBusyUser("broken", token, "broken-cal"),
+             FreeBusyUser("html", other, "nonjson-cal"), FreeBusyUser("html-neighbour", other, "cal-x")]
+
+    result = _fetch(stub_server, users)
+
+    assert result["busy"] == {"ok": {"events": BUSY}}
+    assert result["errors"]["broken"] == "Calendar error: notFound"
+    assert "malformed response body" in result["errors"]["html"]
+    assert "malformed response body" in result["errors"]["html-neighbour"]
+    assert result["metrics"]["calendar_errors"] == 1
+    assert result["metrics"]["query_errors"] == 1
+
+
+def test_token_errors(stub_server, tmp_path):
+    expired_good = _token_file(tmp_path, stub_server, "expired_good", token="old", expired=True)
+    expired_bad = _token_file(tmp_path, stub_server, "expired_bad", token="old", refresh_token="revoked", expired=True)
+    rejected = _token_file(tmp_path, stub_server, "rejected", token="revoked-early")
+    users = [FreeBusyUser("refreshed", expired_good, "cal-1"), FreeBusyUser("refresh-fails", expired_bad, "cal-2"),
+             FreeBusyUser("retried-after-401", rejected, "cal-3"),
+             FreeBusyUser("no-token", str(tmp_path / "missing.json"), "cal-4")]
+
+    result = _fetch(stub_server, users)
+
+    assert set(result["busy"]) == {"refreshed", "retried-after-401"}
+    assert result["errors"]["refresh-fails"].startswith("Token refresh failed")
+    assert result["errors"]["no-token"].startswith("Unreadable token file")
+    assert result["metrics"]["token_errors"] == 2
+    assert result["metrics"]["token_refreshes"] == 3
+    # Refreshed tokens are written back for the next run
+    with open(expired_good) as f:
+        assert json.load(f)["token"] == FRESH_TOKEN
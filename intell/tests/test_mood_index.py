@@ -0,0 +1,70 @@
+import random
+
+from intell.app.core.recommendation_engine.catalog import Movie
+from intell.app.core.recommendation_engine.mood_index import top_k_by_moods
+
+MOODS = ["happy", "sad", "calm", "tense", "romantic"]
+
+
+def _index(rng, count):
+    """Mood -> posting list, highest score first; scores come from a small set so ties are common."""
+    by_mood = {mood: [] for mood in MOODS}
+    for i in range(count):
+        moods = tuple(rng.sample(MOODS, rng.randint(1, 3)))
+        movie = Movie(f"m{i}", f"Title {i}", 90, float(rng.randint(1, 5)), moods)
+        for mood in moods:
+            by_mood[mood].append(movie)
+    for postings in by_mood.values():
+        postings.sort(key=lambda m: m.ranking_score, reverse=True)
+    return by_mood
+
+
+def _reference(by_mood, mood_weights):
+    """Every tagged movie with its best weighted score, sorted best first."""
+    best = {}
+    for mood, weight in mood_weights.items():
+        if weight <= 0:
+            continue
+        for movie in by_mood.get(mood, []):
+            best[movie.movie_id] = max(best.get(movie.movie_id, 0), weight * movie.ranking_score)
+    return sorted(best.items(), key=lambda item: item[1], reverse=True)
+
+
+def test_matches_sorting_every_candidate():
+    rng = random.Random(5)
+    for _ in range(200):
+        by_mood = _index(rng, rng.randint(0, 40))
+        mood_weights = {mood: rng.choice([0, 0.5, 1, 1, 2]) for mood in rng.sample(MOODS, rng.randint(1, 4))}
+        if rng.random() < 0.2:
+            mood_weights["unknown"] = 1
+        k = rng.randint(1, 30)
+
+        result = top_k_by_moods(by_mood, mood_weights, k)
+        expected = _reference(by_mood, mood_weights)
+        best = dict(expected)
+
+        ids = [movie.movie_id for _, movie in result]
+        assert len(ids) == len(set(ids)) == min(k, len(expected))
+        assert [score for score, _ in result] == [score for _, score in expected[:k]]
+        # Ties at the cut may be broken either way, but each movie carries its own best score
+        assert all(score == best[movie.movie_id] for score, movie in result)
+        if result:
+            cutoff = result[-1][0]
+            assert {m for m, s in expected if s > cutoff} <= set(ids)
+
+
+def test_ties_and_edge_cases():
+    a = Movie("a", "A", 90, 2.0, ("happy", "calm"))
+    b = Movie("b", "B", 90, 2.0, ("happy",))
+    c = Movie("c", "C", 90, 1.0, ("calm",))
+    by_mood = {"happy": [a, b], "calm": [a, c]}
+
+    result = top_k_by_moods(by_mood, {"happy": 1, "calm": 3}, 3)
+    assert [(score, movie.movie_id) for score, movie in result] == [(6.0, "a"), (3.0, "c"), (2.0, "b")]
+
+    tied = top_k_by_moods(by_mood, {"happy": 1}, 1)
+    assert len(tied) == 1 and tied[0][0] == 2.0 and tied[0][1].movie_id in {"a", "b"}
+
+    assert top_k_by_moods(by_mood, {"happy": 1}, 0) == []
+    assert top_k_by_moods(by_mood, {"sad": 1, "calm": 0}, 5) == []
+    assert top_k_by_moods({}, {"happy": 1}, 5) == []
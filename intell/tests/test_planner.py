@@ -0,0 +1,64 @@
+import itertools
+import random
+
+import pytest
+
+from intell.app.core.recommendation_engine.catalog import Movie
+from intell.app.core.recommendation_engine.planner import _knapsack, plan_slots
+
+
+def _movies(rng, count):
+    return [Movie(f"m{i}", f"Title {i}", rng.randint(1, 40), round(rng.uniform(0, 10), 2), ())
+            for i in range(count)]
+
+
+def _brute_force_best(movies, capacity):
+    """Highest total score of any subset that fits, by trying them all."""
+    best = 0.0
+    for size in range(1, len(movies) + 1):
+        for subset in itertools.combinations(movies, size):
+            if sum(m.duration_minutes for m in subset) <= capacity:
+                best = max(best, sum(m.ranking_score for m in subset))
+    return best
+
+
+def test_knapsack_matches_brute_force():
+    rng = random.Random(3)
+    for _ in range(200):
+        movies = _movies(rng, rng.randint(1, 10))
+        capacity = rng.randint(1, 120)
+
+        chosen = _knapsack(movies, capacity)
+
+        assert len({m.movie_id for m in chosen}) == len(chosen)
+        assert sum(m.duration_minutes for m in chosen) <= capacity
+        assert sum(m.ranking_score for m in chosen) == pytest.approx(_brute_force_best(movies, capacity))
+
+
+def test_plan_slots_is_optimal_per_slot_and_never_repeats():
+    rng = random.Random(11)
+    for _ in range(50):
+        movies = _movies(rng, rng.randint(1, 10))
+        slots = [rng.randint(0, 90) for _ in range(rng.randint(1, 3))]
+
+        playlists = plan_slots(movies, slots)
+
+        assert len(playlists) == len(slots)
+        used = set()
+        for capacity, playlist in zip(slots, playlists):
+            remaining = [m for m in movies if m.movie_id not in used]
+            ids = [m.movie_id for m in playlist]
+            assert not used.intersection(ids)
+            assert [m.ranking_score for m in playlist] == sorted((m.ranking_score for m in playlist), reverse=True)
+            assert sum(m.ranking_score for m in playlist) == pytest.approx(_brute_force_best(remaining, capacity))
+            used.update(ids)
+
+
+def test_empty_catalog_and_zero_capacity():
+    movies = _movies(random.Random(0), 5)
+    assert plan_slots([], [60, 30]) == [[], []]
+    assert plan_slots(movies, [0]) == [[]]
+    assert plan_slots(movies, []) == []
+    assert _knapsack(movies, 0) == []
+    # Nothing fits a slot shorter than every title
+    assert plan_slots([Movie("long", "Long", 200, 9.0, ())], [60]) == [[]]
@@ -0,0 +1,30 @@
+import asyncio
+
+from backend.services.signal_cache import SignalSnapshotCache
+
+
+def _fetch(value):
+    async def fetch():
+        return value
+    return fetch
+
+
+def test_least_recently_used_snapshots_are_evicted():
+    async def scenario():
+        cache = SignalSnapshotCache({"voice": 60}, max_entries=2)
+        await cache.refresh("u1", "voice", _fetch(1))
+        await cache.refresh("u2", "voice", _fetch(2))
+        # Reading u1 makes u2 the least recently used
+        assert cache.get("u1", "voice") == (1, True)
+        await cache.refresh("u3", "voice", _fetch(3))
+        await asyncio.sleep(0)
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.get("u2", "voice") == (None, False)
+    assert cache.get("u1", "voice") == (1, True)
+    assert cache.get("u3", "voice") == (3, True)
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+    # Finished refreshes are not kept either
+    assert cache._refreshing == {}
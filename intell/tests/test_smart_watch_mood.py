@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from intell.app.core.smart_watch import smart_watch_mood as training
+from intell.app.core.smart_watch.predict_smartwatch import encode_samples
+
+MIDNIGHT_UTC = 1704067200.0  # 2024-01-01T00:00:00Z
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return pd.read_csv(training.DATA_PATH, nrows=5)
+
+
+def _seconds(rows, timestamps):
+    df = rows.head(len(timestamps)).copy()
+    df[training.TIMESTAMP_COLUMN] = timestamps
+    X, y = training.encode_features(df)
+    assert len(X) == len(y)
+    return X[training.TIMESTAMP_COLUMN].tolist()
+
+
+@pytest.mark.parametrize("timestamps, expected", [
+    (["2024-01-01 00:00", "2024-01-01T01:00:00"], [MIDNIGHT_UTC, MIDNIGHT_UTC + 3600]),
+    (["2024-01-01T00:00:00+05:30", "2024-01-01T05:30:00+05:30"], [MIDNIGHT_UTC - 19800, MIDNIGHT_UTC]),
+    (["2024-01-01T00:00:00+05:30", "2024-01-01T00:00:00Z", "2024-01-01 00:00"],
+     [MIDNIGHT_UTC - 19800, MIDNIGHT_UTC, MIDNIGHT_UTC]),
+])
+def test_naive_offset_and_mixed_timestamps(rows, timestamps, expected):
+    assert _seconds(rows, timestamps) == expected
+
+
+def test_training_and_serving_agree_on_timestamps(rows):
+    timestamps = ["2024-01-01T00:00:00+05:30", "2024-01-01T00:00:00Z", "2024-03-10 02:30"]
+    served = encode_samples([{"timestamp": value} for value in timestamps], pd.Index(["timestamp"]))
+    assert _seconds(rows, timestamps) == served["timestamp"].tolist()
+
+
+def test_unparseable_timestamps_are_dropped(rows):
+    df = rows.head(4).copy()
+    df[training.TIMESTAMP_COLUMN] = ["2024-01-01T00:00:00Z", "not a time", None, "2024-01-01T00:00:00+05:30"]
+    X, y = training.encode_features(df)
+    assert X[training.TIMESTAMP_COLUMN].tolist() == [MIDNIGHT_UTC, MIDNIGHT_UTC - 19800]
+    assert y.tolist() == [rows[training.LABEL_COLUMN][0], rows[training.LABEL_COLUMN][3]]
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from intell.app.core.smart_watch.stream_features import StreamFeatureEngine
+
+
+def _naive_stats(times, values, w):
+    """mean, std, slope, min and max of the last w samples, recomputed from scratch."""
+    t, x = np.asarray(times[-w:]), np.asarray(values[-w:])
+    slope = np.polyfit(t - t[0], x, 1)[0] if len(x) > 1 else 0.0
+    return [x.mean(), x.std(), slope, x.min(), x.max()]
+
+
+def test_windows_match_a_naive_recomputation_across_rebases():
+    rng = np.random.default_rng(4)
+    engine = StreamFeatureEngine(fields=("heart_rate", "eda"), windows=(3, 7))
+    assert engine.capacity == 8
+
+    times, rows = [], []
+    t = 1.7e9
+    for i in range(100):
+        if i % 13 == 12:
+            # An out-of-order sample is dropped and changes nothing
+            assert not engine.push("watch", t - 5, (1.0, 1.0))
+        t += float(rng.uniform(0.5, 1.5))
+        row = (float(rng.normal(80, 10)), float(rng.uniform(0.1, 0.5)))
+        assert engine.push("watch", t, row)
+        times.append(t)
+        rows.append(row)
+
+        features = engine.features("watch")
+        for f, field in enumerate(engine.fields):
+            column = [r[f] for r in rows]
+            for w in engine.windows:
+                got = [features[f"{field}_{stat}_{w}"] for stat in ("mean", "std", "slope", "min", "max")]
+                assert got == pytest.approx(_naive_stats(times, column, w), rel=1e-9, abs=1e-9), (i, field, w)
+
+    stats = engine.stats()
+    # The ring of 8 is rebased before every 8th sample after the first fill
+    assert stats["rebases"] == (len(rows) - 1) // engine.capacity
+    assert (stats["samples"], stats["out_of_order"]) == (len(rows), 7)
+
+
+def test_push_many_matches_pushing_one_by_one():
+    rng = np.random.default_rng(9)
+    t = 1.7e9 + np.cumsum(rng.uniform(0.8, 1.2, 700))
+    values = np.column_stack([rng.normal(80, 10, 700), rng.normal(40, 8, 700), rng.uniform(0.1, 0.5, 700)])
+    samples = list(zip(t.tolist(), values.tolist()))
+
+    batched, single = StreamFeatureEngine(), StreamFeatureEngine()
+    assert batched.push_many("watch", samples) == len(samples)
+    for timestamp, row in samples:
+        single.push("watch", timestamp, row)
+
+    assert batched.stats()["rebases"] > 1
+    assert batched.features("watch") == single.features("watch")
+    expected = [stat for f in range(3) for w in batched.windows for stat in _naive_stats(t, values[:, f], w)]
+    assert batched.feature_matrix(["watch"])[0] == pytest.approx(np.asarray(expected, dtype=np.float32), rel=1e-5)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+sf = pytest.importorskip("soundfile")
+
+from intell.app.core.speech_model.mfcc_cache import compute_mfcc_avg
+from intell.app.core.speech_model.stream_mfcc import TARGET_SR, StreamingMfcc
+
+CLIPS = ["backend/voice_files/OAF_bean_happy.wav", "backend/voice_files/YAF_bath_ps.wav"]
+# At 22050 Hz only float32 vs float64 rounding and the top_db histogram bin separate the
+# two (observed < 1e-3, on coefficients of up to ~500)
+SAME_RATE_ATOL = 0.01
+# The clips are 24414 Hz: librosa.load resamples with soxr, the stream with resample_poly
+# (observed < 1.3)
+RESAMPLED_ATOL = 2.0
+
+
+def _stream(mfcc, data, rng):
+    """Feeds raw bytes in random chunk sizes, most of which split a sample."""
+    position = 0
+    while position < len(data):
+        size = int(rng.integers(1, 5000))
+        mfcc.push_bytes(data[position:position + size])
+        position += size
+    mfcc.finish()
+    return mfcc.mean_mfcc()
+
+
+@pytest.mark.parametrize("path", CLIPS)
+def test_matches_librosa_at_the_target_rate(path):
+    samples, _ = librosa.load(path, sr=TARGET_SR)
+    streamed = _stream(StreamingMfcc(TARGET_SR, "f32le"), samples.astype("<f4").tobytes(), np.random.default_rng(0))
+
+    expected = compute_mfcc_avg(path)
+    assert streamed.shape == expected.shape == (40,)
+    np.testing.assert_allclose(streamed, expected, rtol=0, atol=SAME_RATE_ATOL)
+
+
+@pytest.mark.parametrize("path", CLIPS)
+def test_resampled_stream_matches_librosa_and_ignores_chunking(path):
+    samples, rate = sf.read(path, dtype="int16")
+    assert rate != TARGET_SR
+    data = samples.astype("<i2").tobytes()
+
+    chunked = _stream(StreamingMfcc(rate, "pcm_s16le"), data, np.random.default_rng(1))
+    whole = StreamingMfcc(rate, "pcm_s16le")
+    whole.push_bytes(data)
+    whole.finish()
+
+    np.testing.assert_allclose(chunked, whole.mean_mfcc(), rtol=0, atol=1e-3)
+    np.testing.assert_allclose(chunked, compute_mfcc_avg(path), rtol=0, atol=RESAMPLED_ATOL)